@@ -0,0 +1,226 @@
+"""
+Builders for the derived tables kept next to each season in the local store.
+
+Everything in here is plain pandas so it can run from the refresh job as well as
+from inside the app.
+"""
+import numpy as np
+import pandas as pd
+
+import dims
+import kernels
+
+
+def build_games(pbp):
+    """
+    Returns one row per game with the final score.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe with game_id, season, season_type, week, home/away team and score.
+    """
+    # game level columns are the same on every play, so take them from the first
+    games = pbp[
+        ["game_id", "season", "season_type", "week", "home_team", "away_team"]
+    ].drop_duplicates("game_id")
+    scores = pbp.groupby("game_id")[["home_score", "away_score"]].max().reset_index()
+    games = games.merge(scores, on="game_id").sort_values("game_id")
+    return games.reset_index(drop=True)
+
+
+def _weekly_frame(sums, counts, names):
+    """
+    Returns the non-empty cells of weekly_sums output as a long dataframe with
+    group code, week, and one column per metric.
+    """
+    group, week = np.nonzero(counts)
+    frame = pd.DataFrame(sums[group, week], columns=names)
+    frame.insert(0, "week", week)
+    frame.insert(0, "code", group)
+    return frame
+
+
+def build_team_cube(pbp):
+    """
+    Returns one row per team per game with offensive and defensive totals.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe keyed by game_id/season_type/week/team.
+    """
+    # rows without a posteam get code -1 and are skipped by the kernel, so the
+    # season never has to be filtered or copied
+    data = dims.normalize(pbp)
+    teams = data.posteam.cat.categories
+    off_codes = data.posteam.cat.codes.to_numpy()
+    def_codes = np.where(off_codes >= 0, data.defteam.cat.codes.to_numpy(), -1)
+    week = data.week.to_numpy(np.int64)
+    n_weeks = int(week.max()) + 1 if len(week) else 1
+    yards = data.yards_gained.to_numpy(np.float64)
+    sack = data.sack.to_numpy(np.float64)
+    turnovers = (data.interception + data.fumble_lost).to_numpy(np.float64)
+
+    # ---- Offense and defense totals in one pass each ----
+    offense = np.column_stack(
+        [
+            yards,
+            np.where((data.play_type == "pass").to_numpy(), yards, 0),
+            np.where((data.play_type == "run").to_numpy(), yards, 0),
+            data.air_yards.to_numpy(np.float64),
+            data.yards_after_catch.to_numpy(np.float64),
+            sack,
+            turnovers,
+        ]
+    )
+    off_sums, off_counts = kernels.weekly_sums(
+        off_codes, week, offense, len(teams), n_weeks
+    )
+    def_sums, def_counts = kernels.weekly_sums(
+        def_codes,
+        week,
+        np.column_stack([sack, yards, turnovers]),
+        len(teams),
+        n_weeks,
+    )
+    # teams without plays on one side of the ball get zeros for that side
+    counts = off_counts + def_counts
+    cube = pd.concat(
+        [
+            _weekly_frame(
+                off_sums,
+                counts,
+                [
+                    "yards",
+                    "pass_yards",
+                    "rush_yards",
+                    "air_yards",
+                    "yac",
+                    "sacks_taken",
+                    "giveaways",
+                ],
+            ),
+            _weekly_frame(
+                def_sums, counts, ["def_sacks", "yds_allowed", "takeaways"]
+            ).drop(columns=["code", "week"]),
+        ],
+        axis=1,
+    )
+    cube.insert(
+        0, "team", pd.Categorical.from_codes(cube.pop("code"), dtype=data.posteam.dtype)
+    )
+
+    # ---- Attach the game each team played that week ----
+    games = build_games(data)
+    sides = pd.concat(
+        [
+            games[["game_id", "season_type", "week", x]].rename(columns={x: "team"})
+            for x in ["home_team", "away_team"]
+        ],
+        ignore_index=True,
+    )
+    cube = sides.merge(cube, on=["week", "team"], how="inner")
+    keys = ["game_id", "season_type", "week"]
+    return cube.sort_values(keys + ["team"]).reset_index(drop=True)
+
+
+def build_passer_index(pbp, offset=0):
+    """
+    Returns the row positions of every dropback, keyed by passer_id.
+
+    params:
+        pbp (DataFrame): play by play data in stored row order.
+        offset (int): position of the first row of pbp within the stored season.
+
+    Returns:
+        Dataframe with passer_id and row columns.
+    """
+    mask = ((pbp.qb_dropback == 1) & pbp.passer_id.notna()).to_numpy()
+    index = pd.DataFrame(
+        {
+            "passer_id": pbp.passer_id.to_numpy()[mask],
+            "row": np.flatnonzero(mask) + offset,
+        }
+    )
+    return index
+
+
+# points credited to the offense for each fixed_drive_result
+DRIVE_POINTS = {"Touchdown": 7, "Field goal": 3}
+
+
+def build_drives(pbp):
+    """
+    Returns one row per drive.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe keyed by game_id/drive with offense, defense, start yardline,
+        result, points, snaps, yards and red zone/goal to go flags.
+    """
+    data = pbp[pbp.posteam.notna() & pbp.drive.notna()]
+    data = data.assign(
+        snap=data.play_type.isin(["pass", "run"]),
+        in_red_zone=data.yardline_100 <= 20,
+        gtg_td=data.touchdown.where(data.goal_to_go == 1, 0),
+    )
+    drives = (
+        data.groupby(["game_id", "drive"], sort=True)
+        .agg(
+            season_type=("season_type", "first"),
+            week=("week", "first"),
+            posteam=("posteam", "first"),
+            defteam=("defteam", "first"),
+            start_yardline=("yardline_100", "first"),
+            result=("fixed_drive_result", "first"),
+            plays=("snap", "sum"),
+            yards=("yards_gained", "sum"),
+            red_zone=("in_red_zone", "max"),
+            goal_to_go=("goal_to_go", "max"),
+            gtg_td=("gtg_td", "sum"),
+        )
+        .reset_index()
+    )
+    drives["points"] = drives.result.map(DRIVE_POINTS).fillna(0)
+    return drives
+
+
+def build_passer_weeks(pbp):
+    """
+    Returns one row per passer per week with dropback totals.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe keyed by passer_id/week with dropbacks, completions, yards,
+        air yards, yards after catch, touchdowns, interceptions and sacks.
+    """
+    data = pbp[(pbp.qb_dropback == 1) & pbp.passer_id.notna()]
+    codes, passers = pd.factorize(data.passer_id)
+    week = data.week.to_numpy(np.int64)
+    names = [
+        "complete_pass",
+        "yards_gained",
+        "air_yards",
+        "yards_after_catch",
+        "pass_touchdown",
+        "interception",
+        "sack",
+    ]
+    sums, counts = kernels.weekly_sums(
+        codes,
+        week,
+        data[names].to_numpy(np.float64),
+        len(passers),
+        int(week.max()) + 1 if len(week) else 1,
+    )
+    weeks = _weekly_frame(sums, counts, names)
+    weeks.insert(2, "dropbacks", counts[weeks.code, weeks.week])
+    weeks.insert(0, "passer_id", passers[weeks.pop("code")])
+    return weeks.sort_values(["week", "passer_id"]).reset_index(drop=True)
@@ -0,0 +1,169 @@
+"""
+EPA, success rate and CPOE for teams, defenses and passers.
+
+A season is rolled up once into per game (team_epa) and per week (passer_epa)
+sums that are kept with the other derived tables in the store. The rates shown
+on the pages are ratios of those sums, so picking a team or game type only adds
+up a few hundred rows instead of scanning the plays again.
+"""
+import numpy as np
+import pandas as pd
+
+import kernels
+
+
+# rates from the team_epa table, offense first then defense
+TEAM_EPA_STATS = [
+    "epa_per_play",
+    "success_rate",
+    "pass_epa",
+    "rush_epa",
+    "cpoe",
+    "def_epa_per_play",
+    "def_success_rate",
+]
+PASSER_EPA_STATS = ["epa_per_dropback", "success_rate", "cpoe"]
+
+
+def _epa_plays(pbp):
+    # dropbacks and runs with an EPA value, the plays nflfastR rates are over
+    return pbp[
+        ((pbp.qb_dropback == 1) | (pbp.rush_attempt == 1))
+        & pbp.posteam.notna()
+        & pbp.epa.notna()
+    ]
+
+
+def build_team_epa(pbp):
+    """
+    Returns one row per offense per game with EPA, success and CPOE sums.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe keyed by game_id/posteam with season_type, week, defteam,
+        plays, epa, success, dropbacks, pass_epa, rushes, rush_epa, cpoe and
+        cpoe_plays. Defensive totals are the rows where the team is defteam.
+    """
+    data = _epa_plays(pbp)
+    dropback = data.qb_dropback == 1
+    team_epa = (
+        data.assign(
+            dropbacks=dropback,
+            pass_epa=data.epa.where(dropback, 0),
+            rushes=~dropback,
+            rush_epa=data.epa.where(~dropback, 0),
+            cpoe_plays=data.cpoe.notna(),
+        )
+        .groupby(["game_id", "posteam"], observed=True, sort=True)
+        .agg(
+            season_type=("season_type", "first"),
+            week=("week", "first"),
+            defteam=("defteam", "first"),
+            plays=("epa", "size"),
+            epa=("epa", "sum"),
+            success=("success", "sum"),
+            dropbacks=("dropbacks", "sum"),
+            pass_epa=("pass_epa", "sum"),
+            rushes=("rushes", "sum"),
+            rush_epa=("rush_epa", "sum"),
+            cpoe=("cpoe", "sum"),
+            cpoe_plays=("cpoe_plays", "sum"),
+        )
+        .reset_index()
+    )
+    return team_epa
+
+
+def build_passer_epa(pbp):
+    """
+    Returns one row per passer per week with EPA, success and CPOE sums.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+
+    Returns:
+        Dataframe keyed by passer_id/week with dropbacks, epa, success, cpoe
+        and cpoe_plays.
+    """
+    data = _epa_plays(pbp)
+    data = data[(data.qb_dropback == 1) & data.passer_id.notna()]
+    codes, passers = pd.factorize(data.passer_id)
+    week = data.week.to_numpy(np.int64)
+    values = np.column_stack(
+        [
+            data.epa.to_numpy(np.float64),
+            data.success.to_numpy(np.float64),
+            data.cpoe.to_numpy(np.float64),
+            data.cpoe.notna().to_numpy(np.float64),
+        ]
+    )
+    sums, counts = kernels.weekly_sums(
+        codes, week, values, len(passers), int(week.max()) + 1 if len(week) else 1
+    )
+    group, week = np.nonzero(counts)
+    passer_epa = pd.DataFrame(
+        sums[group, week], columns=["epa", "success", "cpoe", "cpoe_plays"]
+    )
+    passer_epa.insert(0, "dropbacks", counts[group, week])
+    passer_epa.insert(0, "week", week)
+    passer_epa.insert(0, "passer_id", passers[group])
+    return passer_epa.sort_values(["week", "passer_id"]).reset_index(drop=True)
+
+
+def ratio(numerator, denominator, digits):
+    """
+    Returns numerator / denominator rounded to digits, or NaN for a zero or
+    missing denominator.
+    """
+    if denominator == 0 or pd.isna(denominator):
+        return np.nan
+    return round(numerator / denominator, digits)
+
+
+def team_epa_stats(team_epa, team=None):
+    """
+    Returns EPA/play, success rate, EPA per dropback and per rush, CPOE, and
+    EPA/play and success rate allowed, in the order of TEAM_EPA_STATS.
+
+    params:
+        team_epa (DataFrame): rows of the team_epa table, already filtered to
+            the games wanted.
+        team (str): team abbreviation, or None for league wide rates.
+    """
+    if team is None:
+        offense = defense = team_epa
+    else:
+        offense = team_epa[team_epa.posteam == team]
+        defense = team_epa[team_epa.defteam == team]
+    off = offense[
+        ["plays", "epa", "success", "dropbacks", "pass_epa", "rushes", "rush_epa"]
+        + ["cpoe", "cpoe_plays"]
+    ].sum()
+    allowed = defense[["plays", "epa", "success"]].sum()
+    return (
+        ratio(off.epa, off.plays, 3),
+        ratio(100 * off.success, off.plays, 1),
+        ratio(off.pass_epa, off.dropbacks, 3),
+        ratio(off.rush_epa, off.rushes, 3),
+        ratio(off.cpoe, off.cpoe_plays, 1),
+        ratio(allowed.epa, allowed.plays, 3),
+        ratio(100 * allowed.success, allowed.plays, 1),
+    )
+
+
+def passer_epa_stats(passer_epa):
+    """
+    Returns EPA per dropback, success rate and CPOE, in the order of
+    PASSER_EPA_STATS.
+
+    params:
+        passer_epa (DataFrame): rows of the passer_epa table for one passer.
+    """
+    totals = passer_epa[["dropbacks", "epa", "success", "cpoe", "cpoe_plays"]].sum()
+    return (
+        ratio(totals.epa, totals.dropbacks, 3),
+        ratio(100 * totals.success, totals.dropbacks, 1),
+        ratio(totals.cpoe, totals.cpoe_plays, 1),
+    )
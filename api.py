@@ -0,0 +1,345 @@
+"""
+Read-only JSON API over the same aggregates as the pages.
+
+`app` is a plain ASGI application, so any ASGI server can run it
+(`uvicorn api:app`). `python api.py --port 8700` runs it on a small built-in
+HTTP/1.1 server instead, which needs nothing beyond the app's dependencies.
+
+    GET /seasons
+    GET /teams/<team>/kpis?season=2021&game_type=regular
+    GET /league/baselines?season=2021&game_type=playoffs
+    GET /qbs?season=2021
+    GET /qbs/<passer_id>?season=2021
+    GET /standings?season=2021&week=10
+
+game_type is regular (the default), playoffs or all. Responses are computed
+with the funcs loaders once per store version of the season asked for, then
+kept encoded, gzipped and tagged: a repeat request is a dict lookup and a
+conditional one (If-None-Match) answers 304 without a body. The app never runs
+Streamlit's script model, so repeat requests cost microseconds.
+"""
+import argparse
+import asyncio
+import collections
+import gzip
+import hashlib
+import json
+import re
+from urllib.parse import parse_qs, unquote
+
+import dims
+import export
+import funcs
+import memory
+import store
+from singleflight import SingleFlight
+
+
+GAME_TYPES = {
+    "regular": "Regular Season",
+    "playoffs": "Playoffs",
+    "all": "All Games",
+}
+# responses kept encoded; the least recently used are dropped past this
+MAX_RESPONSES = 4096
+# bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---- Endpoints ----
+# each takes the groups of the path match and the query and returns a JSON-able
+# value; they run in a worker thread on cache misses
+
+
+def _records(frame):
+    # pandas writes NaN as null, which json.dumps would not
+    return json.loads(frame.to_json(orient="records"))
+
+
+def _season(query):
+    try:
+        season = int(query["season"])
+    except (KeyError, ValueError):
+        raise APIError(400, "season must be given as a year, e.g. season=2021")
+    if store.season_version(season) is None:
+        raise APIError(404, f"Season {season} is not in the store.")
+    return season
+
+
+def _game_type(query):
+    game_type = query.get("game_type", "regular")
+    if game_type not in GAME_TYPES:
+        raise APIError(400, f"game_type must be one of {', '.join(GAME_TYPES)}")
+    return GAME_TYPES[game_type]
+
+
+def seasons(match, query):
+    return {"seasons": store.stored_seasons()}
+
+
+def team_kpis(match, query):
+    team = match["team"].upper()
+    if team not in dims.TEAMS:
+        raise APIError(404, f"Unknown team {team}.")
+    season, game_type = _season(query), _game_type(query)
+    parts = funcs.get_partitions([season])
+    if not parts.has_team(team, game_type):
+        raise APIError(404, f"{team} has no {game_type} games in {season}.")
+    kpis = funcs.get_team_kpis([season], game_type, team)
+    return {"season": season, "game_type": game_type, "team": team, **_records(kpis)[0]}
+
+
+def league_baselines(match, query):
+    season, game_type = _season(query), _game_type(query)
+    baselines = funcs.get_league_baselines([season], game_type)
+    return {"season": season, "game_type": game_type, **_records(baselines)[0]}
+
+
+def qb_stats(match, query):
+    season = _season(query)
+    [(_, stats)] = export.qb_stats([season])
+    if match.get("passer_id") is None:
+        return {"season": season, "qbs": _records(stats)}
+    row = stats[stats.passer_id == match["passer_id"]]
+    if row.empty:
+        raise APIError(404, f"No dropbacks by {match['passer_id']} in {season}.")
+    return {"season": season, **_records(row)[0]}
+
+
+def standings(match, query):
+    season = _season(query)
+    try:
+        week = int(query["week"]) if "week" in query else None
+    except ValueError:
+        raise APIError(400, "week must be a number")
+    table = funcs.get_standings([season], week)
+    return {
+        "season": season,
+        # no rows before week 1 or before any game is played
+        "week": int(table.week.max()) if len(table) else week,
+        "teams": _records(table.drop(columns=["season", "week"])),
+    }
+
+
+ROUTES = [
+    (re.compile(r"/seasons"), seasons),
+    (re.compile(r"/teams/(?P<team>[A-Za-z]+)/kpis"), team_kpis),
+    (re.compile(r"/league/baselines"), league_baselines),
+    (re.compile(r"/qbs(?:/(?P<passer_id>[^/]+))?"), qb_stats),
+    (re.compile(r"/standings"), standings),
+]
+
+
+# ---- Responses ----
+
+
+class Response:
+    """An encoded JSON body with its gzipped copy and ETag."""
+
+    def __init__(self, status, value):
+        self.status = status
+        self.body = json.dumps(value, separators=(",", ":")).encode()
+        self.gzipped = (
+            gzip.compress(self.body, 6) if len(self.body) >= GZIP_MIN_BYTES else None
+        )
+        self.etag = f'W/"{hashlib.sha1(self.body).hexdigest()[:20]}"'.encode()
+
+
+def _route(path):
+    for pattern, endpoint in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            return endpoint, match.groupdict()
+    return None, None
+
+
+def _key(path, query):
+    # the store versions make entries of refreshed seasons unreachable
+    season = query.get("season", "")
+    if season.isdigit():
+        version = store.season_version(int(season))
+    else:
+        version = tuple(store.stored_seasons())
+    return path, tuple(sorted(query.items())), version
+
+
+def _compute(endpoint, match, query):
+    try:
+        return Response(200, endpoint(match, query))
+    except APIError as error:
+        return Response(error.status, {"error": str(error)})
+    except Exception as error:
+        return Response(500, {"error": f"{type(error).__name__}: {error}"})
+
+
+async def respond(path, query):
+    """
+    Returns the Response for a GET of path with query (a dict of single
+    values), from the response cache when it is current.
+    """
+    endpoint, match = _route(path)
+    if endpoint is None:
+        return Response(404, {"error": f"No endpoint at {path}."})
+    key = _key(path, query)
+    response = _responses.get(key)
+    if response is not None:
+        _responses.move_to_end(key)
+        memory.hit("api._responses", key)
+        return response
+    # computed off the event loop; concurrent requests for it share one
+    response = await asyncio.get_running_loop().run_in_executor(
+        None, _flight.do, key, _compute, endpoint, match, query
+    )
+    # of the errors, only those of a stored version (e.g. no such team) are kept
+    if response.status == 200 or response.status == 404:
+        _responses[key] = response
+        while len(_responses) > MAX_RESPONSES:
+            _responses.popitem(last=False)
+        memory.record("api._responses", key, len(response.body))
+    return response
+
+
+_responses = collections.OrderedDict()
+memory.watch("api._responses", _responses)
+_flight = SingleFlight()
+
+
+def _headers(request_headers, response):
+    """
+    Returns (status, headers, body) for response given the request headers.
+    """
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"etag", response.etag),
+        (b"cache-control", b"no-cache"),
+        (b"vary", b"accept-encoding"),
+    ]
+    match = request_headers.get(b"if-none-match", b"")
+    if response.status == 200 and response.etag in [
+        x.strip() for x in match.split(b",")
+    ]:
+        return 304, headers, b""
+    body = response.body
+    if response.gzipped is not None and b"gzip" in request_headers.get(
+        b"accept-encoding", b""
+    ):
+        body = response.gzipped
+        headers.append((b"content-encoding", b"gzip"))
+    headers.append((b"content-length", str(len(body)).encode()))
+    return response.status, headers, body
+
+
+async def app(scope, receive, send):
+    """
+    The ASGI application.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["method"] not in ("GET", "HEAD"):
+        response = Response(405, {"error": "The API is read-only; use GET."})
+    else:
+        query = parse_qs(scope["query_string"].decode())
+        response = await respond(
+            scope["path"].rstrip("/") or "/", {k: v[-1] for k, v in query.items()}
+        )
+    headers = {k.lower(): v for k, v in scope["headers"]}
+    status, response_headers, body = _headers(headers, response)
+    await send(
+        {"type": "http.response.start", "status": status, "headers": response_headers}
+    )
+    await send(
+        {"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body}
+    )
+
+
+# ---- Built-in server ----
+
+REASONS = {
+    200: b"OK",
+    304: b"Not Modified",
+    400: b"Bad Request",
+    404: b"Not Found",
+    405: b"Method Not Allowed",
+    500: b"Internal Server Error",
+}
+
+
+async def _connection(reader, writer):
+    # HTTP/1.1 with keep-alive, for GET requests without bodies
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head[:-4].split(b"\r\n")
+            method, target, version = lines[0].split(b" ", 2)
+            headers = [
+                (k.strip().lower(), v.strip())
+                for k, _, v in (x.partition(b":") for x in lines[1:])
+            ]
+            length = int(dict(headers).get(b"content-length", 0))
+            if length:
+                await reader.readexactly(length)
+            path, _, query = target.partition(b"?")
+            scope = {
+                "type": "http",
+                "method": method.decode(),
+                "path": unquote(path.decode()),
+                "query_string": query,
+                "headers": headers,
+            }
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            await app(scope, None, send)
+            start, body = sent[0], sent[1]["body"]
+            status = start["status"]
+            close = version == b"HTTP/1.0" or (
+                dict(headers).get(b"connection", b"").lower() == b"close"
+            )
+            out = [
+                b"HTTP/1.1 %d %s" % (status, REASONS.get(status, b"Error")),
+                *(k + b": " + v for k, v in start["headers"]),
+            ]
+            if close:
+                out.append(b"connection: close")
+            writer.write(b"\r\n".join(out) + b"\r\n\r\n" + body)
+            if close:
+                break
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(_connection, host, port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app's aggregates as JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    args = parser.parse_args()
+
+    print(f"Serving the JSON API on http://{args.host}:{args.port}")
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
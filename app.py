@@ -1,4 +1,5 @@
 # ---- Main Imports ----
+import os
 import streamlit as st
 import numpy as np
 from PIL import Image
@@ -6,8 +7,11 @@ import pandas as pd
 
 
 # ---- Custom imports ----
+import memory
+import snapshot
 from multipage import MultiPage
-from app_pages import home, team_stats, quarterbacks
+from app_pages import home, team_stats, quarterbacks, players, league_standings
+from app_pages import play_search, admin
 
 
 # ---- Page Configuration ----
@@ -27,6 +31,9 @@ st.set_page_config(layout="wide", page_title="Explore the NFL", page_icon="🏈"
 
 # ---- Load Apps/Pages ----
 
+# cache entries are read from the startup snapshot, if one was taken
+snapshot.attach()
+
 # Create an instance of the app
 app = MultiPage()
 
@@ -34,6 +41,17 @@ app = MultiPage()
 app.add_page("Home Page", home.app)
 app.add_page("Team Stats", team_stats.app)
 app.add_page("Quarterback Stats", quarterbacks.app)
+app.add_page("Receiver Stats", players.receivers)
+app.add_page("Running Back Stats", players.running_backs)
+app.add_page("Standings", league_standings.app)
+app.add_page("Play Search", play_search.app)
+# cache sizes and evictions are only for whoever runs the server
+if os.environ.get("NFL_ADMIN") == "1":
+    app.add_page("Memory (Admin)", admin.app)
 
 # The main app
-app.run()
+memory.begin_rerun()
+try:
+    app.run()
+finally:
+    memory.end_rerun()
@@ -0,0 +1,71 @@
+# %% ==== Package Imports ======================================================
+
+import streamlit as st
+import memory
+
+
+# ---- Units ----
+MB = 1024 * 1024
+
+
+def app():
+    # ==== Evict Entries =======================================================
+    with st.sidebar:
+        st.header("Evict Cached Entries")
+        cache = st.selectbox("Cache:", options=memory.caches())
+        keys = st.multiselect(
+            "Entries (all when empty):", options=memory.cache_keys(cache)
+        )
+        if st.button("Evict"):
+            memory.evict(cache, keys or None)
+            st.success(f"Evicted {len(keys) if keys else 'all'} from {cache}")
+
+        st.header("Allocations")
+        tracing = st.checkbox(
+            "Trace allocations",
+            value=memory.tracing(),
+            help="tracemalloc slows every rerun down while it is on.",
+        )
+        if tracing:
+            memory.start_tracing()
+        else:
+            memory.stop_tracing()
+
+    # ==== Process =============================================================
+    st.title("Memory")
+    with st.spinner("Measuring caches..."):
+        entries = memory.entries()
+    session_bytes = memory.deep_size(dict(st.session_state))
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+    with kpi1:
+        st.metric(label="Process RSS (MB)", value=round(memory.rss() / MB))
+    with kpi2:
+        st.metric(label="Cached (MB)", value=round(entries.bytes.sum() / MB))
+    with kpi3:
+        st.metric(label="Cached Entries", value=len(entries))
+    with kpi4:
+        st.metric(label="This Session (KB)", value=round(session_bytes / 1024))
+
+    # ==== Cached Entries ======================================================
+    st.subheader("Cached Entries")
+    st.caption(
+        "Data shared by several entries (e.g. a mapped season and its partitions) "
+        "is counted once, toward the first entry measured."
+    )
+    by_cache = entries.groupby("cache", sort=False).agg(
+        entries=("key", "size"), bytes=("bytes", "sum"), hits=("hits", "sum")
+    )
+    by_cache["MB"] = (by_cache.pop("bytes") / MB).round(1)
+    st.dataframe(by_cache.sort_values("MB", ascending=False))
+    entries["MB"] = (entries.pop("bytes") / MB).round(2)
+    entries["age (min)"] = (entries.pop("age") / 60).round(1)
+    st.dataframe(entries, use_container_width=True)
+
+    # ==== Allocations =========================================================
+    st.subheader("Top Allocations of the Last Rerun")
+    top = memory.last_rerun_allocations()
+    if top is None:
+        st.write("Turn on allocation tracing and rerun any page to see its allocations.")
+    else:
+        top["KB"] = (top.pop("bytes") / 1024).round(1)
+        st.dataframe(top, use_container_width=True)
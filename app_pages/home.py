@@ -1,4 +1,5 @@
 import streamlit as st
+import assets
 import funcs
 
 
@@ -16,7 +17,10 @@ def app():
             )
         with logo:
             st.image(
-                "https://raw.githubusercontent.com/nflverse/nflfastR-data/master/NFL.png",
+                assets.image(
+                    "https://raw.githubusercontent.com/nflverse/nflfastR-data/master/NFL.png",
+                    125,
+                ),
                 width=125,
             )
         st.write("---")
@@ -0,0 +1,69 @@
+# %% ==== Package Imports ======================================================
+
+import streamlit as st
+import funcs
+
+
+def _record(table, prefix=""):
+    wins, losses, ties = (table[f"{prefix}{x}"] for x in ("wins", "losses", "ties"))
+    record = wins.astype(str) + "-" + losses.astype(str)
+    return record.where(ties == 0, record + "-" + ties.astype(str))
+
+
+def app():
+    # ==== Collect Filters =====================================================
+    with st.sidebar:
+        st.header("Choose Your Filters")
+        seasons = reversed([x for x in range(2010, 2022)])
+        years = [st.selectbox("Select a Season:", options=seasons)]
+        # every week of the season is cached at once, so the slider only filters
+        weeks = funcs.get_standings(years).week
+        last_week = int(weeks.max()) if len(weeks) else 0
+        # a slider needs two weeks to choose from
+        through_week = last_week
+        if last_week > 1:
+            through_week = st.slider(
+                "Standings as of Week:", 1, last_week, value=last_week
+            )
+
+    if last_week == 0:
+        st.write(f"No games have been played in the {years[0]} season yet.")
+        return
+    table = funcs.get_standings(years, through_week)
+
+    # ==== Page Design =========================================================
+    st.title(f"{years[0]} Standings")
+    st.caption(
+        f"Regular season through week {through_week}. Ties in the standings are "
+        "broken by head-to-head, division and conference record, strength of "
+        "victory, strength of schedule and point differential."
+    )
+    view = table.assign(
+        Record=_record(table),
+        Division=_record(table, "division_"),
+        Conference=_record(table, "conference_"),
+        Pct=table.win_pct.round(3),
+        PF=table.points_for.astype(int),
+        PA=table.points_against.astype(int),
+        Diff=table.point_diff.astype(int),
+        Seed=table.conference_rank,
+    ).rename(columns={"team": "Team"})
+    columns = ["Team", "Record", "Pct", "Division", "Conference", "PF", "PA", "Diff"]
+
+    for conference, column in zip(["AFC", "NFC"], st.columns(2)):
+        with column:
+            st.subheader(conference)
+            teams = view[view.conference == conference]
+            for division, rows in teams.groupby("division", sort=True):
+                st.write(f"**{division}**")
+                st.dataframe(
+                    rows.sort_values("division_rank")[columns].set_index("Team"),
+                    use_container_width=True,
+                )
+            st.write("**Seeds**")
+            st.dataframe(
+                teams.sort_values("Seed")[["Seed", "Team", "Record", "division"]]
+                .rename(columns={"division": "Division"})
+                .set_index("Seed"),
+                use_container_width=True,
+            )
@@ -0,0 +1,85 @@
+# %% ==== Package Imports ======================================================
+
+import time
+
+import streamlit as st
+import dims
+import funcs
+import search
+import store
+
+
+# ---- Range Filters ----
+# column -> (slider label, slider bounds); a range is only searched once moved
+RANGES = {
+    "yards_gained": ("Yards Gained:", (-30, 99)),
+    "air_yards": ("Air Yards:", (-20, 70)),
+    "down": ("Down:", (1, 4)),
+    "qtr": ("Quarter:", (1, 5)),
+    "week": ("Week:", (1, 22)),
+}
+LIMIT = 500
+
+
+def app():
+    seasons = store.stored_seasons()
+    if not seasons:
+        st.title("Play Search")
+        st.warning("No seasons are stored yet; load some with `python store.py load`.")
+        return
+
+    # ==== Collect Filters =====================================================
+    with st.sidebar:
+        st.header("Search Plays")
+        if len(seasons) > 1:
+            first, last = st.select_slider(
+                "Seasons:", options=seasons, value=(seasons[0], seasons[-1])
+            )
+        else:
+            first = last = seasons[0]
+        years = [x for x in seasons if first <= x <= last]
+        words = st.text_input("Description has the words:", placeholder="deep left")
+        phrase = st.checkbox("In this order (exact phrase)")
+        any_option = ["Any"]
+        fields = {
+            "posteam": st.selectbox("Offense:", options=any_option + dims.TEAMS),
+            "defteam": st.selectbox("Defense:", options=any_option + dims.TEAMS),
+            "play_type": st.selectbox(
+                "Play Type:", options=any_option + dims.PLAY_TYPES
+            ),
+            "season_type": st.selectbox(
+                "Regular/Playoff Games:", options=any_option + dims.SEASON_TYPES
+            ),
+            "passer": st.text_input("Passer:", placeholder="P.Mahomes"),
+            "receiver": st.text_input("Receiver:", placeholder="T.Kelce"),
+            "rusher": st.text_input("Rusher:", placeholder="D.Henry"),
+        }
+        fields = {k: v.strip() for k, v in fields.items() if v.strip() not in ("", "Any")}
+        flags = st.multiselect(
+            "Only plays with:",
+            options=search.FLAGS,
+            format_func=lambda x: x.replace("_", " ").title(),
+        )
+        ranges = {}
+        for column, (label, bounds) in RANGES.items():
+            picked = st.slider(label, *bounds, value=bounds)
+            if picked != bounds:
+                # a bound left at the end of the slider is open
+                ranges[column] = tuple(
+                    None if x == y else x for x, y in zip(picked, bounds)
+                )
+
+    # ==== Page Design =========================================================
+    st.title("Play Search")
+    if not (words.strip() or fields or flags or ranges):
+        st.info("Enter words or choose a filter in the sidebar to search plays.")
+        return
+    start = time.perf_counter()
+    with st.spinner("Searching..."):
+        plays, total = funcs.search_plays(
+            years, words, fields, flags, ranges, phrase, limit=LIMIT
+        )
+    elapsed = (time.perf_counter() - start) * 1000
+    shown = f" (newest {LIMIT} shown)" if total > LIMIT else ""
+    st.caption(f"{total:,} plays{shown} in {first}–{last}, found in {elapsed:.0f} ms")
+    st.dataframe(plays, use_container_width=True)
@@ -0,0 +1,126 @@
+# %% ==== Package Imports ======================================================
+
+import plotly.express as px
+import streamlit as st
+import assets
+import funcs
+import players
+from app_pages import widgets
+
+
+# ---- Page Layouts ----
+# KPI rows are lists of (label, column of funcs.get_player_totals)
+PAGES = {
+    "receiver": {
+        "title": "Receiver Stats",
+        "select": "Select a Receiver (type to search):",
+        "kpis": [
+            [
+                ("Targets", "targets"),
+                ("Receptions", "receptions"),
+                ("Receiving Yds", "rec_yards"),
+                ("Receiving TD", "rec_td"),
+            ],
+            [
+                ("Catch %", "catch_rate"),
+                ("Yds/Rec", "yds_per_rec"),
+                ("Yds/Target", "yds_per_target"),
+                ("EPA/Target", "epa_per_target"),
+            ],
+        ],
+        "weekly": ("rec_yards", "Weekly Receiving Yards"),
+    },
+    "rusher": {
+        "title": "Running Back Stats",
+        "select": "Select a Rusher (type to search):",
+        "kpis": [
+            [
+                ("Carries", "carries"),
+                ("Rushing Yds", "rush_yards"),
+                ("Rushing TD", "rush_td"),
+                ("Fumbles Lost", "fumbles_lost"),
+            ],
+            [
+                ("Yds/Carry", "yds_per_carry"),
+                ("Success Rate", "success_rate"),
+                ("EPA/Carry", "epa_per_carry"),
+                ("Games", "games"),
+            ],
+        ],
+        "weekly": ("rush_yards", "Weekly Rushing Yards"),
+    },
+}
+
+
+def receivers():
+    player_page("receiver")
+
+
+def running_backs():
+    player_page("rusher")
+
+
+def player_page(position):
+    layout = PAGES[position]
+    team_info = funcs.get_team_info()
+
+    # ==== Collect Filters =====================================================
+    with st.sidebar:
+        st.header("Choose Your Filters")
+        seasons = reversed([x for x in range(2010, 2022)])
+        years = [st.selectbox("Select a Season:", options=seasons)]
+        totals = funcs.get_player_totals(years, position)
+        # players are listed busiest first
+        labels = totals.player_name.astype(str) + " (" + totals.team.astype(str) + ")"
+        player = totals.iloc[
+            st.selectbox(
+                layout["select"],
+                options=range(len(totals)),
+                format_func=lambda x: labels.iloc[x],
+            )
+        ]
+
+    # ==== Team Customs ========================================================
+    team = team_info[team_info.team_abbr == player.team]
+    color1 = team.team_color.values[0] if len(team) else None
+    rosters = funcs.get_rosters(years)
+    photo_url = rosters[rosters.player_id == player.player_id].headshot_url
+
+    # ==== Page Design =========================================================
+    photo, desc = st.columns([1, 1.5])
+    with photo:
+        st.image(
+            assets.image(photo_url.values[0] if len(photo_url) else None, 275),
+            width=275,
+        )
+    with desc:
+        st.title(layout["title"])
+        st.subheader(player.player_name)
+        st.write(f"Team: {player.team}")
+        st.write(f"Season: {years[0]}")
+
+    # counts are whole numbers, rates keep the digits they are rounded to
+    rates = players.POSITIONS[position]["rates"]
+    for row in layout["kpis"]:
+        with st.container():
+            for column, (label, stat) in zip(st.columns(len(row)), row):
+                with column:
+                    digits = rates[stat][3] if stat in rates else 0
+                    widgets.kpi(label, player[stat], digits=digits)
+        st.write("")
+
+    # ==== Weekly Chart ========================================================
+    stat, title = layout["weekly"]
+    weeks = funcs.get_player_weeks(years, position)
+    fig = px.bar(
+        data_frame=weeks[weeks.player_id == player.player_id],
+        title=title,
+        x="week",
+        y=stat,
+        color_discrete_sequence=[color1],
+        opacity=0.6,
+        labels={"week": "Week", stat: "Yards"},
+    )
+    fig.update_xaxes(showgrid=False,)
+    fig.update_yaxes(showgrid=False,)
+    st.plotly_chart(fig, config={"displayModeBar": False}, use_container_width=True)
@@ -4,8 +4,14 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import streamlit as st
+import analytics
+import assets
 import funcs
+import filters
+import similarity
+import trends
 import nfl_data_py as nfl
+from app_pages import widgets
 
 
 def app():
@@ -53,6 +59,8 @@ def app():
         player1_info = rosters[rosters.player_id == player1_id]
 
         team_info[team_info.team_abbr == playe1_team]
+    split = widgets.situation_filters()
+    widgets.export_buttons(["qb_stats", "passer_weeks", "passer_epa"], years)
     photo_url = rosters[rosters.player_id == player1_id]["headshot_url"].values[0]
     # st.write(player_id_df[player_id_df.name == selected_player_key])
     # st.write(rosters)
@@ -83,14 +91,22 @@ def app():
         "yards_after_catch",
         "receiver",
     ]
-    qb1_data = raw[(raw.passer_id == player1_id) & ((raw["qb_dropback"] == 1))][qb_cols]
+    passer_index = funcs.get_passer_index(years[0])
+    qb1_plays = filters.apply_split(raw.iloc[passer_index.get(player1_id, [])], split)
+    qb1_data = qb1_plays[qb_cols]
+    if split:
+        qb1_epa = analytics.build_passer_epa(qb1_plays)
+    else:
+        passer_epa = funcs.get_passer_epa(years)
+        qb1_epa = passer_epa[passer_epa.passer_id == player1_id]
+    epa_per_dropback, success_rate, cpoe = analytics.passer_epa_stats(qb1_epa)
 
     # ==== Page Design =========================================================
 
     # st.subheader(f"Pass Plays for {selected_player_key} in {years[0]}")
     photo, desc = st.columns([1, 1.5])
     with photo:
-        st.image(photo_url, width=275)
+        st.image(assets.image(photo_url, 275), width=275)
     with desc:
         st.subheader(selected_player_key)
         st.write(f"Height: {player1_info.height.values[0]} inches")
@@ -120,9 +136,7 @@ def app():
                 label="Passing Yds", value=pass_yds,
             )
         with kpi2:
-            st.metric(
-                label="Yds/Pass", value=yds_per_att,
-            )
+            widgets.kpi("Yds/Pass", yds_per_att)
         with kpi3:
             st.metric(
                 label="Attemps",
@@ -164,9 +178,7 @@ def app():
     with st.container():
         kpi1, kpi2, kpi3, kpi4 = st.columns(4)
         with kpi1:
-            st.metric(
-                label="Completion %", value=comp_perc,
-            )
+            widgets.kpi("Completion %", comp_perc)
         with kpi2:
             st.metric(
                 label="20+ Yds", value=over_20,
@@ -178,16 +190,28 @@ def app():
                 # delta=f"{round(avg_points - comparison_points,1)} vs {comparison}",
             )
         with kpi4:
-            st.metric(
-                "Longest Pass",
-                value=long_pass,
-                # delta=f"{round(avg_points_against - comparison_points_against,1)} vs {comparison}",
-                # delta_color="inverse",
-            )
+            widgets.kpi("Longest Pass", long_pass, digits=0)
+    st.write("")
+    with st.container():
+        kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+        with kpi1:
+            widgets.kpi("EPA/Dropback", epa_per_dropback, digits=3)
+        with kpi2:
+            widgets.kpi("Success Rate", success_rate)
+        with kpi3:
+            widgets.kpi("CPOE", cpoe)
 
     # ==== Weekly Passing Chart ================================================
+    if split:
+        # passer_weeks holds every play, so split weeks come from the plays
+        player_weeks = qb1_data.groupby("week", as_index=False)[
+            ["yards_after_catch", "air_yards"]
+        ].sum()
+    else:
+        passer_weeks = funcs.get_passer_weeks(years)
+        player_weeks = passer_weeks[passer_weeks.passer_id == player1_id]
     weekly_passing = pd.melt(
-        qb1_data.groupby("week")["yards_after_catch", "air_yards"].sum().reset_index(),
+        player_weeks[["week", "yards_after_catch", "air_yards"]],
         id_vars="week",
         var_name="Yards Type",
         value_vars=["air_yards", "yards_after_catch"],
@@ -212,4 +236,29 @@ def app():
     fig.update_yaxes(showgrid=False,)
     st.plotly_chart(fig, config={"displayModeBar": False}, use_container_width=True)
 
+    # ==== Weekly Trends =======================================================
+    widgets.trend_chart(
+        lambda window: funcs.get_qb_trends(years, window),
+        trends.QB_METRICS,
+        lambda qb_trends, metric: qb_trends[qb_trends.passer_id == player1_id][
+            ["week", metric]
+        ].assign(line=selected_player_key),
+        [color1],
+        split,
+    )
+
     # st.write(qb1_data)
+
+    # ==== Similar QB Seasons ==================================================
+    # the index is built by snapshot.py; without it the section is left out
+    index = funcs.get_similarity_index("qb")
+    if index is not None:
+        with st.expander("Most Similar QB Seasons"):
+            if st.checkbox("Find similar QB seasons"):
+                if (years[0], player1_id) in index:
+                    st.dataframe(index.query((years[0], player1_id), k=5).round(2))
+                else:
+                    st.write(
+                        f"{selected_player_key} had fewer than"
+                        f" {similarity.MIN_DROPBACKS} dropbacks in {years[0]}."
+                    )
@@ -4,8 +4,12 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import streamlit as st
+import assets
 import funcs
+import filters
+import trends
 import nfl_data_py as nfl
+from app_pages import widgets
 
 
 def app():
@@ -45,6 +49,13 @@ def app():
             comp_abb = "All NFL"
         else:
             comp_abb = team_dict[comparison]
+    split = widgets.situation_filters()
+    widgets.export_buttons(
+        ["team_kpis", "league_baselines", "team_weeks", "team_epa", "games", "drives"],
+        years,
+        game_type_pick,
+        team_abb,
+    )
 
     # ==== Team Customs ========================================================
     # url_logo = team_info[team_info.team_nick == selected_team].team_logo_espn.values[0]
@@ -60,128 +71,145 @@ def app():
         st.header("Team Stats and Performance")
         st.write("Use the filters in the sidebar to explore.")
     with wordmark:
-        st.image(url_team_wordmark, width=300)
+        st.image(assets.image(url_team_wordmark, 300), width=300)
     st.write("---")
 
     # ==== Data Import and Filtering ===========================================
 
-    # Import raw data
-    raw = funcs.get_raw_pbp(years)
+    # Import raw data partitions and the per game tables built from it
+    parts = funcs.get_partitions(years)
+    games = funcs.get_games(years)
+    cube = funcs.get_team_cube(years)
 
-    # Filter data based on game type
-    if game_type_pick == "Regular Season":
-        data = raw[raw.season_type == "REG"]
-    elif game_type_pick == "Playoffs":
-        data = raw[raw.season_type == "POST"]
-    else:
-        data = raw.copy()
+    # Filter the per game tables based on game type
+    games = funcs.game_type_filter(games, game_type_pick)
+    cube = funcs.game_type_filter(cube, game_type_pick)
 
-    if team_dict[selected_team] not in data.posteam.unique():
+    if not parts.has_team(team_abb, game_type_pick):
         st.write(
             f"The selected team does not have any games in the {years[0]} {game_type_pick}"
         )
     else:
         # ---- Team Data Filtering ----
-        team_data = funcs.team_season_filter(data, team_abb)
+        team_data = parts.team_plays(team_abb, game_type_pick, split=split)
+        if split:
+            # the cube is per game, so split yards come from the plays
+            cube = funcs.offense_yards(team_data)
+        team_cube = cube[cube.team == team_abb]
+        team_kpis = funcs.get_team_kpis(years, game_type_pick, team_abb, split)
+        team_kpis = team_kpis.iloc[0]
+        if comparison == "All NFL":
+            compare_kpis = funcs.get_league_baselines(years, game_type_pick, split)
+        else:
+            compare_kpis = funcs.get_team_kpis(years, game_type_pick, comp_abb, split)
+        compare_kpis = compare_kpis.iloc[0]
 
         # ==== High Level Stats ================================================
         with st.container():  # ---- Row 1 ----
-            season_games = (
-                team_data.groupby(["week", "home_team", "away_team"])[
-                    "home_score", "away_score"
-                ]
-                .max()
-                .reset_index()
-            )
             st.subheader(f"{game_type_pick} - {years[0]}")
+            if split:
+                st.caption(f"Situation: {filters.describe_split(split)}")
 
             # ---- Get data for KPIs ----
-            wins, losses, avg_points, avg_points_against = funcs.season_kpis(
-                season_games, team_abb
-            )
-            comparison_points, comparison_points_against = funcs.avg_score(
-                data, team_dict, comparison
-            )
+            wins, losses, avg_points, avg_points_against = team_kpis[
+                ["wins", "losses", "avg_points", "avg_points_against"]
+            ]
+            comparison_points, comparison_points_against = compare_kpis[
+                ["avg_points", "avg_points_against"]
+            ]
 
             # ---- Create KPI visuals ----
             kpi1, kpi2, kpi3, kpi4 = st.columns(4)
             with kpi1:
-                st.metric(
-                    label="Wins", value=wins,
-                )
+                widgets.kpi("Wins", wins, digits=0)
             with kpi2:
-                st.metric(
-                    label="Losses", value=losses,
-                )
+                widgets.kpi("Losses", losses, digits=0)
             with kpi3:
-                st.metric(
-                    label="Avg Points",
-                    value=avg_points,
-                    delta=f"{round(avg_points - comparison_points,1)} vs {comparison}",
+                widgets.kpi(
+                    "Avg Points",
+                    avg_points,
+                    comparison_points,
+                    comparison,
+                    digits=1,
                 )
             with kpi4:
-                st.metric(
+                widgets.kpi(
                     "Avg Points Against",
-                    value=avg_points_against,
-                    delta=f"{round(avg_points_against - comparison_points_against,1)} vs {comparison}",
+                    avg_points_against,
+                    comparison_points_against,
+                    comparison,
+                    digits=1,
                     delta_color="inverse",
                 )
         st.write("")
         with st.container():  # ---- Row 2 ----
             kpi1, kpi2, kpi3, kpi4 = st.columns(4)
             with kpi1:  # Total Yards
-                st.metric(
-                    label="Total Yds",
-                    value=round(
-                        team_data[
-                            team_data.posteam == team_dict[selected_team]
-                        ].yards_gained.sum()
-                    ),
-                )
+                widgets.kpi("Total Yds", team_kpis.total_yds, digits=0)
             with kpi2:  # yards/game
-                st.metric(
-                    label="Yds/Game",
-                    value=round(
-                        team_data[team_data.posteam == team_dict[selected_team]]
-                        .groupby("week")["yards_gained"]
-                        .sum()
-                        .reset_index()
-                        .yards_gained.mean()
-                    ),
-                )
+                widgets.kpi("Yds/Game", team_kpis.yds_per_game, digits=0)
             with kpi3:  # rushing yards
-                st.metric(
-                    label="Rushing Yds",
-                    value=round(
-                        team_data[
-                            (team_data.posteam == team_dict[selected_team])
-                            & (team_data.play_type == "run")
-                        ].yards_gained.sum()
-                    ),
-                )
+                widgets.kpi("Rushing Yds", team_kpis.rush_yds, digits=0)
             with kpi4:  # passing yards
-                st.metric(
-                    label="Passing Yds",
-                    value=round(
-                        team_data[
-                            (team_data.posteam == team_dict[selected_team])
-                            & (team_data.play_type == "pass")
-                        ].yards_gained.sum()
-                    ),
+                widgets.kpi("Passing Yds", team_kpis.pass_yds, digits=0)
+        st.write("")
+        with st.container():  # ---- Row 3: Opponent Adjusted ----
+            # league average is 0 for every rating, so "All NFL" compares to 0
+            team_ratings = funcs.get_team_ratings(years, game_type_pick).set_index(
+                "team"
+            )
+            # teams without games in the selection have no ratings
+            rating = team_ratings.reindex([team_abb]).iloc[0]
+            # ratings the games do not pin down yet are not shown
+            adjusted = ["srs", "sos", "epa_srs"]
+            determined = pd.notna(rating.determined) and bool(rating.determined)
+            if not determined:
+                rating[adjusted] = np.nan
+            if comparison == "All NFL":
+                compare_rating = pd.Series(0.0, index=team_ratings.columns)
+            else:
+                compare_rating = team_ratings.reindex([comp_abb]).iloc[0]
+                if not determined:
+                    compare_rating[adjusted] = np.nan
+            kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+            with kpi1:  # Simple rating system
+                widgets.kpi(
+                    f"SRS (#{int(rating['rank'])})" if determined else "SRS",
+                    rating.srs,
+                    compare_rating.srs,
+                    comparison,
+                )
+            with kpi2:  # Strength of schedule
+                widgets.kpi(
+                    "Strength of Schedule", rating.sos, compare_rating.sos, comparison
+                )
+            with kpi3:  # Margin of victory
+                widgets.kpi("Avg Margin", rating.margin, compare_rating.margin, comparison)
+            with kpi4:  # EPA based rating
+                widgets.kpi(
+                    "EPA/Play SRS",
+                    rating.epa_srs,
+                    compare_rating.epa_srs,
+                    comparison,
+                    digits=3,
+                )
+            if not determined and pd.notna(rating.determined):
+                st.caption(
+                    "Opponent adjusted ratings need games linking every team, "
+                    "so they are not shown yet for this selection."
                 )
         with st.container():  # Weekly Summary Plot
-            plot_data = (
-                team_data[
-                    (team_data.posteam == team_dict[selected_team])
-                    & ((team_data.play_type == "run") | (team_data.play_type == "pass"))
-                ][["week", "play_type", "yards_gained"]]
-                .groupby(["week", "play_type"])
-                .sum()
-                .reset_index()
+            plot_data = pd.melt(
+                team_cube[["week", "pass_yards", "rush_yards"]].rename(
+                    columns={"pass_yards": "pass", "rush_yards": "run"}
+                ),
+                id_vars="week",
+                var_name="play_type",
+                value_name="yards_gained",
+            )
+            game_data = funcs.team_season_filter(games, team_abb).set_index(
+                "week", drop=False
             )
-            game_data = team_data.groupby("week")[
-                ["week", "home_team", "away_team", "posteam"]
-            ].max()
             y_height = plot_data.groupby("week")["yards_gained"].sum()
 
             fig = px.bar(  # Yards/game barchart
@@ -217,7 +245,7 @@ def app():
                 # need a try/except block since by weeks will cause a KeyError
                 try:
                     fig.add_layout_image(
-                        source=str(val),
+                        source=assets.data_uri(val, 64),
                         xref="x",
                         yref="y",
                         x=key,
@@ -235,6 +263,65 @@ def app():
                 fig, config={"displayModeBar": False}, use_container_width=True
             )
 
+        with st.container():  # Weekly Trends
+
+            def trend_lines(team_trends, metric):
+                lines = [
+                    team_trends[team_trends.team == team_abb].assign(line=selected_team)
+                ]
+                if comparison == "All NFL":
+                    league = team_trends.groupby("week", as_index=False)[metric].mean()
+                    lines.append(league.assign(line="NFL Average"))
+                else:
+                    lines.append(
+                        team_trends[team_trends.team == comp_abb].assign(line=comparison)
+                    )
+                return pd.concat(lines)[["week", metric, "line"]]
+
+            widgets.trend_chart(
+                lambda window: funcs.get_team_trends(years, game_type_pick, window),
+                trends.TEAM_METRICS,
+                trend_lines,
+                [color1, "gray"],
+                split,
+            )
+
+        with st.container():  # Game Timeline
+            game_week = st.selectbox(
+                "Game Timeline:",
+                options=list(game_data.week),
+                format_func=lambda x: f"Week {x} vs "
+                + str(
+                    game_data.loc[x, "away_team"]
+                    if game_data.loc[x, "home_team"] == team_abb
+                    else f"@ {game_data.loc[x, 'home_team']}"
+                ),
+            )
+            timeline = funcs.get_game_timeline(
+                years, game_data.loc[game_week, "game_id"], team_abb
+            )
+            fig = px.line(
+                timeline,
+                title="Win Probability",
+                x="play",
+                y="win_prob",
+                hover_data=["qtr", "team_score", "opp_score"],
+                color_discrete_sequence=[color1],
+                labels={
+                    "play": "Play",
+                    "win_prob": "Win Probability (%)",
+                    "qtr": "Quarter",
+                    "team_score": team_abb,
+                    "opp_score": "Opponent",
+                },
+            )
+            fig.add_hline(y=50, line_dash="dot", line_color="gray")
+            fig.update_xaxes(showgrid=False,)
+            fig.update_yaxes(showgrid=False, range=[0, 100])
+            st.plotly_chart(
+                fig, config={"displayModeBar": False}, use_container_width=True
+            )
+
         # --- Miscellaneous ----
         # Plays, 1st downs, 3rd down conversion rate, redzone appearances, TD, FG
 
@@ -249,64 +336,67 @@ def app():
                     pass_yards,
                     pass_td,
                     interceptions,
-                ) = funcs.team_pass_stats(team_data, team_abb)
-                # Get League Passing Stats
-                if comparison == "All NFL":
-                    (
-                        comparison_pass_attempts,
-                        comparison_comp_perc,
-                        comparison_pass_yards,
-                        comparison_pass_tds,
-                        comparison_interceptions,
-                    ) = funcs.league_avg_pass_stats(data)
-                else:
-                    (
-                        comparison_pass_attempts,
-                        comparison_comp_perc,
-                        comparison_pass_yards,
-                        comparison_pass_tds,
-                        comparison_interceptions,
-                    ) = funcs.team_pass_stats(data, comp_abb)
+                ) = team_kpis[funcs.PASS_STATS]
+                # Get League or Comparison Team Passing Stats
+                (
+                    comparison_pass_attempts,
+                    comparison_comp_perc,
+                    comparison_pass_yards,
+                    comparison_pass_tds,
+                    comparison_interceptions,
+                ) = compare_kpis[funcs.PASS_STATS]
 
                 # Create KPI layout
                 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
                 # Fill KPI containers
                 with kpi1:  # Attempts
-                    st.metric(
-                        label="Attempts",
-                        value=pass_attempts,
-                        delta=f"{pass_attempts - comparison_pass_attempts} vs {comparison}",
+                    widgets.kpi(
+                        "Attempts",
+                        pass_attempts,
+                        comparison_pass_attempts,
+                        comparison,
+                        digits=0,
                     )
                 with kpi2:  # Completion %
-                    st.metric(
-                        label="Completion %",
-                        value=comp_perc,
-                        delta=f"{round(comp_perc - comparison_comp_perc, 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Completion %",
+                        comp_perc,
+                        comparison_comp_perc,
+                        comparison,
+                        digits=1,
                     )
                 with kpi3:  # Yards
-                    st.metric(
-                        label="Passing Yds",
-                        value=pass_yards,
-                        delta=f"{pass_yards - comparison_pass_yards} vs {comparison}",
+                    widgets.kpi(
+                        "Passing Yds",
+                        pass_yards,
+                        comparison_pass_yards,
+                        comparison,
+                        digits=0,
                     )
                 with kpi4:  # TD
-                    st.metric(
-                        label="Touchdowns",
-                        value=pass_td,
-                        delta=f"{pass_td - comparison_pass_tds} vs {comparison}",
+                    widgets.kpi(
+                        "Touchdowns",
+                        pass_td,
+                        comparison_pass_tds,
+                        comparison,
+                        digits=0,
                     )
                 with kpi5:  # Interceptions
-                    st.metric(
-                        label="Interceptions",
-                        value=interceptions,
-                        delta=f"{interceptions - comparison_interceptions} vs {comparison}",
+                    widgets.kpi(
+                        "Interceptions",
+                        interceptions,
+                        comparison_interceptions,
+                        comparison,
+                        digits=0,
                         delta_color="inverse",
                     )
 
                 pos_data = (
-                    funcs.posteam_data(
-                        data[["posteam", "complete_pass", "yardline_100"]], team_abb,
-                    )
+                    parts.team_plays(
+                        team_abb, game_type_pick, roles=("posteam",), split=split
+                    )[
+                        ["complete_pass", "yardline_100"]
+                    ]
                     .groupby("yardline_100")["complete_pass"]
                     .agg(["mean", "count"])
                     .reset_index()
@@ -342,56 +432,57 @@ def app():
                     avg_pass_length,
                     yds_after_catch,
                     rec_td,
-                ) = funcs.team_rec_stats(team_data, team_abb)
-                if comparison == "All NFL":
-                    (
-                        comparison_rec,
-                        comparison_rec_yds,
-                        comparison_pass_length,
-                        comparison_yac,
-                        comparison_rec_td,
-                    ) = funcs.league_avg_rec_stats(data)
-                else:
-                    (
-                        comparison_rec,
-                        comparison_rec_yds,
-                        comparison_pass_length,
-                        comparison_yac,
-                        comparison_rec_td,
-                    ) = funcs.team_rec_stats(data, comp_abb)
+                ) = team_kpis[funcs.REC_STATS]
+                (
+                    comparison_rec,
+                    comparison_rec_yds,
+                    comparison_pass_length,
+                    comparison_yac,
+                    comparison_rec_td,
+                ) = compare_kpis[funcs.REC_STATS]
 
                 # Create KPI layout
                 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
                 # Fill KPI containers
                 with kpi1:  # Receptions
-                    st.metric(
-                        label="Receptions",
-                        value=receptions,
-                        delta=f"{receptions - comparison_rec} vs {comparison}",
+                    widgets.kpi(
+                        "Receptions",
+                        receptions,
+                        comparison_rec,
+                        comparison,
+                        digits=0,
                     )
                 with kpi2:  # Avg Rec Yds
-                    st.metric(
-                        label="Yds/Pass",
-                        value=avg_rec_yds,
-                        delta=f"{round(avg_rec_yds - comparison_rec_yds, 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Yds/Pass",
+                        avg_rec_yds,
+                        comparison_rec_yds,
+                        comparison,
+                        digits=1,
                     )
                 with kpi3:  # Avg Pass Length
-                    st.metric(
-                        label="Pass Distance",
-                        value=avg_pass_length,
-                        delta=f"{round(avg_pass_length - comparison_pass_length, 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Pass Distance",
+                        avg_pass_length,
+                        comparison_pass_length,
+                        comparison,
+                        digits=1,
                     )
                 with kpi4:  # Yds After Catch
-                    st.metric(
-                        label="Yds After Catch",
-                        value=yds_after_catch,
-                        delta=f"{round(yds_after_catch -  comparison_yac,1)} vs {comparison}",
+                    widgets.kpi(
+                        "Yds After Catch",
+                        yds_after_catch,
+                        comparison_yac,
+                        comparison,
+                        digits=1,
                     )
                 with kpi5:  # Rec TD
-                    st.metric(
-                        label="Rec TD",
-                        value=rec_td,
-                        delta=f"{rec_td - comparison_rec_td} vs {comparison}",
+                    widgets.kpi(
+                        "Rec TD",
+                        rec_td,
+                        comparison_rec_td,
+                        comparison,
+                        digits=0,
                     )
                 st.write("")
                 st.write("---")
@@ -399,96 +490,147 @@ def app():
             with st.container():  # ---- Rushing ----
                 st.subheader("Rushing Stats")
                 # rushes, Yds, TD, avg run length (dist)
-                rushes, avg_rush_length, rush_yards, rush_td = funcs.team_rush_stats(
-                    team_data, team_abb
-                )
-                if comparison == "All NFL":
-                    (
-                        comparison_rushes,
-                        comparison_rush_length,
-                        comparison_rush_yds,
-                        comparison_rush_td,
-                    ) = funcs.league_avg_rush_stats(data)
-                else:
-                    (
-                        comparison_rushes,
-                        comparison_rush_length,
-                        comparison_rush_yds,
-                        comparison_rush_td,
-                    ) = funcs.team_rush_stats(data, comp_abb)
+                rushes, avg_rush_length, rush_yards, rush_td = team_kpis[
+                    funcs.RUSH_STATS
+                ]
+                (
+                    comparison_rushes,
+                    comparison_rush_length,
+                    comparison_rush_yds,
+                    comparison_rush_td,
+                ) = compare_kpis[funcs.RUSH_STATS]
                 # Create KPI layout
                 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
                 # Fill KPI containers
                 with kpi1:  # Rushes
-                    st.metric(
-                        label="Rushes",
-                        value=rushes,
-                        delta=f"{rushes - comparison_rushes} vs {comparison}",
+                    widgets.kpi(
+                        "Rushes",
+                        rushes,
+                        comparison_rushes,
+                        comparison,
+                        digits=0,
                     )
                 with kpi2:  # Rush Length
-                    st.metric(
-                        label="Avg Rush",
-                        value=avg_rush_length,
-                        delta=f"{round(avg_rush_length - comparison_rush_length, 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Avg Rush",
+                        avg_rush_length,
+                        comparison_rush_length,
+                        comparison,
+                        digits=1,
                     )
                 with kpi3:  # Total Rush Yards
-                    st.metric(
-                        label="Total Rushing",
-                        value=rush_yards,
-                        delta=f"{round(rush_yards - comparison_rush_yds, 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Total Rushing",
+                        rush_yards,
+                        comparison_rush_yds,
+                        comparison,
+                        digits=0,
                     )
                 with kpi4:  # Rushing TD
-                    st.metric(
-                        label="Rushing TD",
-                        value=rush_td,
-                        delta=f"{round(rush_td -  comparison_rush_td,1)} vs {comparison}",
+                    widgets.kpi(
+                        "Rushing TD",
+                        rush_td,
+                        comparison_rush_td,
+                        comparison,
+                        digits=0,
+                    )
+                st.write("---")
+
+            with st.container():  # ---- Advanced ----
+                st.subheader("Advanced Stats")
+                # Create KPI layout
+                kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
+                # Fill KPI containers
+                with kpi1:  # EPA per play
+                    widgets.kpi(
+                        "EPA/Play",
+                        team_kpis.epa_per_play,
+                        compare_kpis.epa_per_play,
+                        comparison,
+                        digits=3,
+                    )
+                with kpi2:  # Success rate
+                    widgets.kpi(
+                        "Success Rate",
+                        team_kpis.success_rate,
+                        compare_kpis.success_rate,
+                        comparison,
+                        digits=1,
+                    )
+                with kpi3:  # EPA per dropback
+                    widgets.kpi(
+                        "EPA/Dropback",
+                        team_kpis.pass_epa,
+                        compare_kpis.pass_epa,
+                        comparison,
+                        digits=3,
+                    )
+                with kpi4:  # EPA per rush
+                    widgets.kpi(
+                        "EPA/Rush",
+                        team_kpis.rush_epa,
+                        compare_kpis.rush_epa,
+                        comparison,
+                        digits=3,
+                    )
+                with kpi5:  # Completion % over expected
+                    widgets.kpi(
+                        "CPOE",
+                        team_kpis.cpoe,
+                        compare_kpis.cpoe,
+                        comparison,
+                        digits=1,
                     )
 
         # ==== Defensive Stats =====================================================
         with st.expander("Defense"):
-            def_data = team_data[team_data.defteam == team_abb]
-            team_def = funcs.team_def_stats(def_data)
-            if comp_abb == "All NFL":
-                compare_def = funcs.league_def_stats(data)
-            else:
-                comp_data = funcs.team_season_filter(data, comp_abb)
-                comp_def = comp_data[comp_data.defteam == comp_abb]
-                compare_def = funcs.team_def_stats(comp_def)
+            team_def = team_kpis
+            compare_def = compare_kpis
             st.subheader("Overall Defensive Stats")
             with st.container():
                 # Create KPI layout
                 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
                 # Fill KPI containers
                 with kpi1:  # Tackles
-                    st.metric(
-                        label="Tackles",
-                        value=team_def["tackles"],
-                        delta=f"{int(team_def['tackles'])-int(compare_def['tackles'])} vs {comparison}",
+                    widgets.kpi(
+                        "Tackles",
+                        team_def.tackles,
+                        compare_def.tackles,
+                        comparison,
+                        digits=0,
                     )
                 with kpi2:  # Sacks
-                    st.metric(
-                        label="Sacks",
-                        value=team_def["sacks"],
-                        delta=f"{round(int(team_def.sacks) - int(compare_def.sacks), 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Sacks",
+                        team_def.sacks,
+                        compare_def.sacks,
+                        comparison,
+                        digits=0,
                     )
                 with kpi3:  # Yards Allowed
-                    st.metric(
-                        label="Yds Allowed",
-                        value=team_def["yds_allowed"],
-                        delta=f"{round(int(team_def.yds_allowed) - int(compare_def.yds_allowed))} vs {comparison}",
+                    widgets.kpi(
+                        "Yds Allowed",
+                        team_def.yds_allowed,
+                        compare_def.yds_allowed,
+                        comparison,
+                        digits=0,
                         delta_color="inverse",
                     )
                 with kpi4:  # Turnovers
-                    st.metric(
-                        label="Turnovers",
-                        value=team_def["turnovers"],
-                        delta=f"{round(int(team_def.turnovers) - int(compare_def.turnovers))} vs {comparison}",
+                    widgets.kpi(
+                        "Turnovers",
+                        team_def.turnovers,
+                        compare_def.turnovers,
+                        comparison,
+                        digits=0,
                     )
                 with kpi5:  # Touchdowns
-                    st.metric(
-                        label="Touchdowns",
-                        value=team_def["td"],
-                        delta=f"{int(team_def.td) - int(compare_def.td)} vs {comparison}",
+                    widgets.kpi(
+                        "Touchdowns",
+                        team_def.td,
+                        compare_def.td,
+                        comparison,
+                        digits=0,
                     )
             st.write("")
             with st.container():
@@ -496,35 +638,94 @@ def app():
                 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
                 # Fill KPI containers
                 with kpi1:  # Tackles for loss
-                    st.metric(
-                        label="Tackles for Loss",
-                        value=team_def["tfl"],
-                        delta=f"{int(team_def.tfl) - int(compare_def.tfl)} vs {comparison}",
+                    widgets.kpi(
+                        "Tackles for Loss",
+                        team_def.tfl,
+                        compare_def.tfl,
+                        comparison,
+                        digits=0,
                     )
                 with kpi2:  # Sacks/Game
-                    st.metric(
-                        label="Sacks/Game",
-                        value=team_def["sacks_per_game"],
-                        delta=f"{round(int(team_def.sacks_per_game) - int(compare_def.sacks_per_game), 1)} vs {comparison}",
+                    widgets.kpi(
+                        "Sacks/Game",
+                        team_def.sacks_per_game,
+                        compare_def.sacks_per_game,
+                        comparison,
+                        digits=1,
                     )
                 with kpi3:  # Yards Allowed per game
-                    st.metric(
-                        label="Yds Allowed/Game",
-                        value=team_def["yds_given_per_game"],
-                        delta=f"{int(team_def.yds_given_per_game) - int(compare_def.yds_given_per_game)} vs {comparison}",
+                    widgets.kpi(
+                        "Yds Allowed/Game",
+                        team_def.yds_given_per_game,
+                        compare_def.yds_given_per_game,
+                        comparison,
+                        digits=0,
                         delta_color="inverse",
                     )
                 with kpi4:  # 3rd Down %
-                    st.metric(
-                        label="3rd Down Stop %",
-                        value=team_def["third_perc"],
-                        delta=f"{round(float(team_def.third_perc) - float(compare_def.third_perc),1)} vs {comparison}",
+                    widgets.kpi(
+                        "3rd Down Stop %",
+                        team_def.third_perc,
+                        compare_def.third_perc,
+                        comparison,
+                        digits=1,
                     )
                 with kpi5:  # Goal Line Stand %
-                    st.metric(
-                        label="GL Stand %",
-                        value=team_def["gl_stand_perc"],
-                        delta=f"{round(float(team_def.gl_stand_perc) - float(compare_def.gl_stand_perc),1)} vs {comparison}",
+                    widgets.kpi(
+                        "GL Stand %",
+                        team_def.gl_stand_perc,
+                        compare_def.gl_stand_perc,
+                        comparison,
+                        digits=1,
+                    )
+            st.write("")
+            with st.container():
+                # Create KPI layout
+                kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
+                # Fill KPI containers
+                with kpi1:  # Red Zone TD % Allowed
+                    widgets.kpi(
+                        "Red Zone TD % Allowed",
+                        team_def.rz_td_perc,
+                        compare_def.rz_td_perc,
+                        comparison,
+                        digits=1,
+                        delta_color="inverse",
+                    )
+                with kpi2:  # Points per Drive Allowed
+                    widgets.kpi(
+                        "Pts/Drive Allowed",
+                        team_def.pts_per_drive,
+                        compare_def.pts_per_drive,
+                        comparison,
+                        digits=2,
+                        delta_color="inverse",
+                    )
+                with kpi3:  # Three and Outs
+                    widgets.kpi(
+                        "Three and Outs",
+                        team_def.three_and_outs,
+                        compare_def.three_and_outs,
+                        comparison,
+                        digits=0,
+                    )
+                with kpi4:  # EPA per play allowed
+                    widgets.kpi(
+                        "EPA/Play Allowed",
+                        team_def.def_epa_per_play,
+                        compare_def.def_epa_per_play,
+                        comparison,
+                        digits=3,
+                        delta_color="inverse",
+                    )
+                with kpi5:  # Success rate allowed
+                    widgets.kpi(
+                        "Success Rate Allowed",
+                        team_def.def_success_rate,
+                        compare_def.def_success_rate,
+                        comparison,
+                        digits=1,
+                        delta_color="inverse",
                     )
 
             # ---- Pass Defense ----
@@ -533,3 +734,14 @@ def app():
 
             # ---- Turnovers ----
             # Int, Forced Fumbles, Fumble Recoveries
+
+        # ==== Similar Team Seasons ================================================
+        # the index is built by snapshot.py; without it the section is left out
+        index = funcs.get_similarity_index("team")
+        if index is not None:
+            with st.expander("Most Similar Team Seasons"):
+                if st.checkbox("Find similar team seasons"):
+                    if (years[0], team_abb) in index:
+                        st.dataframe(index.query((years[0], team_abb), k=5).round(2))
+                    else:
+                        st.write(f"No regular season for {team_abb} in {years[0]}.")
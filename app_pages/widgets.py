@@ -0,0 +1,122 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+import export
+import filters
+import funcs
+import memory
+import trends
+
+
+def kpi(label, value, compare=None, comparison=None, digits=1, delta_color="normal"):
+    """
+    st.metric of value rounded to digits, with its difference to compare as
+    the delta when a comparison name is given. Missing values (no games or
+    plays for the selection) show as n/a instead of failing the page.
+    """
+    if pd.isna(value):
+        st.metric(label=label, value="n/a")
+        return
+    value = round(float(value), digits) if digits else int(round(value))
+    delta = None
+    if comparison is not None and not pd.isna(compare):
+        difference = value - compare
+        difference = round(difference, digits) if digits else int(round(difference))
+        delta = f"{difference} vs {comparison}"
+    st.metric(label=label, value=value, delta=delta, delta_color=delta_color)
+
+
+def situation_filters():
+    """
+    Sidebar widgets for situational splits (down, quarter, score, field position,
+    formation). Returns a split for filters.make_split, empty when every widget
+    is left at its default.
+    """
+    flags = {"Any": None, "Yes": 1, "No": 0}
+    with st.sidebar.expander("Situation"):
+        downs = st.multiselect("Down:", options=[1, 2, 3, 4])
+        quarters = st.multiselect(
+            "Quarter:",
+            options=[1, 2, 3, 4, 5],
+            format_func=lambda x: "OT" if x == 5 else str(x),
+        )
+        score = st.slider("Score Differential:", -40, 40, (-40, 40))
+        field = st.slider("Yards from End Zone:", 1, 99, (1, 99))
+        shotgun = st.selectbox("Shotgun:", options=list(flags))
+        no_huddle = st.selectbox("No Huddle:", options=list(flags))
+
+    return filters.make_split(
+        down=downs,
+        qtr=quarters,
+        score_differential=None if score == (-40, 40) else score,
+        yardline_100=None if field == (1, 99) else field,
+        shotgun=flags[shotgun],
+        no_huddle=flags[no_huddle],
+    )
+
+
+def trend_chart(load, metrics, lines, colors, split=()):
+    """
+    Line chart of a rolling or season to date metric with its own metric and
+    window pickers.
+
+    params:
+        load (function): window -> funcs.get_team_trends or get_qb_trends rows.
+        metrics (dict): trends.TEAM_METRICS or trends.QB_METRICS.
+        lines (function): trend rows, metric -> dataframe of week, the metric
+            and a "line" column naming each line drawn.
+        colors (list): line colors in the order lines names them.
+        split: the page's situation split; trends always cover every play.
+    """
+    metric_col, window_col = st.columns(2)
+    with metric_col:
+        metric = st.selectbox(
+            "Trend:", options=list(metrics), format_func=trends.LABELS.get
+        )
+    with window_col:
+        window = st.selectbox("Trend Window:", options=list(trends.WINDOWS))
+    data = lines(load(trends.WINDOWS[window]), metric)
+    fig = px.line(
+        data_frame=data,
+        title=f"{trends.LABELS[metric]} - {window}",
+        x="week",
+        y=metric,
+        color="line",
+        color_discrete_sequence=colors,
+        labels={"week": "Week", metric: trends.LABELS[metric], "line": ""},
+    )
+    fig.update_traces(mode="lines+markers")
+    fig.update_xaxes(showgrid=False,)
+    fig.update_yaxes(showgrid=False,)
+    st.plotly_chart(fig, config={"displayModeBar": False}, use_container_width=True)
+    if split:
+        st.caption("Trends cover every play; the situation filter does not apply.")
+
+
+def export_buttons(datasets, years, game_type_pick="All Games", team=None):
+    """
+    Sidebar expander to download one of datasets (keys of export.DATASETS) as
+    CSV or Parquet. Nothing is written until a dataset is chosen, and the file
+    is cached per dataset and store version.
+    """
+    with st.sidebar.expander("Export"):
+        dataset = st.selectbox(
+            "Dataset:",
+            options=[None] + datasets,
+            format_func=lambda x: "Choose a dataset" if x is None else x,
+        )
+        if dataset is None:
+            return
+        version = funcs.data_version(years)
+        for fmt in export.FORMATS:
+            st.download_button(
+                f"Download {fmt.upper()}",
+                data=_export_file(dataset, fmt, years, game_type_pick, team, version),
+                file_name=f"{dataset}_{'_'.join(str(x) for x in years)}.{fmt}",
+                mime=export.FORMATS[fmt],
+            )
+
+
+@memory.memo(max_entries=16)
+def _export_file(dataset, fmt, years, game_type_pick, team, version):
+    return b"".join(export.export(dataset, fmt, years, game_type_pick, team))
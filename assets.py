@@ -0,0 +1,117 @@
+"""
+Local cache for team logos, wordmarks and player headshots.
+
+Each image is downloaded once into the asset directory, resized to the width it
+is shown at, and kept as PNG bytes in memory, so pages hand Streamlit local bytes
+and Plotly figures embed data URIs instead of sending the browser to remote URLs
+on every render. With NFL_OFFLINE=1 nothing is downloaded: images already in the
+asset directory (e.g. copied in as fixtures) are used and anything else gets a
+blank placeholder of the same width.
+"""
+import base64
+import functools
+import hashlib
+import io
+import os
+import urllib.request
+
+from PIL import Image
+
+import memory
+import store
+from singleflight import SingleFlight
+
+
+ASSET_DIR = os.environ.get("NFL_ASSET_DIR", os.path.join(store.DATA_DIR, "assets"))
+TIMEOUT = 10
+
+_flight = SingleFlight()
+
+
+def asset_path(url, width=None):
+    """
+    Returns the path of the original image for url, or of its resized copy.
+    """
+    key = hashlib.sha1(url.encode()).hexdigest()
+    name = f"{key}.orig" if width is None else f"{key}_{width}.png"
+    return os.path.join(ASSET_DIR, name)
+
+
+def _download(url):
+    path = asset_path(url)
+    if os.path.exists(path):
+        return path
+    with urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+        data = response.read()
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _resize(url, width):
+    path = asset_path(url, width)
+    if os.path.exists(path):
+        return path
+    original = asset_path(url)
+    if not os.path.exists(original):
+        if store.OFFLINE:
+            return None
+        original = _flight.do(("download", url), _download, url)
+    with Image.open(original) as img:
+        img = img.convert("RGBA")
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        img.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, path)
+    return path
+
+
+def placeholder(width, height=None):
+    """
+    Returns a transparent PNG of width x height (square by default).
+    """
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height or width), (0, 0, 0, 0)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=512)
+def image(url, width):
+    """
+    Returns the image at url as PNG bytes resized to width, for st.image.
+    Missing urls, failed downloads and images not cached in offline mode give
+    a placeholder. Failures are not written to disk, so the next process
+    retries the download.
+
+    params:
+        url (str): image url from team info or rosters.
+        width (int): display width in pixels.
+    """
+    if not isinstance(url, str) or not url:
+        return placeholder(width)
+    try:
+        path = _resize(url, width)
+    except (OSError, ValueError):  # URLError and PIL errors are OSErrors
+        path = None
+    if path is None:
+        return placeholder(width)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=512)
+def data_uri(url, width):
+    """
+    Returns image(url, width) as a data URI for Plotly layout images, which
+    are embedded in the figure instead of fetched by the browser.
+    """
+    encoded = base64.b64encode(image(url, width)).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+memory.watch_lru("assets.image", image)
+memory.watch_lru("assets.data_uri", data_uri)
@@ -0,0 +1,179 @@
+"""
+Measures the requests per second of the JSON API (api.py) on one core.
+
+Starts `python api.py` against the local store, requests every URL once so the
+responses are computed, then keeps C keep-alive connections busy for a fixed
+time, each sending its next request as soon as the last answer arrived. Runs
+three kinds of requests: plain, gzip (Accept-Encoding: gzip) and conditional
+(If-None-Match with the ETag of the first answer, answered 304). The client
+runs in this process, so on a one core host it shares the core with the server
+and the numbers are a floor.
+
+Usage:
+    taskset -c 0 python benchmarks/api_bench.py --season 2021 --connections 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# requests cycled through by every connection; {season} is filled in
+PATHS = [
+    "/seasons",
+    "/teams/KC/kpis?season={season}",
+    "/teams/BUF/kpis?season={season}&game_type=all",
+    "/league/baselines?season={season}",
+    "/qbs?season={season}",
+    "/standings?season={season}&week=10",
+]
+KINDS = ["plain", "gzip", "conditional"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, script):
+    """
+    Starts the API on port and returns the process once it answers.
+    """
+    server = subprocess.Popen(
+        [sys.executable, script, f"--port={port}"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/seasons"):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("the API did not start; run api.py by hand to see why.")
+
+
+def warm(port, paths):
+    """
+    Requests every path once and returns their ETags.
+    """
+    etags = {}
+    for path in paths:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+            response.read()
+            etags[path] = response.headers["ETag"]
+    return etags
+
+
+def _request(path, kind, etag):
+    headers = [f"GET {path} HTTP/1.1", "Host: 127.0.0.1"]
+    if kind == "gzip":
+        headers.append("Accept-Encoding: gzip")
+    elif kind == "conditional":
+        headers.append(f"If-None-Match: {etag}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode()
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _connection(port, requests, seconds, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(requests[i % len(requests)])
+        status = await _read_response(reader)
+        latencies.append(time.perf_counter() - start)
+        errors[0] += status not in (200, 304)
+        i += 1
+    writer.close()
+
+
+async def run(port, requests, connections, seconds):
+    """
+    Returns one row of results for connections connections sending requests
+    for seconds.
+    """
+    latencies, errors = [], [0]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _connection(port, requests[x:] + requests[:x], seconds, latencies, errors)
+            for x in range(connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    latency = np.array(latencies) * 1000
+    return {
+        "connections": connections,
+        "requests": len(latency),
+        "errors": errors[0],
+        "req_per_s": len(latency) / elapsed,
+        "p50_ms": np.percentile(latency, 50),
+        "p99_ms": np.percentile(latency, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--season", type=int, default=2021, help="a stored season")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5, help="per level")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS)
+    parser.add_argument("--api", default=os.path.join(ROOT, "api.py"))
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port, args.api)
+    try:
+        paths = [x.format(season=args.season) for x in PATHS]
+        etags = warm(port, paths)
+        rows = []
+        for kind in args.kinds:
+            requests = [_request(x, kind, etags[x]) for x in paths]
+            for connections in args.connections:
+                row = {"kind": kind}
+                row.update(asyncio.run(run(port, requests, connections, args.seconds)))
+                rows.append(row)
+    finally:
+        server.terminate()
+        server.wait()
+
+    columns = list(rows[0])
+    print("  ".join(f"{x:>12}" for x in columns))
+    for row in rows:
+        print(
+            "  ".join(
+                f"{row[x]:>12.1f}" if isinstance(row[x], float) else f"{row[x]:>12}"
+                for x in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
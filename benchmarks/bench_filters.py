@@ -0,0 +1,64 @@
+"""
+Times the Team Stats filters on object string columns against the shared
+categoricals from dims.normalize.
+
+Usage:
+    python benchmarks/bench_filters.py 2021
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dims  # noqa: E402
+import store  # noqa: E402
+
+
+def filters(data, team):
+    """
+    The masks and groupbys the Team Stats page and funcs run on every rerun.
+    """
+    return {
+        "season_type == REG": lambda: data[data.season_type == "REG"],
+        "home_team | away_team": lambda: data[
+            (data.home_team == team) | (data.away_team == team)
+        ],
+        "posteam == team": lambda: data[data.posteam == team],
+        "play_type == pass": lambda: data[data.play_type == "pass"],
+        "td_team == defteam": lambda: data[data.td_team == data.defteam],
+        "groupby posteam sum": lambda: data.groupby("posteam", observed=True)[
+            "yards_gained"
+        ].sum(),
+        "groupby defteam, week sum": lambda: data.groupby(
+            ["defteam", "week"], observed=True
+        )["sack"].sum(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("season", type=int)
+    parser.add_argument("--team", default="KC")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    store.ensure_season(args.season)
+    columns = ["week", "yards_gained", "sack"] + list(dims.DIMENSIONS) + [
+        x for x in dims.TEAM_COLUMNS if x != "team"
+    ]
+    categorical = dims.normalize(store.read_pbp(args.season, columns=columns))
+    strings = categorical.astype({x: object for x in columns[3:]})
+
+    print(f"{len(strings)} plays, {args.repeat} runs each")
+    print(f"{'operation':<28}{'object ms':>12}{'category ms':>14}{'speedup':>10}")
+    slow, fast = filters(strings, args.team), filters(categorical, args.team)
+    for name in slow:
+        before = min(timeit.repeat(slow[name], number=1, repeat=args.repeat)) * 1000
+        after = min(timeit.repeat(fast[name], number=1, repeat=args.repeat)) * 1000
+        print(f"{name:<28}{before:>12.2f}{after:>14.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
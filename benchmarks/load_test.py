@@ -0,0 +1,313 @@
+"""
+Load tests the app with concurrent sessions browsing its pages.
+
+Starts app.py with `streamlit run` against the local store with NFL_OFFLINE=1, so
+only seasons already stored can be shown. For each session count N it opens N
+websocket sessions that browse like users: every rerun changes one sidebar
+selectbox (page, season, team, comparison, game type, player or play filter) or
+the play search words and waits until the script finishes. Reports rerun latency percentiles, reruns per second and the
+server's resident memory for each N.
+
+Usage:
+    python benchmarks/load_test.py --seasons 2020 2021 --sessions 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# pages sessions browse, and the sidebar selectboxes they change on them
+PAGES = [
+    "Team Stats",
+    "Quarterback Stats",
+    "Receiver Stats",
+    "Running Back Stats",
+    "Standings",
+    "Play Search",
+]
+CHANGES = [
+    "Select a Season:",
+    "Select a Team:",
+    "Comparison Team:",
+    "Regular/Playoff Games:",
+    "Select a QB (type to search):",
+    "Select a Receiver (type to search):",
+    "Select a Rusher (type to search):",
+    "Offense:",
+    "Defense:",
+    "Play Type:",
+]
+# text inputs sessions type into, and what they type
+TYPED = {
+    "Description has the words:": ["", "pass", "deep left", "short right", "middle"],
+}
+# share of reruns that switch page instead of changing a filter
+PAGE_SWITCH = 0.2
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port, online=False):
+    """
+    Starts `streamlit run app` on port and returns the process once it is
+    healthy.
+    """
+    env = dict(os.environ)
+    if not online:
+        env["NFL_OFFLINE"] = "1"
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            app,
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health"):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("streamlit did not start; run the app by hand to see why.")
+
+
+def rss(pid):
+    """
+    Returns the resident set size of process pid in MB, or NaN without /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return np.nan
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class Session:
+    """One browser session talking the Streamlit websocket protocol.
+    Usage:
+        session = Session(url, seasons, rng)
+        await session.connect()
+        latency, error = await session.rerun()
+    """
+
+    def __init__(self, url, seasons, rng):
+        self.url = url
+        self.seasons = {str(x) for x in seasons}
+        self.rng = rng
+        self.widgets = {}  # label -> Selectbox or TextInput proto of the last run
+        self.states = {}  # widget id -> WidgetState sent with every rerun
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, max_message_size=2 ** 30)
+
+    def close(self):
+        self.ws.close()
+
+    async def rerun(self):
+        """
+        Reruns the script with the current widget states and returns the
+        seconds until it finished and whether it raised.
+        """
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        widgets, error = {}, False
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise ConnectionError("the server closed the session")
+            reply = ForwardMsg()
+            reply.ParseFromString(data)
+            kind = reply.WhichOneof("type")
+            if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                element = reply.delta.new_element
+                if element.WhichOneof("type") == "selectbox":
+                    widgets[element.selectbox.label] = element.selectbox
+                elif element.WhichOneof("type") == "text_input":
+                    widgets[element.text_input.label] = element.text_input
+                elif element.WhichOneof("type") == "exception":
+                    error = True
+            elif kind == "script_finished" and (
+                reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN
+            ):
+                break
+        latency = time.perf_counter() - start
+        # like the browser, only keep the state of widgets still on the page
+        ids = {x.id for x in widgets.values()}
+        self.widgets = widgets
+        self.states = {k: v for k, v in self.states.items() if k in ids}
+        return latency, error
+
+    def _select(self, label, options):
+        widget = self.widgets[label]
+        choice = self.rng.choice(options)
+        self.states[widget.id] = WidgetState(
+            id=widget.id, int_value=list(widget.options).index(choice)
+        )
+
+    def _type(self, label, texts):
+        widget = self.widgets[label]
+        self.states[widget.id] = WidgetState(
+            id=widget.id, string_value=self.rng.choice(texts)
+        )
+
+    def change(self):
+        """
+        Changes one selectbox or text input like a user would, switching page
+        on the first rerun and then every so often.
+        """
+        if not self.widgets:
+            return  # the run failed before drawing the sidebar; rerun as is
+        nav = self.widgets.get("Navigation")
+        filters = [x for x in list(CHANGES) + list(TYPED) if x in self.widgets]
+        if nav is not None and (not filters or self.rng.random() < PAGE_SWITCH):
+            self._select("Navigation", [x for x in PAGES if x in nav.options])
+            return
+        label = self.rng.choice(filters)
+        if label in TYPED:
+            self._type(label, TYPED[label])
+            return
+        options = list(self.widgets[label].options)
+        if label == "Select a Season:":
+            options = [x for x in options if x in self.seasons] or options
+        self._select(label, options)
+
+    async def browse(self, reruns):
+        results = [await self.rerun()]
+        for _ in range(reruns):
+            self.change()
+            results.append(await self.rerun())
+        return results
+
+
+async def _sample_rss(pid, samples, done):
+    while not done.is_set():
+        samples.append(rss(pid))
+        await asyncio.sleep(0.25)
+
+
+async def run_level(url, pid, sessions, reruns, seasons, seed):
+    """
+    Runs sessions concurrent sessions of reruns reruns each and returns one
+    row of results.
+    """
+    browsers = [
+        Session(url, seasons, random.Random(seed + x)) for x in range(sessions)
+    ]
+    await asyncio.gather(*(x.connect() for x in browsers))
+    samples, done = [], asyncio.Event()
+    sampler = asyncio.ensure_future(_sample_rss(pid, samples, done))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(x.browse(reruns) for x in browsers))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    for browser in browsers:
+        browser.close()
+
+    latency = np.array([x[0] for session in results for x in session]) * 1000
+    return {
+        "sessions": sessions,
+        "reruns": len(latency),
+        "errors": sum(x[1] for session in results for x in session),
+        "p50_ms": np.percentile(latency, 50),
+        "p95_ms": np.percentile(latency, 95),
+        "p99_ms": np.percentile(latency, 99),
+        "reruns_per_s": len(latency) / elapsed,
+        "rss_mb": rss(pid),
+        "peak_rss_mb": np.nanmax(samples + [rss(pid)]),
+    }
+
+
+async def load_test(args, url, pid):
+    if args.warmup:
+        # one session visits every page so the first level is not all loads
+        await run_level(url, pid, 1, args.warmup, args.seasons, args.seed)
+    rows = []
+    for sessions in args.sessions:
+        row = await run_level(
+            url, pid, sessions, args.reruns, args.seasons, args.seed
+        )
+        print(
+            "  ".join(
+                f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in row.items()
+            ),
+            file=sys.stderr,
+        )
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--seasons", type=int, nargs="+", default=[2021], help="stored seasons to browse"
+    )
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--reruns", type=int, default=20, help="reruns per session per level"
+    )
+    parser.add_argument("--warmup", type=int, default=10, help="reruns before timing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument(
+        "--online", action="store_true", help="allow downloads of missing seasons"
+    )
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(args.app, port, args.online)
+    try:
+        rows = asyncio.run(
+            load_test(args, f"ws://127.0.0.1:{port}/_stcore/stream", server.pid)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    columns = list(rows[0])
+    print("  ".join(f"{x:>12}" for x in columns))
+    for row in rows:
+        print(
+            "  ".join(
+                f"{row[x]:>12.1f}" if isinstance(row[x], float) else f"{row[x]:>12}"
+                for x in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Shared categorical dimensions for play by play data.
+
+Team, play type and season type columns are converted to categoricals with a fixed
+category order when a season is loaded, so masks and groupbys run on small integer
+codes instead of Python strings, and two team columns can be compared directly.
+Groupbys on these columns must pass observed=True so teams without plays in the
+filtered data are not counted.
+"""
+import pandas as pd
+
+
+# every team abbreviation used by nflfastR since 1999
+TEAMS = [
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE", "DAL", "DEN", "DET",
+    "GB", "HOU", "IND", "JAX", "KC", "LA", "LAC", "LV", "MIA", "MIN", "NE", "NO",
+    "NYG", "NYJ", "OAK", "PHI", "PIT", "SD", "SEA", "SF", "STL", "TB", "TEN", "WAS",
+]
+PLAY_TYPES = [
+    "pass", "run", "punt", "field_goal", "kickoff", "extra_point", "qb_kneel",
+    "qb_spike", "no_play",
+]
+SEASON_TYPES = ["REG", "POST"]
+
+TEAM_COLUMNS = ["home_team", "away_team", "posteam", "defteam", "td_team", "team"]
+DIMENSIONS = {"play_type": PLAY_TYPES, "season_type": SEASON_TYPES}
+
+
+def _dtype(categories, values):
+    # values outside the fixed list are appended rather than dropped to NaN
+    extra = sorted(set(values.dropna().unique()) - set(categories))
+    return pd.CategoricalDtype(categories + extra)
+
+
+def _is_shared(dtypes, categories):
+    dtypes = list(dtypes)
+    return (
+        isinstance(dtypes[0], pd.CategoricalDtype)
+        and all(x == dtypes[0] for x in dtypes)
+        and list(dtypes[0].categories[: len(categories)]) == categories
+    )
+
+
+def normalize(data):
+    """
+    Converts the team, play_type and season_type columns present in data to
+    their shared categoricals. Columns that already have the shared dtype are
+    left as they are and no other column is copied.
+
+    params:
+        data (DataFrame): play by play data or a table derived from it.
+
+    Returns:
+        Dataframe with categorical dimension columns.
+    """
+    converted = {}
+    teams = [x for x in TEAM_COLUMNS if x in data.columns]
+    if teams and not _is_shared(data.dtypes[teams], TEAMS):
+        values = pd.concat([data[x].astype(object) for x in teams], ignore_index=True)
+        team_type = _dtype(TEAMS, values)
+        converted.update({x: data[x].astype(team_type) for x in teams})
+    for column, categories in DIMENSIONS.items():
+        if column in data.columns and not _is_shared([data[column].dtype], categories):
+            converted[column] = data[column].astype(_dtype(categories, data[column]))
+    if not converted:
+        return data
+    data = data.copy(deep=False)
+    for column, values in converted.items():
+        data[column] = values
+    return data
@@ -0,0 +1,101 @@
+"""
+Persistent disk cache for derived results.
+
+Results are DataFrames written as parquet files named by a hash of the function,
+the app's code, and its arguments. Callers pass the store versions of the seasons
+involved as an argument, so entries for stale data are never read again and age
+out under the size cap.
+"""
+import functools
+import hashlib
+import os
+
+import pandas as pd
+
+import store
+
+
+CACHE_DIR = os.environ.get("NFL_CACHE_DIR", os.path.join(store.DATA_DIR, "cache"))
+MAX_BYTES = int(os.environ.get("NFL_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def _code_version():
+    """
+    Returns a hash of every module of the app. Cached functions call helpers
+    across modules (stat functions, analytics, aggregates), so a change to any
+    of them makes every entry unreachable rather than just those whose own
+    source changed.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(root)):
+        if name.endswith(".py"):
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(name.encode() + f.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = _code_version()
+
+
+def disk_cache(func):
+    """
+    Caches a function that returns a DataFrame on disk across restarts.
+
+    All arguments must have a stable repr (ints, strings, lists and tuples of them).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = hashlib.sha1(
+            repr((func.__module__, func.__qualname__, CODE_VERSION, args)).encode()
+        ).hexdigest()
+        path = os.path.join(CACHE_DIR, f"{func.__name__}-{key}.parquet")
+        try:
+            result = pd.read_parquet(path)
+            os.utime(path)  # keep recently read entries at the back of the queue
+            return result
+        except (FileNotFoundError, OSError, ValueError):
+            pass
+        result = func(*args)
+        _write(result, path)
+        return result
+
+    return wrapper
+
+
+def _write(df, path):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    _evict()
+
+
+def _evict():
+    """
+    Removes the least recently used entries until the cache fits MAX_BYTES.
+    """
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(".parquet"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(x[1] for x in entries)
+    for _, size, path in sorted(entries):
+        if total <= MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def clear():
+    """
+    Removes every entry from the disk cache.
+    """
+    if os.path.isdir(CACHE_DIR):
+        for entry in os.scandir(CACHE_DIR):
+            os.remove(entry.path)
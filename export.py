@@ -0,0 +1,287 @@
+"""
+Exports of the tables and KPIs behind the pages as CSV or Parquet.
+
+Every dataset is read from the cached loaders in funcs one season at a time and
+written out in row chunks, so an export never builds a second full copy of the
+data, however many seasons it covers. The chunks feed st.download_button on the
+pages and a small local HTTP endpoint:
+
+    python export.py serve --port 8600
+    curl "localhost:8600/team_weeks.csv?years=2019,2020,2021&team=KC"
+"""
+import argparse
+import io
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analytics
+import funcs
+
+
+CHUNK_ROWS = 50_000
+FORMATS = {"csv": "text/csv", "parquet": "application/octet-stream"}
+
+
+# ---- Datasets ----
+# each returns a list of (season, frame) pairs for years, game type and team
+# (team None means every team)
+
+
+def _table(load, team_columns=()):
+    def dataset(years, game_type_pick, team):
+        parts = []
+        for year in years:
+            frame = load([year])
+            if "season_type" in frame.columns:
+                frame = funcs.game_type_filter(frame, game_type_pick)
+            if team is not None and team_columns:
+                frame = frame[
+                    np.logical_or.reduce([frame[x] == team for x in team_columns])
+                ]
+            parts.append((year, frame))
+        return parts
+
+    return dataset
+
+
+def team_kpis(years, game_type_pick, team):
+    """
+    Returns the Team Stats KPIs for team, or for every team, one row per season.
+    """
+    parts = []
+    for year in years:
+        if team is None:
+            games = funcs.game_type_filter(funcs.get_games([year]), game_type_pick)
+            teams = sorted(set(games.home_team) | set(games.away_team))
+        else:
+            teams = [team]
+        rows = [
+            funcs.get_team_kpis([year], game_type_pick, x).assign(team=x)
+            for x in teams
+        ]
+        parts.append((year, pd.concat(rows, ignore_index=True)))
+    return parts
+
+
+def league_baselines(years, game_type_pick, team=None):
+    """
+    Returns the league baselines, one row per season.
+    """
+    return [(year, funcs.get_league_baselines([year], game_type_pick)) for year in years]
+
+
+def qb_stats(years, game_type_pick=None, team=None):
+    """
+    Returns season totals and EPA rates for every passer, one row per passer per
+    season. Passer tables are not split by game type or team.
+    """
+    parts = []
+    for year in years:
+        totals = funcs.get_passer_weeks([year]).groupby("passer_id").sum()
+        totals = totals.drop(columns="week")
+        epa = funcs.get_passer_epa([year]).groupby("passer_id")
+        rates = pd.DataFrame(
+            [analytics.passer_epa_stats(x) for _, x in epa],
+            index=[x for x, _ in epa],
+            columns=analytics.PASSER_EPA_STATS,
+        )
+        parts.append((year, totals.join(rates).reset_index()))
+    return parts
+
+
+DATASETS = {
+    "team_kpis": team_kpis,
+    "league_baselines": league_baselines,
+    "team_weeks": _table(funcs.get_team_cube, ["team"]),
+    "team_epa": _table(funcs.get_team_epa, ["posteam", "defteam"]),
+    "games": _table(funcs.get_games, ["home_team", "away_team"]),
+    "drives": _table(funcs.get_drives, ["posteam", "defteam"]),
+    "qb_stats": qb_stats,
+    "passer_weeks": _table(funcs.get_passer_weeks),
+    "passer_epa": _table(funcs.get_passer_epa),
+}
+
+
+# ---- Writers ----
+
+
+def _chunks(parts, chunk_rows):
+    # slices of each season's frame, with the season added to the slice only
+    for season, frame in parts:
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            chunk = frame.iloc[start : start + chunk_rows]
+            if "season" not in chunk.columns:
+                chunk = chunk.assign(season=season)
+            yield chunk
+
+
+def iter_csv(parts, chunk_rows=CHUNK_ROWS):
+    """
+    Yields a CSV file of parts as encoded chunks, with one header row.
+    """
+    header = True
+    for chunk in _chunks(parts, chunk_rows):
+        if header or len(chunk):
+            yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+class _Sink(io.RawIOBase):
+    # write only stream that hands back what was written since the last drain
+    def __init__(self):
+        self.buffers = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffers.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.buffers)
+        self.buffers = []
+        return data
+
+
+def iter_parquet(parts, chunk_rows=CHUNK_ROWS):
+    """
+    Yields a Parquet file of parts as byte chunks, one row group per chunk.
+    """
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, _schema(parts))
+    for chunk in _chunks(parts, chunk_rows):
+        if len(chunk):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            )
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _schema(parts):
+    # Taken from every season rather than the first chunk, which can be empty
+    # or hold a column that is all None there, and so typed null; null fields
+    # take the type the other seasons give them.
+    schemas = []
+    for season, frame in parts:
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        if "season" not in frame.columns:
+            schema = schema.append(pa.field("season", pa.int64()))
+        schemas.append(schema)
+    if not schemas:
+        return pa.schema([("season", pa.int64())])
+    return pa.unify_schemas(schemas)
+
+
+WRITERS = {"csv": iter_csv, "parquet": iter_parquet}
+
+
+def export(dataset, fmt, years, game_type_pick="All Games", team=None):
+    """
+    Yields dataset as CSV or Parquet byte chunks.
+
+    params:
+        dataset (str): key of DATASETS.
+        fmt (str): "csv" or "parquet".
+        years (int): list of years to export.
+        game_type_pick (str): "Regular Season", "Playoffs", or "All Games".
+        team (str): team abbreviation, or None for every team.
+    """
+    return WRITERS[fmt](DATASETS[dataset](years, game_type_pick, team))
+
+
+# ---- HTTP endpoint ----
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Serves GET /<dataset>.<csv|parquet>?years=2020,2021&game_type=...&team=KC
+    with chunked transfer encoding.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        name, _, fmt = url.path.strip("/").partition(".")
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if name not in DATASETS or fmt not in FORMATS or "years" not in query:
+            self.send_error(404, "Use /<dataset>.<csv|parquet>?years=2021")
+            return
+        try:
+            years = [int(x) for x in query["years"].split(",")]
+        except ValueError:
+            self.send_error(400, "years must be a comma separated list of seasons")
+            return
+        # the datasets load and the first chunk is encoded before the status is
+        # sent, so a season that cannot be read still gets an error response
+        try:
+            chunks = export(
+                name, fmt, years, query.get("game_type", "All Games"), query.get("team")
+            )
+            first = next(chunks, b"")
+        except FileNotFoundError as error:
+            self.send_error(404, str(error))
+            return
+        except Exception as error:
+            self.send_error(500, f"{type(error).__name__}: {error}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[fmt])
+        self.send_header(
+            "Content-Disposition", f'attachment; filename="{name}.{fmt}"'
+        )
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in itertools.chain([first], chunks):
+                if chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        except Exception as error:
+            # past the status line, closing without the last chunk is what tells
+            # the client the body is incomplete
+            self.log_error("export of %s failed: %r", self.path, error)
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the app's aggregates.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="run the HTTP endpoint")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8600)
+    write = subparsers.add_parser("write", help="write one dataset to a file")
+    write.add_argument("dataset", choices=list(DATASETS))
+    write.add_argument("path")
+    write.add_argument("--years", type=int, nargs="+", required=True)
+    write.add_argument("--game-type", default="All Games")
+    write.add_argument("--team")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        print(f"Serving exports on http://{args.host}:{args.port}")
+        ThreadingHTTPServer((args.host, args.port), ExportHandler).serve_forever()
+    else:
+        fmt = "parquet" if args.path.endswith(".parquet") else "csv"
+        with open(args.path, "wb") as f:
+            for chunk in export(args.dataset, fmt, args.years, args.game_type, args.team):
+                f.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Play level filter engine for situational splits.
+
+A split is a canonical, hashable tuple of predicates built with make_split, e.g.
+    make_split(down=[3], qtr=[4], score_differential=(-8, 8))
+compile_split turns it into one fused boolean expression that is evaluated with
+numexpr when it is installed, or NumPy otherwise. Masks are cached per frame and
+split, so the same split is only ever scanned once per frame.
+"""
+import weakref
+
+import numpy as np
+
+import memory
+
+try:
+    import numexpr
+except ImportError:  # numexpr is optional
+    numexpr = None
+
+
+# columns that can be split on, and the kind of predicate each one takes:
+#   "in"    one of a list of values
+#   "range" inclusive (low, high)
+#   "flag"  0 or 1
+PREDICATES = {
+    "down": "in",
+    "qtr": "in",
+    "score_differential": "range",
+    "yardline_100": "range",
+    "shotgun": "flag",
+    "no_huddle": "flag",
+}
+
+
+def make_split(**predicates):
+    """
+    Returns a split from keyword predicates. Predicates that are None or empty
+    are left out, so an unfiltered split is the empty tuple.
+
+    Example:
+        make_split(down=[3, 4], yardline_100=(0, 20), shotgun=1)
+    """
+    split = []
+    for column, value in predicates.items():
+        if column not in PREDICATES:
+            raise ValueError(f"Cannot split on {column}.")
+        if value is None or (PREDICATES[column] == "in" and len(value) == 0):
+            continue
+        if PREDICATES[column] == "in":
+            value = tuple(sorted(float(x) for x in value))
+        elif PREDICATES[column] == "range":
+            value = (float(value[0]), float(value[1]))
+        else:
+            value = float(value)
+        split.append((column, value))
+    return tuple(sorted(split))
+
+
+def describe_split(split):
+    """
+    Returns a short label for a split, e.g. "down 3 | qtr 4".
+    """
+    labels = []
+    for column, value in split:
+        if PREDICATES[column] == "in":
+            labels.append(f"{column} {'/'.join(str(int(x)) for x in value)}")
+        elif PREDICATES[column] == "range":
+            labels.append(f"{column} {value[0]:g} to {value[1]:g}")
+        else:
+            labels.append(f"{column} {'yes' if value else 'no'}")
+    return " | ".join(labels)
+
+
+def compile_split(split):
+    """
+    Returns the fused numexpr expression for a split and the columns it reads.
+    """
+    terms = []
+    for column, value in split:
+        if PREDICATES[column] == "in":
+            either = " | ".join(f"({column} == {x!r})" for x in value)
+            terms.append(f"({either})")
+        elif PREDICATES[column] == "range":
+            terms.append(f"({column} >= {value[0]!r}) & ({column} <= {value[1]!r})")
+        else:
+            terms.append(f"({column} == {value!r})")
+    return " & ".join(terms), sorted({column for column, _ in split})
+
+
+def _evaluate(data, split):
+    arrays = {x: data[x].to_numpy(np.float64) for x in dict(split)}
+    if numexpr is not None:
+        expression, _ = compile_split(split)
+        return numexpr.evaluate(expression, local_dict=arrays)
+    mask = np.ones(len(data), dtype=bool)
+    for column, value in split:
+        values = arrays[column]
+        if PREDICATES[column] == "in":
+            mask &= np.isin(values, value)
+        elif PREDICATES[column] == "range":
+            mask &= (values >= value[0]) & (values <= value[1])
+        else:
+            mask &= values == value
+    return mask
+
+
+def split_mask(data, split):
+    """
+    Returns the boolean mask of the plays in data that match split. Masks are
+    cached until data is garbage collected.
+    """
+    masks = _masks.get(id(data))
+    if masks is None:
+        masks = _masks[id(data)] = {}
+        weakref.finalize(data, _masks.pop, id(data), None)
+    if split not in masks:
+        masks[split] = _evaluate(data, split)
+    return masks[split]
+
+
+_masks = {}
+memory.watch("filters._masks", _masks)
+
+
+def apply_split(data, split):
+    """
+    Returns the plays in data that match split, or data itself when the split
+    is empty.
+    """
+    if not split:
+        return data
+    return data[split_mask(data, split)]
@@ -1,25 +1,211 @@
+import functools
+import os
+
+import numpy as np
 import pandas as pd
-import streamlit as st
-import nfl_data_py as nfl
+
+import analytics
+import diskcache
+import filters
+import kernels
+import memory
+import players
+import ratings
+import search
+import similarity
+import standings
+import store
+import trends
+from partitions import SeasonPartitions
+from singleflight import SingleFlight
+
+
+# coalesces concurrent downloads of the same data across sessions
+_flight = SingleFlight()
+
+
+def splittable(func):
+    """
+    Adds a split keyword (see filters.make_split) to a stat function whose first
+    argument is play by play data. The plays are filtered to the split before
+    the function runs.
+    """
+
+    @functools.wraps(func)
+    def wrapper(data, *args, split=(), **kwargs):
+        return func(filters.apply_split(data, split), *args, **kwargs)
+
+    return wrapper
 
 
-@st.experimental_memo
 def get_raw_pbp(years):
     """
     Returns raw play by play data for years desired.
 
+    Seasons are read from the local store (see store.py) and downloaded into it
+    the first time they are asked for. Each season is memory-mapped from the
+    store's Arrow file, so all server processes on a host share one copy of it.
+    The returned frame is read-only and must be copied before it is modified.
+
     params:
         years (int): list of years to get data for. Available years are 1999-2021.
     
     Returns:
         Dataframe containing raw pbp data. Raw data has 372 columns. 
     """
+    for year in years:
+        store.ensure_season(year)
+    frames = [store.map_pbp(year) for year in years]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
 
-    data = nfl.import_pbp_data(years=years, downcast=False)
-    return data
+
+def get_partitions(years):
+    """
+    Returns the SeasonPartitions for the data from get_raw_pbp(years), built
+    once per store version and shared by every session.
+    """
+    version = data_version(years)
+    cached = _partitions.get(tuple(years))
+    if cached is not None and cached[0] == version:
+        memory.hit("funcs._partitions", tuple(years))
+        return cached[1]
+    parts = _flight.do(
+        ("partitions", tuple(years)), SeasonPartitions, get_raw_pbp(years)
+    )
+    _partitions[tuple(years)] = (version, parts)
+    memory.record("funcs._partitions", tuple(years))
+    return parts
+
+
+_partitions = {}
+memory.watch("funcs._partitions", _partitions)
+
+
+@memory.memo(max_entries=64)
+def _season_table(season, table, version):
+    return store.read_table(season, table)
+
+
+def get_games(years):
+    """
+    Returns one row per game with final scores for years desired.
+    """
+    return pd.concat(
+        [_season_table(year, "games", store.ensure_season(year)) for year in years],
+        ignore_index=True,
+    )
+
+
+def get_team_cube(years):
+    """
+    Returns one row per team per game with offensive and defensive totals
+    (yards, pass/rush yards, air yards, YAC, sacks, turnovers).
+    """
+    return pd.concat(
+        [_season_table(year, "team_cube", store.ensure_season(year)) for year in years],
+        ignore_index=True,
+    )
+
+
+def get_drives(years):
+    """
+    Returns one row per drive with offense, defense, start yardline, result,
+    points, snaps, yards and red zone/goal to go flags.
+    """
+    return pd.concat(
+        [_season_table(year, "drives", store.ensure_season(year)) for year in years],
+        ignore_index=True,
+    )
+
+
+def get_passer_weeks(years):
+    """
+    Returns one row per passer per week with dropbacks, completions, yards, air
+    yards, yards after catch, touchdowns, interceptions and sacks.
+    """
+    return pd.concat(
+        [
+            _season_table(year, "passer_weeks", store.ensure_season(year))
+            for year in years
+        ],
+        ignore_index=True,
+    )
+
+
+def get_team_epa(years):
+    """
+    Returns one row per offense per game with EPA, success and CPOE sums (see
+    analytics.build_team_epa).
+    """
+    return pd.concat(
+        [_season_table(year, "team_epa", store.ensure_season(year)) for year in years],
+        ignore_index=True,
+    )
+
+
+def get_passer_epa(years):
+    """
+    Returns one row per passer per week with EPA, success and CPOE sums (see
+    analytics.build_passer_epa).
+    """
+    return pd.concat(
+        [
+            _season_table(year, "passer_epa", store.ensure_season(year))
+            for year in years
+        ],
+        ignore_index=True,
+    )
+
+
+def get_player_weeks(years, position):
+    """
+    Returns one row per player per week for a position of players.POSITIONS
+    ("receiver" or "rusher").
+    """
+    return pd.concat(
+        [
+            _season_table(year, f"{position}_weeks", store.ensure_season(year))
+            for year in years
+        ],
+        ignore_index=True,
+    )
+
+
+def get_player_totals(years, position):
+    """
+    Returns season totals and rates for every player of a position, sorted by
+    the position's play count.
+    """
+    return _player_totals(list(years), position, data_version(years))
+
+
+@memory.memo(max_entries=64)
+def _player_totals(years, position, version):
+    totals = players.player_totals(get_player_weeks(years, position), position)
+    count = players.POSITIONS[position]["count"]
+    return totals.sort_values(count, ascending=False).reset_index(drop=True)
+
+
+def get_passer_index(season):
+    """
+    Returns a dict of passer_id to the row positions of their dropbacks in the
+    season returned by get_raw_pbp([season]).
+    """
+    return _passer_index(season, store.ensure_season(season))
 
 
-@st.experimental_memo
+@memory.memo(max_entries=32)
+def _passer_index(season, version):
+    index = store.read_table(season, "passer_index")
+    return {
+        passer_id: np.sort(rows.to_numpy())
+        for passer_id, rows in index.groupby("passer_id").row
+    }
+
+
+@memory.memo
 def get_rosters(years):
     """
     Returns all team rosters for desired years.
@@ -31,11 +217,14 @@ def get_rosters(years):
         Dataframe containing roster data. 
     """
 
-    data = nfl.import_rosters(years=years)
+    data = pd.concat(
+        [_flight.do(("rosters", x), store.read_reference, "rosters", x) for x in years],
+        ignore_index=True,
+    )
     return data
 
 
-@st.experimental_memo
+@memory.memo
 def get_dc(years):
     """
     Returns teams depth charts for desired years
@@ -46,11 +235,17 @@ def get_dc(years):
     Returns:
         Dataframe containing depth chart data. 
     """
-    data = nfl.import_depth_charts(years=years)
+    data = pd.concat(
+        [
+            _flight.do(("dc", x), store.read_reference, "depth_charts", x)
+            for x in years
+        ],
+        ignore_index=True,
+    )
     return data
 
 
-@st.experimental_memo
+@memory.memo
 def get_team_info():
     """
     Use to get team info such as 
@@ -58,10 +253,11 @@ def get_team_info():
     Returns:
         Dataframe with team info such as Name, Abbreviation, conference, division, colors, and urls of team logos
     """
-    data = nfl.import_team_desc()
+    data = _flight.do(("team_desc",), store.read_reference, "team_desc")
     return data
 
 
+@splittable
 def team_season_filter(data, team_abb):
     """
     Filters raw data based on selected filters for season, team, and home/away/both
@@ -72,6 +268,18 @@ def team_season_filter(data, team_abb):
     return team_data
 
 
+def game_type_filter(data, game_type_pick):
+    """
+    Filters data to Regular Season, Playoffs, or All Games using season_type.
+    """
+    if game_type_pick == "Regular Season":
+        return data[data.season_type == "REG"]
+    elif game_type_pick == "Playoffs":
+        return data[data.season_type == "POST"]
+    return data
+
+
+@splittable
 def posteam_data(raw_data, team):
     """
     Filters raw data to only include plays where the selected team is on offense.
@@ -80,6 +288,17 @@ def posteam_data(raw_data, team):
     return data
 
 
+def _round(value, digits=None):
+    """
+    round() that passes NaN through. Stats of selections without plays (an
+    empty split, a team without playoff games) are NaN, and round(NaN) with no
+    digits raises instead.
+    """
+    if pd.isna(value):
+        return np.nan
+    return round(value, digits)
+
+
 def season_kpis(season_games, team_abb):
     """
     Returns wins, losses, avg points, and average points against
@@ -98,128 +317,80 @@ def season_kpis(season_games, team_abb):
         (season_games.away_team == team_abb)
         & (season_games.home_score > season_games.away_score)
     )
-    avg_points = round(
-        (
-            season_games[season_games.home_team == team_abb].home_score.sum()
-            + season_games[season_games.away_team == team_abb].away_score.sum()
-        )
-        / season_games.shape[0],
+    avg_points = analytics.ratio(
+        season_games[season_games.home_team == team_abb].home_score.sum()
+        + season_games[season_games.away_team == team_abb].away_score.sum(),
+        season_games.shape[0],
         1,
     )
-    avg_points_against = round(
-        (
-            season_games[season_games.home_team == team_abb].away_score.sum()
-            + season_games[season_games.away_team == team_abb].home_score.sum()
-        )
-        / season_games.shape[0],
+    avg_points_against = analytics.ratio(
+        season_games[season_games.home_team == team_abb].away_score.sum()
+        + season_games[season_games.away_team == team_abb].home_score.sum(),
+        season_games.shape[0],
         1,
     )
 
     return wins, losses, avg_points, avg_points_against
 
 
-def avg_score(data, team_dict, comparison):
-    """
-    Returns average score from all NFL teams for the given filters.
-    """
-    temp = data.copy()
-    if comparison == "All NFL":
-        games = 0
-        score = 0
-        for team in team_dict.values():
-            data = (
-                temp[(temp.home_team == team) | (temp.away_team == team)]
-                .groupby(["week", "home_team", "away_team"])["home_score", "away_score"]
-                .max()
-                .reset_index()
-            )
-            team_score = (
-                data[data.home_team == team].home_score.sum()
-                + data[data.away_team == team].away_score.sum()
-            )
-            games += data.shape[0]
-            score += team_score
-        return round(score / games, 1), round(score / games, 1)
-    else:
-        team = team_dict[comparison]
-        data = data[((data["home_team"] == team) | (data["away_team"] == team))]
-        avg_points = round(
-            (
-                data[data.home_team == team].home_score.sum()
-                + data[data.away_team == team].away_score.sum()
-            )
-            / data.shape[0],
-            1,
-        )
-        avg_points_against = round(
-            (
-                data[data.home_team == team].away_score.sum()
-                + data[data.away_team == team].home_score.sum()
-            )
-            / data.shape[0],
-            1,
-        )
-        return avg_points, avg_points_against
-
-
+@splittable
 def team_pass_stats(team_data, team_abb):
     """
     Returns team passing attempts, comp %, yards, TD, and Int
     """
     data = team_data[team_data.posteam == team_abb]
-    pass_attempts = round(data[data.sack == 0].pass_attempt.sum())
-    comp_perc = round((data.complete_pass.sum() / pass_attempts) * 100, 1,)
-    pass_yards = round(data[data.play_type == "pass"].yards_gained.sum())
-    pass_td = round(
+    pass_attempts = _round(data[data.sack == 0].pass_attempt.sum())
+    comp_perc = analytics.ratio(data.complete_pass.sum() * 100, pass_attempts, 1)
+    pass_yards = _round(data[data.play_type == "pass"].yards_gained.sum())
+    pass_td = _round(
         data[(data.play_type == "pass") & (data.touchdown == 1)].touchdown.sum()
     )
-    interceptions = round(
+    interceptions = _round(
         data[(data.play_type == "pass") & (data.interception == 1)].interception.sum()
     )
 
     return pass_attempts, comp_perc, pass_yards, pass_td, interceptions
 
 
+@splittable
 def league_avg_pass_stats(raw):
     """
     Returns league passing attempts, comp %, yards, TD, and Int
     """
     data = raw.copy()
-    league_pass_attempts = round(
+    league_pass_attempts = _round(
         data[data.sack == 0]
-        .groupby("posteam")["pass_attempt"]
+        .groupby("posteam", observed=True)["pass_attempt"]
         .sum()
         .reset_index()
         .pass_attempt.mean()
     )
-    league_comp_perc = round(
-        (
-            data.groupby("posteam")["complete_pass"]
-            .sum()
-            .reset_index()
-            .complete_pass.mean()
-            / league_pass_attempts
-        )
+    league_comp_perc = analytics.ratio(
+        data.groupby("posteam", observed=True)["complete_pass"]
+        .sum()
+        .reset_index()
+        .complete_pass.mean()
         * 100,
+        league_pass_attempts,
         1,
     )
-    league_pass_yards = round(
+    league_pass_yards = _round(
         data[data.play_type == "pass"]
-        .groupby("posteam")["yards_gained"]
+        .groupby("posteam", observed=True)["yards_gained"]
         .sum()
         .reset_index()
         .yards_gained.mean()
     )
-    league_pass_td = round(
+    league_pass_td = _round(
         data[(data.play_type == "pass") & (data.touchdown == 1)]
-        .groupby("posteam")["touchdown"]
+        .groupby("posteam", observed=True)["touchdown"]
         .sum()
         .reset_index()
         .touchdown.mean()
     )
-    league_interceptions = round(
+    league_interceptions = _round(
         data[(data.play_type == "pass") & (data.interception == 1)]
-        .groupby("posteam")["interception"]
+        .groupby("posteam", observed=True)["interception"]
         .sum()
         .reset_index()
         .interception.mean()
@@ -233,6 +404,7 @@ def league_avg_pass_stats(raw):
     )
 
 
+@splittable
 def team_rec_stats(team_data, team_abb):
     """
     Returns team receptions, avg pass length, yds/rec, and rec td
@@ -241,15 +413,16 @@ def team_rec_stats(team_data, team_abb):
     data = team_data[team_data.posteam == team_abb]
     data["pass_length"] = data.yards_gained - data.yards_after_catch
     # Metrics
-    receptions = round(data.complete_pass.sum())
-    avg_rec_yds = round(data[data.complete_pass == 1].yards_gained.mean(), 1)
-    avg_pass_length = round(data[data.complete_pass == 1].pass_length.mean(), 1)
-    yds_after_catch = round(data[data.complete_pass == 1].yards_after_catch.mean(), 1)
-    rec_td = round(data[data.complete_pass == 1].touchdown.sum())
+    receptions = _round(data.complete_pass.sum())
+    avg_rec_yds = _round(data[data.complete_pass == 1].yards_gained.mean(), 1)
+    avg_pass_length = _round(data[data.complete_pass == 1].pass_length.mean(), 1)
+    yds_after_catch = _round(data[data.complete_pass == 1].yards_after_catch.mean(), 1)
+    rec_td = _round(data[data.complete_pass == 1].touchdown.sum())
 
     return receptions, avg_rec_yds, avg_pass_length, yds_after_catch, rec_td
 
 
+@splittable
 def league_avg_rec_stats(raw):
     """
     Returns league receptions, avg pass length, yds/rec, and rec td
@@ -258,20 +431,20 @@ def league_avg_rec_stats(raw):
     data = raw.copy()
     data["pass_length"] = data.yards_gained - data.yards_after_catch
     # Metrics
-    league_receptions = round(
-        data.groupby("posteam")["complete_pass"]
+    league_receptions = _round(
+        data.groupby("posteam", observed=True)["complete_pass"]
         .sum()
         .reset_index()
         .complete_pass.mean()
     )
-    league_pass_length = round(data[data.play_type == "pass"].pass_length.mean(), 1)
-    league_rec_yards = round(data[data.complete_pass == 1].yards_gained.mean(), 1)
-    league_yds_after_catch = round(
+    league_pass_length = _round(data[data.play_type == "pass"].pass_length.mean(), 1)
+    league_rec_yards = _round(data[data.complete_pass == 1].yards_gained.mean(), 1)
+    league_yds_after_catch = _round(
         data[data.complete_pass == 1].yards_after_catch.mean(), 1
     )
-    league_rec_td = round(
+    league_rec_td = _round(
         data[data.complete_pass == 1]
-        .groupby("posteam")["touchdown"]
+        .groupby("posteam", observed=True)["touchdown"]
         .sum()
         .reset_index()
         .touchdown.mean()
@@ -285,6 +458,7 @@ def league_avg_rec_stats(raw):
     )
 
 
+@splittable
 def team_rush_stats(team_data, team_abb):
     """
     Returns team rushes, yds/rush, total rush yards, and rushing TD
@@ -292,14 +466,15 @@ def team_rush_stats(team_data, team_abb):
     # Data Adjustments
     data = team_data[team_data.posteam == team_abb]
     # Metrics
-    rushes = round(data.rush_attempt.sum())
-    avg_rush_length = round(data[data.rush_attempt == 1].yards_gained.mean(), 1)
-    rush_yards = round(data[data.rush_attempt == 1].yards_gained.sum())
-    rush_td = round(data[data.rush_attempt == 1].touchdown.sum())
+    rushes = _round(data.rush_attempt.sum())
+    avg_rush_length = _round(data[data.rush_attempt == 1].yards_gained.mean(), 1)
+    rush_yards = _round(data[data.rush_attempt == 1].yards_gained.sum())
+    rush_td = _round(data[data.rush_attempt == 1].touchdown.sum())
 
     return rushes, avg_rush_length, rush_yards, rush_td
 
 
+@splittable
 def league_avg_rush_stats(raw):
     """
     Returns league receptions, avg pass length, yds/rec, and rec td
@@ -307,20 +482,20 @@ def league_avg_rush_stats(raw):
     # Data Adjustments
     data = raw.copy()
     # Metrics
-    league_rushes = round(
-        data.groupby("posteam")["rush_attempt"].sum().reset_index().rush_attempt.mean()
+    league_rushes = _round(
+        data.groupby("posteam", observed=True)["rush_attempt"].sum().reset_index().rush_attempt.mean()
     )
-    league_rush_length = round(data[data.rush_attempt == 1].yards_gained.mean(), 1)
-    league_rush_yards = round(
+    league_rush_length = _round(data[data.rush_attempt == 1].yards_gained.mean(), 1)
+    league_rush_yards = _round(
         data[data.rush_attempt == 1]
-        .groupby("posteam")["yards_gained"]
+        .groupby("posteam", observed=True)["yards_gained"]
         .sum()
         .reset_index()
         .yards_gained.mean()
     )
-    league_rush_td = round(
+    league_rush_td = _round(
         data[data.rush_attempt == 1]
-        .groupby("posteam")["touchdown"]
+        .groupby("posteam", observed=True)["touchdown"]
         .sum()
         .reset_index()
         .touchdown.mean()
@@ -333,133 +508,150 @@ def league_avg_rush_stats(raw):
     )
 
 
-def team_def_stats(def_data):
+def drive_stats(drives):
+    """
+    Returns red zone TD %, points per drive, and three and outs for a set of
+    drives (from get_drives).
+    """
+    red_zone = drives[drives.red_zone]
+    rz_td_perc = _round((red_zone.result == "Touchdown").mean() * 100, 1)
+    pts_per_drive = _round(drives.points.mean(), 2)
+    three_and_outs = int(((drives.result == "Punt") & (drives.plays <= 3)).sum())
+    return rz_td_perc, pts_per_drive, three_and_outs
+
+
+@splittable
+def team_def_stats(def_data, def_drives):
     data = def_data.copy()
     df = pd.DataFrame()
     # tackles
-    df.loc[0, "tackles"] = round(data.assist_tackle.sum() + data.solo_tackle.sum())
+    df.loc[0, "tackles"] = _round(data.assist_tackle.sum() + data.solo_tackle.sum())
     # sacks
-    df["sacks"] = round(data.sack.sum())
+    df["sacks"] = _round(data.sack.sum())
     # yards allowed
-    df["yds_allowed"] = round(data.yards_gained.sum())
+    df["yds_allowed"] = _round(data.yards_gained.sum())
     # Turnovers
-    df["turnovers"] = round(data.interception.sum() + data.fumble_lost.sum())
+    df["turnovers"] = _round(data.interception.sum() + data.fumble_lost.sum())
     # TD
-    df["td"] = round(data[data.td_team == data.defteam].shape[0])
+    df["td"] = _round(data[data.td_team == data.defteam].shape[0])
     # tackles for loss
     df["tfl"] = data[
         ((data.solo_tackle == 1) | (data.assist_tackle == 1)) & (data.yards_gained < 0)
     ].shape[0]
     # sacks/game
-    df["sacks_per_game"] = round(data.groupby("week")["sack"].sum().mean(), 1)
+    df["sacks_per_game"] = _round(data.groupby("week")["sack"].sum().mean(), 1)
     # yards given/game
-    df["yds_given_per_game"] = round(data.groupby("week")["yards_gained"].sum().mean())
+    df["yds_given_per_game"] = _round(data.groupby("week")["yards_gained"].sum().mean())
     # 3rd down stop % (third_down_failed, third_down_converted)
-    df["third_perc"] = round(data[data.down == 3].third_down_failed.mean() * 100, 1)
+    df["third_perc"] = _round(data[data.down == 3].third_down_failed.mean() * 100, 1)
     # goal line stands
-    df["gl_stand_perc"] = round(
-        (
-            1
-            - data[data.goal_to_go == 1]
-            .groupby(["week", "drive"])["touchdown"]
-            .sum()
-            .mean()
-        )
-        * 100,
-        1,
+    df["gl_stand_perc"] = _round(
+        (1 - def_drives[def_drives.goal_to_go == 1].gtg_td.mean()) * 100, 1,
     )
+    # drive level
+    rz_td_perc, pts_per_drive, three_and_outs = drive_stats(def_drives)
+    df["rz_td_perc"] = rz_td_perc
+    df["pts_per_drive"] = pts_per_drive
+    df["three_and_outs"] = three_and_outs
 
     return df
 
 
-def league_def_stats(data):
+@splittable
+def league_def_stats(data, drives):
     data = data.copy()
     data["total_tackles"] = data.solo_tackle + data.assist_tackle
     data["total_turnovers"] = data.interception + data.fumble_lost
-    grouped = data.groupby(["defteam"])
+    grouped = data.groupby(["defteam"], observed=True)
     df = pd.DataFrame()
     # tackles
-    df.loc[0, "tackles"] = round(grouped.total_tackles.sum().mean())
+    df.loc[0, "tackles"] = _round(grouped.total_tackles.sum().mean())
     # sacks
-    df["sacks"] = round(grouped.sack.sum().mean())
+    df["sacks"] = _round(grouped.sack.sum().mean())
     # yards allowed
-    df["yds_allowed"] = round(grouped.yards_gained.sum().mean())
+    df["yds_allowed"] = _round(grouped.yards_gained.sum().mean())
     # Turnovers
-    df["turnovers"] = round(grouped.total_turnovers.sum().mean())
+    df["turnovers"] = _round(grouped.total_turnovers.sum().mean())
     # TD
-    df["td"] = round(
-        data[data.td_team == data.defteam].groupby("defteam").size().mean(), 1
+    df["td"] = _round(
+        data[data.td_team == data.defteam].groupby("defteam", observed=True).size().mean(), 1
     )
     # tackles for loss
-    df["tfl"] = round(
+    df["tfl"] = _round(
         data[
             ((data.solo_tackle == 1) | (data.assist_tackle == 1))
             & (data.yards_gained < 0)
         ]
-        .groupby("defteam")
+        .groupby("defteam", observed=True)
         .size()
         .mean()
     )
     # sacks/game
-    df["sacks_per_game"] = round(
-        data.groupby(["defteam", "week"])["sack"].sum().mean(), 1
+    df["sacks_per_game"] = _round(
+        data.groupby(["defteam", "week"], observed=True)["sack"].sum().mean(), 1
     )
     # yards given/game
-    df["yds_given_per_game"] = round(
-        data.groupby(["defteam", "week"])["yards_gained"].sum().mean()
+    df["yds_given_per_game"] = _round(
+        data.groupby(["defteam", "week"], observed=True)["yards_gained"].sum().mean()
     )
     # 3rd down stop % (third_down_failed, third_down_converted)
-    df["third_perc"] = round(
-        data[data.down == 3].groupby("defteam")["third_down_failed"].mean().mean()
+    df["third_perc"] = _round(
+        data[data.down == 3].groupby("defteam", observed=True)["third_down_failed"].mean().mean()
         * 100,
         1,
     )
 
     # goal line stands
-    df["gl_stand_perc"] = round(
+    df["gl_stand_perc"] = _round(
         (
             1
-            - data[data.goal_to_go == 1]
-            .groupby(["defteam", "week", "drive"])["touchdown"]
-            .sum()
-            .reset_index()
-            .groupby("defteam")["touchdown"]
+            - drives[drives.goal_to_go == 1]
+            .groupby("defteam", observed=True)["gtg_td"]
             .mean()
             .mean()
         )
         * 100,
         1,
     )
+    # drive level, averaged over defenses
+    by_team = pd.DataFrame(
+        [drive_stats(team_drives) for _, team_drives in drives.groupby("defteam", observed=True)],
+        columns=["rz_td_perc", "pts_per_drive", "three_and_outs"],
+    )
+    df["rz_td_perc"] = _round(by_team.rz_td_perc.mean(), 1)
+    df["pts_per_drive"] = _round(by_team.pts_per_drive.mean(), 2)
+    df["three_and_outs"] = _round(by_team.three_and_outs.mean())
 
     return df
 
 
+@splittable
 def get_qb_stats(data):
     data = data.copy()
     # Pass Yds
-    pass_yds = round(data[data.complete_pass == 1].yards_gained.sum())
+    pass_yds = _round(data[data.complete_pass == 1].yards_gained.sum())
     # Yds/Att
-    yds_per_att = round(pass_yds / data[data.sack == 0].shape[0], 1)
+    yds_per_att = analytics.ratio(pass_yds, data[data.sack == 0].shape[0], 1)
     # Att
     att = data.shape[0]
     # Completions
     comp = data[data.complete_pass == 1].shape[0]
     # Cmp %
-    comp_perc = round((comp / att) * 100, 1)
+    comp_perc = analytics.ratio(comp * 100, att, 1)
     # TD
-    td = round(data.pass_touchdown.sum())
+    td = _round(data.pass_touchdown.sum())
     # INT
-    interceptions = round(data.interception.sum())
+    interceptions = _round(data.interception.sum())
     # 20+ yards
     over_20 = data[(data.yards_gained >= 20) & (data.sack == 0)].shape[0]
     # 40+ yards
     over_40 = data[(data.yards_gained >= 40) & (data.sack == 0)].shape[0]
     # Longest pass
-    long_pass = round(data.yards_gained.max())
+    long_pass = _round(data.yards_gained.max())
     # Sacks
-    sacks = round(data.sack.sum())
+    sacks = _round(data.sack.sum())
     # Sack yards
-    sack_yards = round(data[data.sack == 1].yards_gained.sum())
+    sack_yards = _round(data[data.sack == 1].yards_gained.sum())
 
     return (
         pass_yds,
@@ -476,3 +668,405 @@ def get_qb_stats(data):
         sack_yards,
     )
 
+
+
+# ---- Season level results ----
+# Column names for the tuples returned by the stat functions above, shared by
+# the team and league results so one can be compared against the other.
+PASS_STATS = ["pass_attempts", "comp_perc", "pass_yards", "pass_td", "interceptions"]
+REC_STATS = ["receptions", "avg_rec_yds", "avg_pass_length", "yds_after_catch", "rec_td"]
+RUSH_STATS = ["rushes", "avg_rush_length", "rush_yards", "rush_td"]
+
+
+def offense_yards(plays):
+    """
+    Returns per team per week total, rushing and passing yards from plays, with
+    the same columns as the team cube. Used when a split rules out the cube.
+    """
+    plays = plays[plays.posteam.notna()]
+    yards = (
+        plays.assign(
+            pass_yards=plays.yards_gained.where(plays.play_type == "pass", 0),
+            rush_yards=plays.yards_gained.where(plays.play_type == "run", 0),
+        )
+        .groupby(["posteam", "week"], observed=True)
+        .agg(
+            yards=("yards_gained", "sum"),
+            pass_yards=("pass_yards", "sum"),
+            rush_yards=("rush_yards", "sum"),
+        )
+        .reset_index()
+        .rename(columns={"posteam": "team"})
+    )
+    return yards
+
+
+def data_version(years):
+    """
+    Returns the store versions for years, for use in cache keys.
+    """
+    return tuple(store.ensure_season(year) for year in years)
+
+
+def get_team_kpis(years, game_type_pick, team_abb, split=()):
+    """
+    Returns every Team Stats KPI for a team as a one row dataframe.
+
+    params:
+        years (int): list of years to get data for.
+        game_type_pick (str): "Regular Season", "Playoffs", or "All Games".
+        team_abb (str): team abbreviation.
+        split (tuple): situational split from filters.make_split. Game results
+            and drive level stats are not affected by it.
+    """
+    return _team_kpis(
+        list(years), game_type_pick, team_abb, tuple(split), data_version(years)
+    )
+
+
+@memory.memo(max_entries=256)
+@diskcache.disk_cache
+def _team_kpis(years, game_type_pick, team_abb, split, version):
+    games = game_type_filter(get_games(years), game_type_pick)
+    drives = game_type_filter(get_drives(years), game_type_pick)
+    team_data = get_partitions(years).team_plays(
+        team_abb, game_type_pick, split=split
+    )
+    if split:
+        cube = offense_yards(team_data)
+        team_epa = analytics.build_team_epa(team_data)
+    else:
+        cube = game_type_filter(get_team_cube(years), game_type_pick)
+        team_epa = game_type_filter(get_team_epa(years), game_type_pick)
+    team_cube = cube[cube.team == team_abb]
+    team_games = team_season_filter(games, team_abb)
+
+    row = dict(
+        zip(
+            ["wins", "losses", "avg_points", "avg_points_against"],
+            season_kpis(team_games, team_abb),
+        )
+    )
+    row["total_yds"] = _round(team_cube.yards.sum())
+    row["yds_per_game"] = _round(team_cube.yards.mean())
+    row["rush_yds"] = _round(team_cube.rush_yards.sum())
+    row["pass_yds"] = _round(team_cube.pass_yards.sum())
+    row.update(zip(PASS_STATS, team_pass_stats(team_data, team_abb)))
+    row.update(zip(REC_STATS, team_rec_stats(team_data, team_abb)))
+    row.update(zip(RUSH_STATS, team_rush_stats(team_data, team_abb)))
+    row.update(
+        team_def_stats(
+            team_data[team_data.defteam == team_abb], drives[drives.defteam == team_abb]
+        ).iloc[0]
+    )
+    row.update(
+        zip(analytics.TEAM_EPA_STATS, analytics.team_epa_stats(team_epa, team_abb))
+    )
+    if team_games.empty:
+        # e.g. the playoffs of a team that missed them; its zero counts would
+        # read as a real season
+        row = dict.fromkeys(row, np.nan)
+    return pd.DataFrame([row])
+
+
+def get_league_baselines(years, game_type_pick, split=()):
+    """
+    Returns league averages for the Team Stats KPIs as a one row dataframe with
+    the same columns as get_team_kpis.
+    """
+    return _league_baselines(
+        list(years), game_type_pick, tuple(split), data_version(years)
+    )
+
+
+@memory.memo(max_entries=64)
+@diskcache.disk_cache
+def _league_baselines(years, game_type_pick, split, version):
+    data = get_partitions(years).game_type(game_type_pick, split)
+    games = game_type_filter(get_games(years), game_type_pick)
+    if split:
+        cube = offense_yards(data)
+        team_epa = analytics.build_team_epa(data)
+    else:
+        cube = game_type_filter(get_team_cube(years), game_type_pick)
+        team_epa = game_type_filter(get_team_epa(years), game_type_pick)
+    drives = game_type_filter(get_drives(years), game_type_pick)
+    by_team = cube.groupby("team", observed=True)
+
+    # every team scores in each game it plays, so the league average is the
+    # same for points for and against
+    avg_points = _round(
+        (games.home_score.sum() + games.away_score.sum()) / (2 * games.shape[0]), 1
+    )
+    row = {
+        "wins": np.nan,
+        "losses": np.nan,
+        "avg_points": avg_points,
+        "avg_points_against": avg_points,
+        "total_yds": _round(by_team.yards.sum().mean()),
+        "yds_per_game": _round(cube.yards.mean()),
+        "rush_yds": _round(by_team.rush_yards.sum().mean()),
+        "pass_yds": _round(by_team.pass_yards.sum().mean()),
+    }
+    row.update(zip(PASS_STATS, league_avg_pass_stats(data)))
+    row.update(zip(REC_STATS, league_avg_rec_stats(data)))
+    row.update(zip(RUSH_STATS, league_avg_rush_stats(data)))
+    row.update(league_def_stats(data, drives).iloc[0])
+    row.update(zip(analytics.TEAM_EPA_STATS, analytics.team_epa_stats(team_epa)))
+    return pd.DataFrame([row])
+
+
+# most points drawn in a game timeline, enough for a smooth line at page width
+TIMELINE_POINTS = 120
+
+
+def get_game_timeline(years, game_id, team_abb):
+    """
+    Returns the win probability and score of a game after every play, from
+    team_abb's side, decimated to at most TIMELINE_POINTS plays.
+
+    Returns:
+        Dataframe with play, qtr, win_prob (0-100), team_score and opp_score.
+    """
+    return _game_timeline(list(years), game_id, team_abb, data_version(years))
+
+
+@memory.memo(max_entries=256)
+def _game_timeline(years, game_id, team_abb, version):
+    plays = get_partitions(years).game_plays(game_id)
+    plays = plays[plays.home_wp.notna()]
+    home = (plays.home_team == team_abb).to_numpy()
+    home_wp = plays.home_wp.to_numpy()
+    home_score = plays.total_home_score.to_numpy()
+    away_score = plays.total_away_score.to_numpy()
+    timeline = pd.DataFrame(
+        {
+            "play": np.arange(1, len(plays) + 1),
+            "qtr": plays.qtr.to_numpy(),
+            "win_prob": 100 * np.where(home, home_wp, 1 - home_wp),
+            "team_score": np.where(home, home_score, away_score),
+            "opp_score": np.where(home, away_score, home_score),
+        }
+    )
+    keep = kernels.lttb(timeline.play, timeline.win_prob, TIMELINE_POINTS)
+    return timeline.iloc[keep].reset_index(drop=True)
+
+
+def get_team_ratings(years, game_type_pick):
+    """
+    Returns opponent adjusted ratings (see ratings.py) for every team, one row
+    per team per season, with each team's srs rank in the season.
+    """
+    return pd.concat(
+        [
+            _team_ratings(year, game_type_pick, store.ensure_season(year))
+            for year in years
+        ],
+        ignore_index=True,
+    )
+
+
+@memory.memo(max_entries=64)
+def _team_ratings(season, game_type_pick, version):
+    # systems outlive versions: the margins of the season's few hundred games
+    # are recomputed, but only new games and games whose margins changed in a
+    # refresh touch the season's existing normal equations
+    system = _rating_systems.setdefault(
+        (season, game_type_pick), ratings.RatingSystem()
+    )
+    system.add(
+        ratings.game_margins(
+            game_type_filter(get_games([season]), game_type_pick),
+            game_type_filter(get_team_epa([season]), game_type_pick),
+        )
+    )
+    table = system.ratings()
+    table.insert(0, "season", season)
+    table["rank"] = table.srs.rank(ascending=False, method="min").astype(int)
+    return table
+
+
+_rating_systems = {}
+memory.watch("funcs._rating_systems", _rating_systems)
+
+
+def get_standings(years, through_week=None):
+    """
+    Returns the regular season standings (see standings.py) of years as of the
+    end of through_week, or of the whole season when None, one row per team per
+    season. Every week of a season is computed at once and cached, so moving
+    through_week only filters.
+    """
+    frames = []
+    for year in years:
+        weekly = _standings(year, store.ensure_season(year))
+        if through_week is not None:
+            weekly = weekly[weekly.week <= through_week]
+        table = weekly[weekly.week == weekly.week.max()].copy()
+        table.insert(0, "season", year)
+        frames.append(table)
+    return pd.concat(frames, ignore_index=True)
+
+
+@memory.memo(max_entries=64)
+@diskcache.disk_cache
+def _standings(season, version):
+    return standings.weekly_standings(get_games([season]), get_team_info())
+
+
+def get_team_trends(years, game_type_pick, window):
+    """
+    Returns trends.TEAM_METRICS over windows of window games (see
+    trends.windowed) for every team, one row per team per game. Computed from
+    the per game tables and cached per window.
+    """
+    return pd.concat(
+        [
+            _team_trends(year, game_type_pick, window, store.ensure_season(year))
+            for year in years
+        ],
+        ignore_index=True,
+    )
+
+
+@memory.memo(max_entries=128)
+def _team_trends(season, game_type_pick, window, version):
+    weeks = trends.team_weeks(
+        game_type_filter(get_team_cube([season]), game_type_pick),
+        game_type_filter(get_team_epa([season]), game_type_pick),
+    )
+    return trends.windowed(weeks, "team", trends.TEAM_METRICS, window)
+
+
+def get_qb_trends(years, window):
+    """
+    Returns trends.QB_METRICS over windows of window games for every passer,
+    one row per passer per week, like get_team_trends.
+    """
+    return pd.concat(
+        [_qb_trends(year, window, store.ensure_season(year)) for year in years],
+        ignore_index=True,
+    )
+
+
+@memory.memo(max_entries=64)
+def _qb_trends(season, window, version):
+    weeks = trends.qb_weeks(get_passer_weeks([season]), get_passer_epa([season]))
+    return trends.windowed(weeks, "passer_id", trends.QB_METRICS, window)
+
+
+# seasons searched for similar team-seasons and QB-seasons
+SIMILARITY_SEASONS = list(range(1999, 2022))
+
+
+def similarity_seasons():
+    """
+    Returns the SIMILARITY_SEASONS that are in the store.
+    """
+    return [x for x in store.stored_seasons() if x in SIMILARITY_SEASONS]
+
+
+def get_similarity_index(entity, build=False):
+    """
+    Returns the similarity.SimilarityIndex of "team" seasons, keyed by
+    (season, team), or "qb" seasons, keyed by (season, passer_id), over the
+    stored SIMILARITY_SEASONS, shared by every session. Only snapshot.warm
+    builds it (build=True); pages get it from the snapshot and get None while
+    it has not been built, so asking for it never loads a season.
+    """
+    seasons = similarity_seasons()
+    if not seasons:
+        return None
+    version = tuple(store.season_version(x) for x in seasons)
+    cached = _similarity.get(entity)
+    if cached is not None and cached[0] == version:
+        memory.hit("funcs._similarity", entity)
+        return cached[1]
+    index = _flight.do(
+        ("similarity", entity), _similarity_index, entity, seasons, version, build
+    )
+    if index is not None:
+        _similarity[entity] = (version, index)
+        memory.record("funcs._similarity", entity)
+    return index
+
+
+_similarity = {}
+memory.watch("funcs._similarity", _similarity)
+
+
+def _similarity_index(entity, seasons, version, build):
+    columns = similarity.TEAM_FEATURES if entity == "team" else similarity.QB_FEATURES
+    features = memory.restore("funcs._similarity_index", (entity, version))
+    if features is None:
+        if not build:
+            return None
+        features = _similarity_features(entity, seasons)
+        memory.capture("funcs._similarity_index", (entity, version), features)
+    return similarity.SimilarityIndex(features, columns)
+
+
+def _similarity_features(entity, seasons):
+    frames = {}
+    for season in seasons:
+        games = get_games([season])
+        if entity == "team":
+            frames[season] = similarity.team_features(
+                games, get_team_cube([season]), get_team_epa([season])
+            )
+        else:
+            last_week = games[games.season_type == "REG"].week.max()
+            features = similarity.qb_features(
+                get_passer_weeks([season]), get_passer_epa([season]), last_week
+            )
+            names = store.read_pbp(season, columns=["passer_id", "passer_player_name"])
+            names = names.dropna().drop_duplicates("passer_id").set_index("passer_id")
+            features.insert(0, "name", names.passer_player_name.reindex(features.index))
+            frames[season] = features
+    return pd.concat(
+        frames, names=["season", "team" if entity == "team" else "passer_id"]
+    )
+
+
+def get_search_indexes(years):
+    """
+    Returns a dict of season to its search.SeasonIndex for years, opened once
+    per store version and shared by every session.
+    """
+    indexes = {}
+    for year in years:
+        version = store.ensure_season(year)
+        cached = _search_indexes.get(year)
+        if cached is not None and cached[0] == version:
+            memory.hit("funcs._search_indexes", year)
+        else:
+            if not os.path.exists(store.arrow_path(year)):
+                store.map_pbp(year)  # seasons stored before the Arrow files
+            cached = (
+                version,
+                search.SeasonIndex(store.search_path(year), store.arrow_path(year)),
+            )
+            _search_indexes[year] = cached
+            memory.record("funcs._search_indexes", year)
+        indexes[year] = cached[1]
+    return indexes
+
+
+_search_indexes = {}
+memory.watch("funcs._search_indexes", _search_indexes)
+
+
+def search_plays(
+    years, words="", fields=None, flags=(), ranges=None, phrase=False, limit=500
+):
+    """
+    Returns the plays of years matching a search (see search.parse for the
+    arguments), newest seasons first, and the total number of matches.
+
+    params:
+        ranges (dict): search.RANGE_COLUMNS column -> (low, high), either
+            bound may be None.
+        limit (int): most plays returned.
+    """
+    tokens, phrase = search.parse(words, fields, flags, phrase)
+    return search.search(get_search_indexes(years), tokens, ranges, phrase, limit)
@@ -0,0 +1,107 @@
+"""
+Array kernels for per-group per-week totals and series decimation.
+
+weekly_sums takes plain NumPy columns (group codes, week, values) and fills every
+group x week counter in one pass, replacing a pandas groupby per metric. It is
+compiled with numba when numba is installed and falls back to np.bincount.
+lttb picks the points of a long series worth plotting.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional
+    numba = None
+
+
+def _weekly_sums_numpy(group, week, values, n_groups, n_weeks):
+    valid = (group >= 0) & (week >= 0) & (week < n_weeks)
+    flat = group[valid] * n_weeks + week[valid]
+    size = n_groups * n_weeks
+    sums = np.empty((size, values.shape[1]))
+    for j in range(values.shape[1]):
+        sums[:, j] = np.bincount(
+            flat, weights=np.nan_to_num(values[valid, j]), minlength=size
+        )
+    counts = np.bincount(flat, minlength=size)
+    return (
+        sums.reshape(n_groups, n_weeks, values.shape[1]),
+        counts.reshape(n_groups, n_weeks),
+    )
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _weekly_sums_jit(group, week, values, n_groups, n_weeks):
+        sums = np.zeros((n_groups, n_weeks, values.shape[1]))
+        counts = np.zeros((n_groups, n_weeks), dtype=np.int64)
+        for i in range(group.shape[0]):
+            g = group[i]
+            w = week[i]
+            if g < 0 or w < 0 or w >= n_weeks:
+                continue
+            counts[g, w] += 1
+            for j in range(values.shape[1]):
+                v = values[i, j]
+                if v == v:  # skip NaN like pandas sum
+                    sums[g, w, j] += v
+        return sums, counts
+
+
+def weekly_sums(group, week, values, n_groups, n_weeks):
+    """
+    Returns per group per week sums of values and row counts.
+
+    params:
+        group (ndarray): int codes per row, -1 for rows to skip.
+        week (ndarray): int week per row.
+        values (ndarray): float array of shape (rows, metrics). NaN counts as 0.
+        n_groups (int): number of group codes.
+        n_weeks (int): number of weeks, one more than the largest week.
+
+    Returns:
+        sums with shape (n_groups, n_weeks, metrics) and counts with shape
+        (n_groups, n_weeks).
+    """
+    group = np.ascontiguousarray(group, dtype=np.int64)
+    week = np.ascontiguousarray(week, dtype=np.int64)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if numba is not None:
+        return _weekly_sums_jit(group, week, values, n_groups, n_weeks)
+    return _weekly_sums_numpy(group, week, values, n_groups, n_weeks)
+
+
+def lttb(x, y, threshold):
+    """
+    Returns the positions of the points kept when decimating a series to
+    threshold points with Largest-Triangle-Three-Buckets, which keeps the
+    peaks and swings a plain stride would drop.
+
+    params:
+        x (ndarray): increasing x values.
+        y (ndarray): y values.
+        threshold (int): number of points to keep. Series this short or
+            shorter are kept whole.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # the first and last points are always kept, the rest is split in buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        after = slice(stop, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        avg_x, avg_y = x[after].mean(), y[after].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
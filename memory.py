@@ -0,0 +1,346 @@
+"""
+In-process caches and memory use, for the admin memory page.
+
+memo replaces st.experimental_memo on the funcs loaders and aggregates. Every call
+counts as a hit, and the first computation of a key records its time and the
+deep size of its result. Module level dict caches (mapped seasons, partitions,
+similarity indexes, ...) are registered with watch. Their hits and ages come from
+hit/record calls where they are read and built, and they are measured when
+listed. lru_cache functions are registered with watch_lru and listed with their
+cache_info. Every kind can be evicted with evict. A snapshot of computed
+entries can be restored from with restore_from (see snapshot.py).
+
+tracemalloc is off unless start_tracing is called. While it is on, the
+allocations made between begin_rerun and end_rerun (called around each app
+rerun) are kept for the last rerun of any session.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+# allocation sites kept from the last traced rerun
+TOP_ALLOCATIONS = 25
+
+_lock = threading.Lock()
+# cache name -> key -> {"created", "last", "hits", "bytes"}
+_stats = {}
+# cache name -> ("memo", clear function) | ("dict", dict) | ("lru", function)
+_caches = {}
+_rerun = threading.local()
+_last_rerun = {}
+# entries read on misses before computing (a snapshot.Snapshot), and a
+# callback given every computed entry (used by snapshot.take)
+_source = None
+_capture = None
+
+
+def record(name, key, nbytes=None):
+    """
+    Records that the entry key of cache name was just built. nbytes is the deep
+    size of the entry when it cannot be measured later. Entries are listed by
+    the repr of their key.
+    """
+    now = time.time()
+    with _lock:
+        _stats.setdefault(name, {})[repr(key)] = {
+            "created": now,
+            "last": now,
+            "hits": 0,
+            "bytes": nbytes,
+        }
+
+
+def hit(name, key):
+    """
+    Records that the entry key of cache name was read.
+    """
+    with _lock:
+        entry = _stats.get(name, {}).get(repr(key))
+        if entry is not None:
+            entry["hits"] += 1
+            entry["last"] = time.time()
+
+
+def restore_from(source):
+    """
+    Makes misses look up source.get(name, repr(key)) before computing, where
+    a result of None means not found.
+    """
+    global _source
+    _source = source
+
+
+def capture_into(callback):
+    """
+    Calls callback(name, key, value) with every entry computed from now on, or
+    stops when callback is None.
+    """
+    global _capture
+    _capture = callback
+
+
+def restore(name, key):
+    """
+    Returns the entry key of cache name from the restore source, or None.
+    """
+    return None if _source is None else _source.get(name, repr(key))
+
+
+def capture(name, key, value):
+    """
+    Hands a freshly computed entry to the capture callback, if any.
+    """
+    if _capture is not None:
+        _capture(name, key, value)
+
+
+def memo(func=None, *, max_entries=None):
+    """
+    st.experimental_memo that records the age, hits and deep size of its
+    entries under "<module>.<function>", and that looks misses up in the
+    restore source first. Use as @memo or @memo(max_entries=64).
+    """
+    if func is None:
+        return functools.partial(memo, max_entries=max_entries)
+    import streamlit as st
+
+    name = f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def miss(*args):
+        result = restore(name, args)
+        if result is None:
+            result = func(*args)
+            capture(name, args, result)
+        record(name, args, deep_size(result))
+        with _lock:
+            entries = _stats[name]
+            # mirror the memo's own eviction of its least recently used entries
+            while max_entries is not None and len(entries) > max_entries:
+                del entries[min(entries, key=lambda x: entries[x]["last"])]
+        return result
+
+    # st.cache_data is experimental_memo renamed; newer Streamlit versions warn
+    # on the old name in the page, before set_page_config
+    cache_data = getattr(st, "cache_data", None) or st.experimental_memo
+    cached = cache_data(max_entries=max_entries)(miss)
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        start = time.time()
+        result = cached(*args)
+        entry = _stats.get(name, {}).get(repr(args))
+        if entry is None:
+            # cached before it was recorded, e.g. by an earlier import of the module
+            record(name, args)
+        elif entry["created"] < start:
+            hit(name, args)
+        return result
+
+    def clear():
+        cached.clear()
+        with _lock:
+            _stats.pop(name, None)
+
+    wrapper.clear = clear
+    _caches[name] = ("memo", clear)
+    return wrapper
+
+
+def watch(name, cache):
+    """
+    Lists the dict cache under name. Entries are measured when listed.
+    """
+    _caches[name] = ("dict", cache)
+
+
+def watch_lru(name, func):
+    """
+    Lists the functools.lru_cache function func under name, as one row.
+    """
+    _caches[name] = ("lru", func)
+
+
+def deep_size(obj, seen=None):
+    """
+    Returns the bytes held by obj and everything it references. Objects in seen
+    (a set of ids) are not counted again, so a frame shared by several entries
+    counts toward the first one measured.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(
+            deep_size(k, seen) + deep_size(v, seen) for k, v in list(obj.items())
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(x, seen) for x in list(obj))
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return size + deep_size(vars(obj), seen)
+    return size
+
+
+def entries():
+    """
+    Returns one row per cached entry with cache, key, bytes, age (seconds since
+    it was built) and hits, largest first. Unknown values are NaN.
+    """
+    now = time.time()
+    seen = set()
+    rows = []
+    for name, (kind, cache) in list(_caches.items()):
+        with _lock:
+            stats = {k: dict(v) for k, v in _stats.get(name, {}).items()}
+        if kind == "lru":
+            info = cache.cache_info()
+            rows.append((name, f"({info.currsize} entries)", np.nan, np.nan, info.hits))
+            continue
+        if kind == "memo":
+            items = [(key, None) for key in stats]
+        else:
+            items = [(repr(key), value) for key, value in list(cache.items())]
+        for key, value in items:
+            entry = stats.get(key, {})
+            nbytes = entry.get("bytes") if kind == "memo" else deep_size(value, seen)
+            rows.append(
+                (
+                    name,
+                    key,
+                    np.nan if nbytes is None else nbytes,
+                    now - entry["created"] if "created" in entry else np.nan,
+                    entry.get("hits", np.nan),
+                )
+            )
+    table = pd.DataFrame(rows, columns=["cache", "key", "bytes", "age", "hits"])
+    return table.sort_values("bytes", ascending=False, ignore_index=True)
+
+
+def caches():
+    """
+    Returns the names of the registered caches.
+    """
+    return sorted(_caches)
+
+
+def cache_keys(name):
+    """
+    Returns the keys of a registered cache as listed by entries.
+    """
+    kind, cache = _caches[name]
+    if kind == "memo":
+        return list(_stats.get(name, {}))
+    if kind == "dict":
+        return [repr(x) for x in list(cache)]
+    return []
+
+
+def evict(name, keys=None):
+    """
+    Removes keys (as listed by entries) from a cache, or every entry when keys
+    is None. Memo and lru caches can only be cleared whole.
+    """
+    kind, cache = _caches[name]
+    if kind == "memo":
+        cache()
+    elif kind == "lru":
+        cache.cache_clear()
+    else:
+        for key in list(cache):
+            if keys is None or repr(key) in keys:
+                cache.pop(key, None)
+        with _lock:
+            stats = _stats.get(name, {})
+            for key in list(stats):
+                if keys is None or key in keys:
+                    del stats[key]
+
+
+def rss():
+    """
+    Returns the resident set size of this process in bytes. Where /proc is
+    missing this is the peak rather than the current size.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---- tracemalloc ----
+def tracing():
+    return tracemalloc.is_tracing()
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _last_rerun.clear()
+
+
+def _snapshot():
+    # leave out tracemalloc's own bookkeeping
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+
+
+def begin_rerun():
+    """
+    Call at the start of a rerun; takes a snapshot if tracing is on.
+    """
+    _rerun.start = _snapshot() if tracemalloc.is_tracing() else None
+
+
+def end_rerun():
+    """
+    Call at the end of a rerun; keeps the allocations made since begin_rerun.
+    """
+    start = getattr(_rerun, "start", None)
+    _rerun.start = None
+    if start is None or not tracemalloc.is_tracing():
+        return
+    diff = _snapshot().compare_to(start, "lineno")
+    _last_rerun.update(
+        finished=time.time(),
+        top=[
+            (str(x.traceback[0]), x.size_diff, x.count_diff)
+            for x in diff[:TOP_ALLOCATIONS]
+        ],
+    )
+
+
+def last_rerun_allocations():
+    """
+    Returns the top allocation sites of the last traced rerun by growth, with
+    location, bytes and blocks, or None if no rerun has been traced.
+    """
+    if not _last_rerun:
+        return None
+    return pd.DataFrame(_last_rerun["top"], columns=["location", "bytes", "blocks"])
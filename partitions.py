@@ -0,0 +1,167 @@
+"""
+Precomputed partitions of a loaded season.
+
+Filtering a season by season_type or team with boolean masks scans every play on
+every rerun. SeasonPartitions does those scans once when the season is loaded and
+keeps the row positions, so page filters become slices or takes.
+"""
+import numpy as np
+import pandas as pd
+
+import dims
+import filters
+
+
+# game type picks on the pages mapped to the season types they cover
+GAME_TYPES = {
+    "Regular Season": ["REG"],
+    "Playoffs": ["POST"],
+    "All Games": dims.SEASON_TYPES,
+}
+ROLES = ["home_team", "away_team", "posteam", "defteam"]
+
+
+def _group_rows(codes):
+    """
+    Returns a dict of code to the sorted row positions holding that code.
+    """
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    present = np.unique(sorted_codes[sorted_codes >= 0])
+    starts = np.searchsorted(sorted_codes, present, side="left")
+    stops = np.searchsorted(sorted_codes, present, side="right")
+    return {
+        code: order[start:stop] for code, start, stop in zip(present, starts, stops)
+    }
+
+
+def _select(data, rows):
+    # contiguous runs of rows are sliced so the result shares memory with data
+    if len(rows) == 0:
+        return data.iloc[0:0]
+    if rows[-1] - rows[0] + 1 == len(rows):
+        return data.iloc[rows[0] : rows[-1] + 1]
+    return data.take(rows)
+
+
+class SeasonPartitions:
+    """Row positions of a season by season_type, team role and game.
+    Usage:
+        parts = SeasonPartitions(data)
+        reg = parts.game_type("Regular Season")
+        team_data = parts.team_plays("KC", "Regular Season")
+
+    data must have the shared categoricals from dims.normalize and must not be
+    modified afterwards.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._season_type = data.season_type.cat.codes.to_numpy()
+        self._season_types = {
+            data.season_type.cat.categories[code]: rows
+            for code, rows in _group_rows(self._season_type).items()
+        }
+        self._teams = {}
+        for role in ROLES:
+            column = data[role]
+            self._teams[role] = {
+                column.cat.categories[code]: rows
+                for code, rows in _group_rows(column.cat.codes.to_numpy()).items()
+            }
+        self._games = None
+
+    def season_type_rows(self, game_type_pick):
+        """
+        Returns the sorted row positions of the season types in a game type pick.
+        """
+        rows = [
+            self._season_types[x]
+            for x in GAME_TYPES[game_type_pick]
+            if x in self._season_types
+        ]
+        if not rows:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate(rows))
+
+    def game_type(self, game_type_pick, split=()):
+        """
+        Returns the plays for "Regular Season", "Playoffs", or "All Games",
+        limited to the plays matching split (see filters.make_split).
+        """
+        if game_type_pick == "All Games":
+            if not split:
+                return self.data
+            rows = np.arange(len(self.data))
+        else:
+            rows = self.season_type_rows(game_type_pick)
+        return _select(self.data, self.split_rows(rows, split))
+
+    def split_rows(self, rows, split):
+        """
+        Returns the subset of rows matching split. The split mask is computed
+        over the whole season once and cached, however many filters reuse it.
+        """
+        if not split:
+            return rows
+        return rows[filters.split_mask(self.data, split)[rows]]
+
+    def team_rows(
+        self,
+        team,
+        game_type_pick="All Games",
+        roles=("home_team", "away_team"),
+        split=(),
+    ):
+        """
+        Returns the sorted row positions of plays where team fills any of roles,
+        limited to the season types in game_type_pick and the plays matching split.
+        """
+        empty = np.array([], dtype=np.int64)
+        rows = np.unique(
+            np.concatenate([self._teams[role].get(team, empty) for role in roles])
+        )
+        if game_type_pick != "All Games":
+            codes = [
+                self.data.season_type.cat.categories.get_loc(x)
+                for x in GAME_TYPES[game_type_pick]
+            ]
+            rows = rows[np.isin(self._season_type[rows], codes)]
+        return self.split_rows(rows, split)
+
+    def team_plays(
+        self,
+        team,
+        game_type_pick="All Games",
+        roles=("home_team", "away_team"),
+        split=(),
+    ):
+        """
+        Returns the plays where team fills any of roles. By default these are
+        all plays from the team's games, the same as funcs.team_season_filter.
+        """
+        return _select(self.data, self.team_rows(team, game_type_pick, roles, split))
+
+    def has_team(self, team, game_type_pick="All Games"):
+        """
+        Returns True if team has an offensive play in game_type_pick.
+        """
+        return len(self.team_rows(team, game_type_pick, roles=("posteam",))) > 0
+
+    def game_rows(self, game_id):
+        """
+        Returns the sorted row positions of a game's plays. The game index is
+        built the first time a game is asked for.
+        """
+        if self._games is None:
+            codes, game_ids = pd.factorize(self.data.game_id)
+            self._games = {
+                game_ids[code]: rows for code, rows in _group_rows(codes).items()
+            }
+        return self._games.get(game_id, np.array([], dtype=np.int64))
+
+    def game_plays(self, game_id):
+        """
+        Returns the plays of one game.
+        """
+        return _select(self.data, self.game_rows(game_id))
@@ -0,0 +1,127 @@
+"""
+Per player weekly totals for receivers and rushers.
+
+Each entry of POSITIONS says which id column a position is grouped by, which plays
+count for it, and which columns are summed. build_player_weeks factorizes the id
+column once and sums every metric of the position in one kernels.weekly_sums pass
+over the matching plays, so a position costs one scan of a season when the season
+is stored and none after that. player_totals turns weekly rows into season totals
+and the rates listed for the position.
+
+Passers are not a position here: the QB page reads its own tables
+(aggregates.build_passer_weeks and the passer index).
+"""
+import numpy as np
+import pandas as pd
+
+import kernels
+
+
+# count:  name of the column counting the matching plays
+# sums:   output column -> play by play column summed
+# rates:  output column -> (numerator, denominator, scale, digits)
+POSITIONS = {
+    "receiver": {
+        "id": "receiver_player_id",
+        "name": "receiver_player_name",
+        "play_type": "pass",
+        "count": "targets",
+        "sums": {
+            "receptions": "complete_pass",
+            "rec_yards": "yards_gained",
+            "air_yards": "air_yards",
+            "yards_after_catch": "yards_after_catch",
+            "rec_td": "pass_touchdown",
+            "epa": "epa",
+            "success": "success",
+        },
+        "rates": {
+            "catch_rate": ("receptions", "targets", 100, 1),
+            "yds_per_rec": ("rec_yards", "receptions", 1, 1),
+            "yds_per_target": ("rec_yards", "targets", 1, 1),
+            "epa_per_target": ("epa", "targets", 1, 3),
+        },
+    },
+    "rusher": {
+        "id": "rusher_player_id",
+        "name": "rusher_player_name",
+        "play_type": "run",
+        "count": "carries",
+        "sums": {
+            "rush_yards": "yards_gained",
+            "rush_td": "rush_touchdown",
+            "fumbles_lost": "fumble_lost",
+            "first_downs": "first_down_rush",
+            "epa": "epa",
+            "success": "success",
+        },
+        "rates": {
+            "yds_per_carry": ("rush_yards", "carries", 1, 1),
+            "success_rate": ("success", "carries", 100, 1),
+            "epa_per_carry": ("epa", "carries", 1, 3),
+        },
+    },
+}
+
+
+def build_player_weeks(pbp, position):
+    """
+    Returns one row per player per week with the position's totals.
+
+    params:
+        pbp (DataFrame): play by play data for one or more games.
+        position (str): key of POSITIONS.
+
+    Returns:
+        Dataframe keyed by player_id/week with player_name, team, the count
+        column and one column per sum.
+    """
+    spec = POSITIONS[position]
+    sums = {
+        name: column for name, column in spec["sums"].items() if column in pbp.columns
+    }
+    data = pbp[(pbp.play_type == spec["play_type"]) & pbp[spec["id"]].notna()]
+    codes, players = pd.factorize(data[spec["id"]])
+    week = data.week.to_numpy(np.int64)
+    totals, counts = kernels.weekly_sums(
+        codes,
+        week,
+        data[list(sums.values())].to_numpy(np.float64),
+        len(players),
+        int(week.max()) + 1 if len(week) else 1,
+    )
+
+    group, week = np.nonzero(counts)
+    weeks = pd.DataFrame(totals[group, week], columns=list(sums))
+    weeks.insert(0, spec["count"], counts[group, week])
+    # name and team from each player's first play of the season
+    first = np.unique(codes, return_index=True)[1]
+    weeks.insert(0, "week", week)
+    weeks.insert(0, "team", data.posteam.to_numpy()[first][group])
+    weeks.insert(0, "player_name", data[spec["name"]].to_numpy()[first][group])
+    weeks.insert(0, "player_id", players[group])
+    return weeks.sort_values(["week", "player_id"]).reset_index(drop=True)
+
+
+def player_totals(weeks, position):
+    """
+    Returns one row per player with season totals and the position's rates.
+
+    params:
+        weeks (DataFrame): rows of build_player_weeks output.
+        position (str): key of POSITIONS.
+    """
+    spec = POSITIONS[position]
+    numbers = [spec["count"]] + [x for x in spec["sums"] if x in weeks.columns]
+    totals = weeks.groupby("player_id", sort=False).agg(
+        player_name=("player_name", "first"),
+        team=("team", "last"),
+        games=("week", "size"),
+        **{x: (x, "sum") for x in numbers},
+    )
+    for name, (numerator, denominator, scale, digits) in spec["rates"].items():
+        if numerator in totals.columns:
+            totals[name] = (
+                scale * totals[numerator] / totals[denominator].where(lambda x: x > 0)
+            ).round(digits)
+    return totals.reset_index()
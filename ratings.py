@@ -0,0 +1,196 @@
+"""
+Opponent adjusted team ratings (SRS).
+
+Every game says home rating - away rating + home field = home margin. The ratings
+are the least squares solution of those equations with the ratings summing to
+zero, solved for point margins and EPA/play margins at once. A RatingSystem keeps
+the normal equations of a season, which only have one row and column per team,
+so games added by a store refresh are folded in without revisiting old games and
+solving is a dense least squares solve of ~35 unknowns. Until the games link
+every team (e.g. week 1) the ratings are flagged as not determined.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import dims
+
+
+METRICS = ["margin", "epa_margin"]
+
+
+def game_margins(games, team_epa):
+    """
+    Returns the point and EPA/play margin of every game from the home side.
+
+    params:
+        games (DataFrame): rows of the games table.
+        team_epa (DataFrame): rows of the team_epa table for the same games.
+
+    Returns:
+        Dataframe with game_id, home_team, away_team, margin and epa_margin.
+    """
+    epa = team_epa.assign(epa_per_play=team_epa.epa / team_epa.plays)
+    epa = epa.set_index(["game_id", "posteam"]).epa_per_play
+    margins = games[["game_id", "home_team", "away_team"]].copy()
+    margins["margin"] = games.home_score - games.away_score
+    home = pd.MultiIndex.from_arrays([games.game_id, games.home_team])
+    away = pd.MultiIndex.from_arrays([games.game_id, games.away_team])
+    margins["epa_margin"] = (
+        epa.reindex(home).to_numpy() - epa.reindex(away).to_numpy()
+    )
+    return margins.reset_index(drop=True)
+
+
+class RatingSystem:
+    """Normal equations of the SRS least squares for one set of games.
+    Usage:
+        system = RatingSystem()
+        system.add(game_margins(games, team_epa))
+        ratings = system.ratings()
+
+    Games are identified by game_id, so adding a game twice has no effect and
+    adding it with new margins replaces it.
+    """
+
+    def __init__(self):
+        self.teams = list(dims.TEAMS)
+        self.n = len(self.teams)
+        # unknowns are one rating per team code, then home field advantage
+        self.normal = np.zeros((self.n + 1, self.n + 1))
+        self.rhs = np.zeros((self.n + 1, len(METRICS)))
+        self.played = np.zeros(self.n, dtype=np.int64)
+        self.margin_sum = np.zeros((self.n, len(METRICS)))
+        # game_id -> (home code, away code, margins) of the games added
+        self.games = {}
+        self.lock = threading.Lock()
+
+    def _grow(self, n):
+        # teams outside dims.TEAMS get rows past the end of the fixed list
+        extra = n - self.n
+        hfa = self.n
+        normal = np.zeros((n + 1, n + 1))
+        normal[: self.n, : self.n] = self.normal[:hfa, :hfa]
+        normal[: self.n, n] = self.normal[:hfa, hfa]
+        normal[n, : self.n] = self.normal[hfa, :hfa]
+        normal[n, n] = self.normal[hfa, hfa]
+        rhs = np.zeros((n + 1, len(METRICS)))
+        rhs[: self.n], rhs[n] = self.rhs[:hfa], self.rhs[hfa]
+        self.normal, self.rhs, self.n = normal, rhs, n
+        self.played = np.concatenate([self.played, np.zeros(extra, dtype=np.int64)])
+        self.margin_sum = np.vstack([self.margin_sum, np.zeros((extra, len(METRICS)))])
+
+    def _apply(self, home, away, values, sign):
+        # adds (sign 1) or removes (sign -1) games from the normal equations
+        hfa = self.n
+        np.add.at(self.normal, (home, home), sign)
+        np.add.at(self.normal, (away, away), sign)
+        np.add.at(self.normal, (home, away), -sign)
+        np.add.at(self.normal, (away, home), -sign)
+        np.add.at(self.normal[:, hfa], home, sign)
+        np.add.at(self.normal[:, hfa], away, -sign)
+        np.add.at(self.normal[hfa], home, sign)
+        np.add.at(self.normal[hfa], away, -sign)
+        self.normal[hfa, hfa] += sign * len(home)
+        np.add.at(self.rhs, home, sign * values)
+        np.add.at(self.rhs, away, -sign * values)
+        self.rhs[hfa] += sign * values.sum(axis=0)
+
+        np.add.at(self.played, home, sign)
+        np.add.at(self.played, away, sign)
+        np.add.at(self.margin_sum, home, sign * values)
+        np.add.at(self.margin_sum, away, -sign * values)
+
+    def add(self, margins):
+        """
+        Adds the games in margins (from game_margins) that are not in the
+        system yet, and replaces those whose margins changed (e.g. a game
+        stored while in progress).
+        """
+        with self.lock:
+            margins = margins[margins.margin.notna()]
+            names = pd.concat([margins.home_team, margins.away_team]).astype(object)
+            extra = sorted(set(names) - set(self.teams))
+            if extra:
+                self.teams += extra
+                self._grow(len(self.teams))
+            dtype = pd.CategoricalDtype(self.teams)
+            home = pd.Categorical(margins.home_team, dtype=dtype).codes.astype(np.int64)
+            away = pd.Categorical(margins.away_team, dtype=dtype).codes.astype(np.int64)
+            values = np.nan_to_num(margins[METRICS].to_numpy(np.float64))
+            changed = []
+            for i, game_id in enumerate(margins.game_id):
+                game = (home[i], away[i], tuple(values[i]))
+                old = self.games.get(game_id)
+                if old == game:
+                    continue
+                if old is not None:
+                    self._apply(
+                        np.array([old[0]]), np.array([old[1]]), np.array([old[2]]), -1
+                    )
+                self.games[game_id] = game
+                changed.append(i)
+            if changed:
+                self._apply(home[changed], away[changed], values[changed], 1)
+
+    def _components(self, teams):
+        # component label of each team, following games between teams
+        linked = self.normal[np.ix_(teams, teams)] != 0
+        labels = np.full(len(teams), -1)
+        for start in range(len(teams)):
+            if labels[start] >= 0:
+                continue
+            members = np.zeros(len(teams), dtype=bool)
+            members[start] = True
+            while True:
+                grown = members | linked[members].any(axis=0)
+                if (grown == members).all():
+                    break
+                members = grown
+            labels[members] = start
+        return labels
+
+    def ratings(self):
+        """
+        Returns one row per team that has played, with games, margin and
+        epa_margin (per game averages), sos and srs (points), and epa_sos and
+        epa_srs (EPA/play). srs = margin + sos.
+
+        determined is False on every row while the games do not pin down the
+        ratings, e.g. early in a season when some teams have no common
+        opponents yet, or for a playoff bracket. The ratings are then one of
+        many equally good fits and should not be shown as ratings.
+        """
+        with self.lock:
+            teams = np.flatnonzero(self.played)
+            unknowns = np.append(teams, self.n)
+            normal = self.normal[np.ix_(unknowns, unknowns)].copy()
+            # pin the ratings of each group of teams linked by games to sum to
+            # zero; it only moves directions the games cannot see, so the fit
+            # itself is unchanged
+            labels = self._components(teams)
+            for label in np.unique(labels):
+                members = np.flatnonzero(labels == label)
+                normal[np.ix_(members, members)] += 1
+            solution, _, rank, _ = np.linalg.lstsq(
+                normal, self.rhs[unknowns], rcond=None
+            )
+            played = self.played[teams]
+            average = self.margin_sum[teams] / played[:, None]
+
+        srs = solution[: len(teams)]
+        determined = rank == len(unknowns) and len(np.unique(labels)) == 1
+        return pd.DataFrame(
+            {
+                "team": [self.teams[x] for x in teams],
+                "games": played,
+                "margin": average[:, 0],
+                "sos": srs[:, 0] - average[:, 0],
+                "srs": srs[:, 0],
+                "epa_margin": average[:, 1],
+                "epa_sos": srs[:, 1] - average[:, 1],
+                "epa_srs": srs[:, 1],
+                "determined": determined,
+            }
+        )
@@ -0,0 +1,113 @@
+"""
+Headless batch report of the Team Stats KPIs for every team.
+
+Each (season, game type, team) is one job run in a process pool with the same
+funcs statistics the page uses. Finished jobs are written as part files, so an
+interrupted run picks up where it stopped, and the parts are combined into one
+Parquet and one HTML report at the end.
+
+Usage:
+    python report.py 2020 2021 --out reports/weekly --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import funcs
+import store
+
+
+GAME_TYPES = ["Regular Season", "Playoffs"]
+
+
+def season_teams(season, game_type_pick):
+    """
+    Returns the teams with a game in a season's game type.
+    """
+    games = funcs.game_type_filter(funcs.get_games([season]), game_type_pick)
+    return sorted(set(games.home_team.dropna()) | set(games.away_team.dropna()))
+
+
+def part_path(out_dir, season, game_type_pick, team):
+    name = game_type_pick.lower().replace(" ", "_")
+    return os.path.join(out_dir, "parts", f"{season}_{name}_{team}.parquet")
+
+
+def run_job(out_dir, season, game_type_pick, team):
+    """
+    Computes one team's KPIs and writes them to its part file.
+    """
+    row = funcs.get_team_kpis([season], game_type_pick, team)
+    row.insert(0, "team", team)
+    row.insert(0, "game_type", game_type_pick)
+    row.insert(0, "season", season)
+    path = part_path(out_dir, season, game_type_pick, team)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    row.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def build_report(seasons, game_types, out_dir, workers=None):
+    """
+    Runs every job that does not have a part file yet, then writes
+    report.parquet and report.html to out_dir.
+
+    Returns:
+        Dataframe with one row per season, game type and team.
+    """
+    os.makedirs(os.path.join(out_dir, "parts"), exist_ok=True)
+    # load seasons here so the workers only ever read the store
+    for season in seasons:
+        store.ensure_season(season)
+    jobs = [
+        (season, game_type_pick, team)
+        for season in seasons
+        for game_type_pick in game_types
+        for team in season_teams(season, game_type_pick)
+    ]
+    todo = [x for x in jobs if not os.path.exists(part_path(out_dir, *x))]
+    print(f"{len(jobs)} jobs, {len(jobs) - len(todo)} already done", file=sys.stderr)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, out_dir, *job): job for job in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            season, game_type_pick, team = futures[future]
+            elapsed = time.perf_counter() - start
+            print(
+                f"[{done}/{len(todo)}] {season} {game_type_pick} {team}"
+                f" ({elapsed:.1f}s)",
+                file=sys.stderr,
+            )
+
+    report = pd.concat(
+        [pd.read_parquet(part_path(out_dir, *x)) for x in jobs], ignore_index=True
+    )
+    report.to_parquet(os.path.join(out_dir, "report.parquet"), index=False)
+    with open(os.path.join(out_dir, "report.html"), "w") as f:
+        f.write(report.to_html(index=False, na_rep=""))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write Team Stats KPIs for every team.")
+    parser.add_argument("seasons", nargs="+", type=int)
+    parser.add_argument("--game-types", nargs="+", default=GAME_TYPES)
+    parser.add_argument("--out", default="report")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="processes, default one per core"
+    )
+    args = parser.parse_args()
+
+    report = build_report(args.seasons, args.game_types, args.out, args.workers)
+    print(f"{len(report)} rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
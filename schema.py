@@ -0,0 +1,211 @@
+"""
+Declared schema of the play by play data, enforced when a season is stored.
+
+Older seasons and upstream changes give missing columns, object columns holding
+numbers, and NaN in 0/1 indicator columns. coerce fixes all of that once, with
+one vectorized conversion per column, before anything is written, so the stored
+data and every table derived from it always have these dtypes:
+
+    int       int64, no nulls
+    float     float64, NaN allowed
+    flag      float64 holding only 0 and 1; missing values and columns become 0
+    str       object holding str or None
+    category  shared categorical from dims.normalize
+
+Columns in REQUIRED must be present and, if not nullable, fully populated; the
+load fails fast with a SchemaError otherwise. Other declared columns that are
+missing are added empty (0 for flags). Undeclared columns are left as they are.
+
+mismatches checks data already stored against the same declarations from its
+Parquet schema alone, so seasons stored before a schema change are caught
+without reading them.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import dims
+
+
+class SchemaError(ValueError):
+    """Raised when data cannot be made to fit its schema."""
+
+
+# column -> (kind, nullable)
+PBP = {
+    # ---- game and play keys ----
+    "game_id": ("str", False),
+    "season": ("int", False),
+    "week": ("int", False),
+    "season_type": ("category", False),
+    "home_team": ("category", False),
+    "away_team": ("category", False),
+    "posteam": ("category", True),
+    "defteam": ("category", True),
+    "td_team": ("category", True),
+    "play_type": ("category", True),
+    "home_score": ("float", False),
+    "away_score": ("float", False),
+    "drive": ("float", True),
+    "fixed_drive_result": ("str", True),
+    "desc": ("str", True),
+    # ---- situation ----
+    "qtr": ("float", True),
+    "down": ("float", True),
+    "yardline_100": ("float", True),
+    "score_differential": ("float", True),
+    "game_seconds_remaining": ("float", True),
+    "total_home_score": ("float", True),
+    "total_away_score": ("float", True),
+    # ---- measures ----
+    "yards_gained": ("float", True),
+    "air_yards": ("float", True),
+    "yards_after_catch": ("float", True),
+    "epa": ("float", True),
+    "wpa": ("float", True),
+    "success": ("float", True),
+    "cpoe": ("float", True),
+    "wp": ("float", True),
+    "home_wp": ("float", True),
+    # ---- indicators ----
+    "pass_attempt": ("flag", False),
+    "rush_attempt": ("flag", False),
+    "qb_dropback": ("flag", False),
+    "complete_pass": ("flag", False),
+    "sack": ("flag", False),
+    "interception": ("flag", False),
+    "fumble_lost": ("flag", False),
+    "touchdown": ("flag", False),
+    "pass_touchdown": ("flag", False),
+    "rush_touchdown": ("flag", False),
+    "first_down_rush": ("flag", False),
+    "third_down_failed": ("flag", False),
+    "goal_to_go": ("flag", False),
+    "solo_tackle": ("flag", False),
+    "assist_tackle": ("flag", False),
+    "shotgun": ("flag", False),
+    "no_huddle": ("flag", False),
+    # ---- players ----
+    "passer_id": ("str", True),
+    "passer_player_name": ("str", True),
+    "receiver_player_id": ("str", True),
+    "receiver_player_name": ("str", True),
+    "rusher_player_id": ("str", True),
+    "rusher_player_name": ("str", True),
+}
+REQUIRED = [
+    "game_id",
+    "season",
+    "week",
+    "season_type",
+    "home_team",
+    "away_team",
+    "home_score",
+    "away_score",
+    "posteam",
+    "defteam",
+    "play_type",
+    "yards_gained",
+]
+
+SCHEMAS = {"pbp": (PBP, REQUIRED)}
+
+
+def _empty(kind, length):
+    if kind == "flag":
+        return np.zeros(length)
+    if kind == "float":
+        return np.full(length, np.nan)
+    return np.full(length, None, dtype=object)
+
+
+def _coerce_column(values, kind):
+    # returns the converted column, or None when it already fits
+    if kind == "int":
+        if values.dtype == np.int64:
+            return None
+        values = pd.to_numeric(values, errors="coerce")
+        return values if values.isna().any() else values.astype(np.int64)
+    if kind in ("float", "flag"):
+        converted = values.dtype != np.float64
+        if converted:
+            values = pd.to_numeric(values, errors="coerce").astype(np.float64)
+        if kind == "flag":
+            if values.hasnans:
+                values, converted = values.fillna(0), True
+            if not values.isin([0, 1]).all():
+                raise SchemaError(f"{values.name} must only hold 0 and 1.")
+        return values if converted else None
+    if kind == "str" and values.dtype != object:
+        return values.astype(object).where(values.notna(), None)
+    return None
+
+
+def coerce(data, dataset="pbp"):
+    """
+    Returns data with every declared column present and of its declared dtype.
+    Columns that already fit are not copied.
+
+    params:
+        data (DataFrame): data to check, e.g. a freshly downloaded season.
+        dataset (str): key of SCHEMAS.
+
+    Raises:
+        SchemaError: a required column is missing, a non-nullable column has
+            nulls, or a flag column holds values other than 0 and 1.
+    """
+    columns, required = SCHEMAS[dataset]
+    missing = [x for x in required if x not in data.columns]
+    if missing:
+        raise SchemaError(f"{dataset} is missing required columns: {missing}")
+
+    data = dims.normalize(data)
+    converted = {}
+    for column, (kind, nullable) in columns.items():
+        if column not in data.columns:
+            converted[column] = _empty(kind, len(data))
+            continue
+        values = _coerce_column(data[column], kind)
+        if values is None:
+            values = data[column]
+        else:
+            converted[column] = values
+        if not nullable and values.isna().any():
+            raise SchemaError(
+                f"{dataset}.{column} has {int(values.isna().sum())} missing values."
+            )
+    if not converted:
+        return data
+    data = data.copy(deep=False)
+    for column, values in converted.items():
+        data[column] = values
+    return data
+
+
+def _fits(kind, arrow_type):
+    if kind == "int":
+        return pa.types.is_int64(arrow_type)
+    if kind in ("float", "flag"):
+        return pa.types.is_float64(arrow_type)
+    # columns holding only None are stored as null
+    if pa.types.is_null(arrow_type) or pa.types.is_string(arrow_type):
+        return True
+    return kind == "category" and pa.types.is_dictionary(arrow_type)
+
+
+def mismatches(arrow_schema, dataset="pbp"):
+    """
+    Returns the declared columns that a stored Arrow or Parquet schema lacks or
+    holds with another type than coerce gives them.
+
+    params:
+        arrow_schema (pyarrow.Schema): e.g. pyarrow.parquet.read_schema(path).
+        dataset (str): key of SCHEMAS.
+    """
+    columns, _ = SCHEMAS[dataset]
+    names = set(arrow_schema.names)
+    return [
+        column
+        for column, (kind, _) in columns.items()
+        if column not in names or not _fits(kind, arrow_schema.field(column).type)
+    ]
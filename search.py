@@ -0,0 +1,280 @@
+"""
+On-disk play search index of a season.
+
+Every play is a row of the season's pbp.arrow. The index of a season is a
+directory of .npy files that are memory-mapped when queried, so a search across
+every season only reads the pages it touches:
+
+    tokens.npy              sorted vocabulary: words of desc, lowercased, plus
+                            field tokens such as "posteam:kc", "receiver:t.kelce"
+                            and "touchdown:1"
+    offsets.npy             start of each token's postings, len(tokens) + 1
+    postings.npy            sorted row numbers of the plays holding each token
+    <column>.npy            a RANGE_COLUMNS column in row order
+    <column>.order.npy      row numbers sorted by that column, NaN last
+    <column>.sorted.npy     the column in that order
+
+A query intersects the postings of its tokens, smallest first. Range filters are
+applied to those rows with the row order columns, or, for a query of ranges
+alone, start from a binary search of the sorted column. Phrases are checked
+against desc of the remaining plays only. Matching plays are read from the
+memory-mapped Arrow file.
+"""
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# field -> play by play column of its tokens
+FIELDS = {
+    "posteam": "posteam",
+    "defteam": "defteam",
+    "play_type": "play_type",
+    "season_type": "season_type",
+    "passer": "passer_player_name",
+    "receiver": "receiver_player_name",
+    "rusher": "rusher_player_name",
+}
+# 0/1 columns with a "<flag>:1" token on the plays where they are 1
+FLAGS = [
+    "touchdown",
+    "pass_touchdown",
+    "rush_touchdown",
+    "interception",
+    "fumble_lost",
+    "sack",
+    "complete_pass",
+    "shotgun",
+    "no_huddle",
+]
+RANGE_COLUMNS = [
+    "week",
+    "qtr",
+    "down",
+    "yardline_100",
+    "yards_gained",
+    "air_yards",
+    "epa",
+    "wpa",
+]
+# columns of the plays returned by a search
+RESULT_COLUMNS = [
+    "game_id",
+    "week",
+    "qtr",
+    "posteam",
+    "defteam",
+    "play_type",
+    "yards_gained",
+    "epa",
+    "desc",
+]
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Returns the lowercased words of text as they are indexed.
+    """
+    return WORD.findall(str(text).lower())
+
+
+def field_token(field, value):
+    return f"{field}:{str(value).lower()}"
+
+
+def _save(directory, name, values):
+    np.save(os.path.join(directory, f"{name}.npy"), values)
+
+
+def build_index(plays, directory):
+    """
+    Writes the search index of plays to directory, replacing any index there.
+    Row numbers are positions in plays, which must be in the order of the
+    season's pbp.arrow.
+    """
+    n = len(plays)
+    words = plays["desc"].astype(object).fillna("").str.lower().str.findall(WORD)
+    lengths = words.str.len().to_numpy()
+    tokens = [pd.Series(np.concatenate(words.to_numpy()) if n else [], dtype=object)]
+    rows = [np.repeat(np.arange(n), lengths)]
+    for field, column in FIELDS.items():
+        values = plays[column].astype(object)
+        present = values.notna().to_numpy()
+        tokens.append(field + ":" + values[present].astype(str).str.lower())
+        rows.append(np.flatnonzero(present))
+    for flag in FLAGS:
+        present = np.flatnonzero(plays[flag].to_numpy() == 1)
+        tokens.append(pd.Series(f"{flag}:1", index=range(len(present))))
+        rows.append(present)
+    tokens = pd.concat(tokens, ignore_index=True).to_numpy()
+    rows = np.concatenate(rows)
+
+    codes, vocabulary = pd.factorize(tokens)
+    vocabulary = np.asarray(vocabulary).astype(str)
+    # renumber the codes in sorted vocabulary order
+    order = np.argsort(vocabulary)
+    vocabulary = vocabulary[order]
+    codes = np.argsort(order)[codes]
+    # one posting per token and row, sorted by token then row
+    pairs = np.unique(codes.astype(np.int64) * max(n, 1) + rows)
+    codes, postings = np.divmod(pairs, max(n, 1))
+    offsets = np.searchsorted(codes, np.arange(len(vocabulary) + 1))
+
+    # unique per writer, so a concurrent build never removes this one's files
+    parent, name = os.path.split(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=f"{name}.{os.getpid()}.", suffix=".tmp")
+    _save(tmp, "tokens", vocabulary)
+    _save(tmp, "offsets", offsets.astype(np.int64))
+    _save(tmp, "postings", postings.astype(np.int32))
+    for column in RANGE_COLUMNS:
+        values = plays[column].to_numpy(np.float64)
+        order = np.argsort(values, kind="stable").astype(np.int32)
+        _save(tmp, column, values)
+        _save(tmp, f"{column}.order", order)
+        _save(tmp, f"{column}.sorted", values[order])
+    old = f"{tmp}.old"
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class SeasonIndex:
+    """Memory-mapped search index and plays of one season.
+    Usage:
+        index = SeasonIndex(store.search_path(2021), store.arrow_path(2021))
+        rows = index.query(["kelce", "receiver:t.kelce"], {"yards_gained": (50, None)})
+        plays = index.plays(rows)
+    """
+
+    def __init__(self, directory, arrow_path):
+        self.directory = directory
+        self.arrow_path = arrow_path
+        self.tokens = self._load("tokens")
+        self.offsets = self._load("offsets")
+        self.postings = self._load("postings")
+        self._columns = {}
+        self._table = None
+
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+
+    def _column(self, name):
+        if name not in self._columns:
+            self._columns[name] = self._load(name)
+        return self._columns[name]
+
+    def _postings(self, token):
+        position = np.searchsorted(self.tokens, token)
+        if position == len(self.tokens) or self.tokens[position] != token:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.offsets[position] : self.offsets[position + 1]]
+
+    def _range(self, column, low, high):
+        # rows with low <= value <= high, either bound may be None
+        values = self._column(f"{column}.sorted")
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = (
+            np.searchsorted(values, np.inf, side="right")
+            if high is None
+            else np.searchsorted(values, high, side="right")
+        )
+        return np.sort(self._column(f"{column}.order")[start:stop])
+
+    def query(self, tokens=(), ranges=None, phrase=None):
+        """
+        Returns the sorted row numbers of the plays that hold every token, have
+        every ranges column within its (low, high) bounds, and, if phrase is
+        given, have it in desc (case insensitive).
+        """
+        ranges = dict(ranges or {})
+        postings = sorted((self._postings(x) for x in tokens), key=len)
+        if postings:
+            rows = np.asarray(postings[0])
+            for other in postings[1:]:
+                if len(rows) == 0:
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+        elif ranges:
+            column = next(iter(ranges))
+            rows = self._range(column, *ranges.pop(column))
+        else:
+            raise ValueError("a search needs at least one token or range")
+        for column, (low, high) in ranges.items():
+            values = self._column(column)[rows]
+            keep = ~np.isnan(values)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            rows = rows[keep]
+        if phrase and len(rows):
+            desc = self.table().column("desc").take(pa.array(np.asarray(rows)))
+            found = pc.match_substring(desc, phrase, ignore_case=True)
+            rows = rows[np.asarray(found.fill_null(False))]
+        return rows
+
+    def table(self):
+        """
+        Returns the season's plays as an Arrow table backed by the mapped file.
+        """
+        if self._table is None:
+            with pa.memory_map(self.arrow_path) as source:
+                self._table = pa.ipc.open_file(source).read_all()
+        return self._table
+
+    def plays(self, rows, columns=RESULT_COLUMNS):
+        """
+        Returns the plays at rows as a dataframe of columns.
+        """
+        return self.table().select(columns).take(pa.array(np.asarray(rows))).to_pandas()
+
+
+def parse(words="", fields=None, flags=(), phrase=False):
+    """
+    Returns (tokens, phrase) for SeasonIndex.query from the search inputs.
+
+    params:
+        words (str): words that must all be in the play description.
+        fields (dict): FIELDS key -> value, e.g. {"receiver": "T.Kelce"}.
+        flags (list): FLAGS that must be 1.
+        phrase (bool): words must appear in this order in the description.
+    """
+    tokens = tokenize(words)
+    tokens += [field_token(k, v) for k, v in (fields or {}).items() if v]
+    tokens += [field_token(x, 1) for x in flags]
+    return tokens, " ".join(words.split()) if phrase and words.strip() else None
+
+
+def search(indexes, tokens=(), ranges=None, phrase=None, limit=500):
+    """
+    Runs one query over several seasons.
+
+    params:
+        indexes (dict): season -> SeasonIndex.
+        tokens, ranges, phrase: see SeasonIndex.query and parse.
+        limit (int): most plays returned, newest seasons first.
+
+    Returns:
+        (Dataframe of matching plays with a season column, total matches).
+    """
+    frames, total = [], 0
+    for season in sorted(indexes, reverse=True):
+        rows = indexes[season].query(tokens, ranges, phrase)
+        total += len(rows)
+        room = limit - sum(len(x) for x in frames)
+        if room > 0 and len(rows):
+            plays = indexes[season].plays(rows[:room])
+            plays.insert(0, "season", season)
+            frames.append(plays)
+    if not frames:
+        return pd.DataFrame(columns=["season"] + RESULT_COLUMNS), total
+    return pd.concat(frames, ignore_index=True), total
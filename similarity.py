@@ -0,0 +1,160 @@
+"""
+Nearest team-seasons and QB-seasons.
+
+Each entity has one feature row per season built from the derived tables (never
+from plays), z-scored per feature and stacked into a float32 matrix. Queries are
+a brute force distance from one row to every other in a single matrix-vector
+product, which for a few thousand rows takes well under a millisecond.
+"""
+import numpy as np
+import pandas as pd
+
+
+# team-season features and QB-season features, in display order
+TEAM_FEATURES = [
+    "points_for",
+    "points_against",
+    "pass_yards",
+    "rush_yards",
+    "yds_allowed",
+    "sacks_taken",
+    "def_sacks",
+    "giveaways",
+    "takeaways",
+    "epa_per_play",
+    "pass_epa",
+    "rush_epa",
+    "def_epa_per_play",
+]
+QB_FEATURES = [
+    "dropbacks",
+    "comp_perc",
+    "yds_per_dropback",
+    "air_yards_per_att",
+    "td_rate",
+    "int_rate",
+    "sack_rate",
+    "epa_per_dropback",
+    "cpoe",
+]
+# fewest regular season dropbacks for a QB-season to be indexed
+MIN_DROPBACKS = 150
+
+
+def team_features(games, cube, team_epa):
+    """
+    Returns one row of per game averages and EPA rates per team for a season's
+    regular season, indexed by team.
+    """
+    games = games[games.season_type == "REG"]
+    sides = pd.concat(
+        [
+            pd.DataFrame(
+                {"team": games.home_team, "pf": games.home_score, "pa": games.away_score}
+            ),
+            pd.DataFrame(
+                {"team": games.away_team, "pf": games.away_score, "pa": games.home_score}
+            ),
+        ]
+    )
+    points = sides.groupby("team", observed=True)[["pf", "pa"]].mean()
+    per_game = (
+        cube[cube.season_type == "REG"]
+        .groupby("team", observed=True)[
+            [
+                "pass_yards",
+                "rush_yards",
+                "yds_allowed",
+                "sacks_taken",
+                "def_sacks",
+                "giveaways",
+                "takeaways",
+            ]
+        ]
+        .mean()
+    )
+    team_epa = team_epa[team_epa.season_type == "REG"]
+    offense = team_epa.groupby("posteam", observed=True)[
+        ["plays", "epa", "dropbacks", "pass_epa", "rushes", "rush_epa"]
+    ].sum()
+    defense = team_epa.groupby("defteam", observed=True)[["plays", "epa"]].sum()
+    features = per_game.assign(
+        points_for=points.pf,
+        points_against=points.pa,
+        epa_per_play=offense.epa / offense.plays,
+        pass_epa=offense.pass_epa / offense.dropbacks,
+        rush_epa=offense.rush_epa / offense.rushes,
+        def_epa_per_play=defense.epa / defense.plays,
+    )
+    features.index = features.index.astype(str)
+    return features[TEAM_FEATURES]
+
+
+def qb_features(passer_weeks, passer_epa, last_week):
+    """
+    Returns one row of rates per passer with at least MIN_DROPBACKS regular
+    season dropbacks, indexed by passer_id. last_week is the season's last
+    regular season week.
+    """
+    weeks = passer_weeks[passer_weeks.week <= last_week].groupby("passer_id").sum()
+    epa = passer_epa[passer_epa.week <= last_week].groupby("passer_id").sum()
+    weeks = weeks[weeks.dropbacks >= MIN_DROPBACKS]
+    attempts = weeks.dropbacks - weeks.sack
+    features = pd.DataFrame(
+        {
+            "dropbacks": weeks.dropbacks,
+            "comp_perc": 100 * weeks.complete_pass / attempts,
+            "yds_per_dropback": weeks.yards_gained / weeks.dropbacks,
+            "air_yards_per_att": weeks.air_yards / attempts,
+            "td_rate": 100 * weeks.pass_touchdown / attempts,
+            "int_rate": 100 * weeks.interception / attempts,
+            "sack_rate": 100 * weeks.sack / weeks.dropbacks,
+            "epa_per_dropback": epa.epa / epa.dropbacks,
+            "cpoe": epa.cpoe / epa.cpoe_plays,
+        },
+        index=weeks.index,
+    )
+    return features[QB_FEATURES]
+
+
+class SimilarityIndex:
+    """Brute force k nearest neighbours over z-scored feature rows.
+    Usage:
+        index = SimilarityIndex(features, TEAM_FEATURES)  # keyed by (season, team)
+        index.query((2021, "KC"), k=5)
+
+    Only columns are compared; other columns of features (e.g. names) are
+    returned with the results. Missing features are scored as the average.
+    """
+
+    def __init__(self, features, columns):
+        self.features = features
+        values = features[columns].to_numpy(np.float64)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+        std[~(std > 0)] = 1
+        z = np.nan_to_num((values - mean) / std)
+        self.matrix = np.ascontiguousarray(z, dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    def __contains__(self, key):
+        return key in self.features.index
+
+    def query(self, key, k=5):
+        """
+        Returns the k rows nearest to key, closest first, with a distance
+        column (in standard deviations).
+        """
+        row = self.features.index.get_loc(key)
+        distance = self.norms - 2 * (self.matrix @ self.matrix[row]) + self.norms[row]
+        distance[row] = np.inf
+        k = min(k, len(distance) - 1)
+        nearest = np.argpartition(distance, k)[:k]
+        nearest = nearest[np.argsort(distance[nearest])]
+        result = self.features.iloc[nearest].reset_index()
+        result.insert(
+            len(self.features.index.names),
+            "distance",
+            np.sqrt(np.maximum(distance[nearest], 0)),
+        )
+        return result
@@ -0,0 +1,52 @@
+"""
+Coalesces concurrent calls for the same key into one in-flight call.
+
+Streamlit runs each session's script in its own thread, so several sessions asking
+for the same uncached season at once would otherwise each start a download.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+    Usage:
+        flight = SingleFlight()
+        data = flight.do(("pbp", 2021), load_season, 2021)
+
+    The first caller for a key runs the function; callers that arrive while it is
+    running wait on the same future and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """
+        Returns the keys that currently have a call running.
+        """
+        with self._lock:
+            return list(self._calls)
@@ -0,0 +1,267 @@
+"""
+Snapshot of the warmed funcs caches, so a fresh server is fast from its first
+render.
+
+`python snapshot.py` computes the cache entries the pages ask for first for every
+stored season: derived tables, passer indexes, team KPIs and league baselines
+for every team and game type, ratings, player totals, standings, team info,
+rosters, depth charts and similarity features. It writes them to one
+uncompressed tar at SNAPSHOT_PATH:
+
+    00000.arrow     a DataFrame as an Arrow IPC file
+    00001.npy       the arrays of a dict of arrays, concatenated
+    ...
+    manifest.json   cache name, key and member of every entry
+
+attach (called by app.py) only reads the tar headers and memory-maps the file.
+memory.memo looks misses up in the snapshot before computing them, and an entry
+is only decoded when it is first asked for, so startup costs no decoding. A
+restored entry then goes into the memo's st.cache_data cache like a computed
+one: it is pickled once there and every hit returns a fresh copy, as for any
+memo entry. Keys hold the store versions of their seasons, so entries of
+seasons changed since the snapshot are never matched and are computed as usual. Take the snapshot
+from the same store files the server will use, e.g. in the image build.
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import sys
+import tarfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import dims
+import funcs
+import memory
+import players
+import store
+from partitions import GAME_TYPES
+
+
+SNAPSHOT_PATH = os.environ.get(
+    "NFL_SNAPSHOT", os.path.join(store.DATA_DIR, "snapshot.tar")
+)
+
+
+class Snapshot:
+    """Read side of a snapshot file.
+    Usage:
+        snap = Snapshot(SNAPSHOT_PATH)
+        games = snap.get("funcs._season_table", repr((2021, "games", version)))
+
+    get returns None for entries that are not in the snapshot.
+    """
+
+    def __init__(self, path):
+        with tarfile.open(path) as tar:
+            self._members = {x.name: (x.offset_data, x.size) for x in tar}
+            manifest = json.load(tar.extractfile("manifest.json"))
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entries = {(x["name"], x["key"]): x for x in manifest["entries"]}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _buffer(self, member):
+        offset, size = self._members[member]
+        return memoryview(self._map)[offset : offset + size]
+
+    def _array(self, member):
+        buffer = self._buffer(member)
+        header = io.BytesIO(buffer[:4096].tobytes())
+        if np.lib.format.read_magic(header) == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(header)
+        count = int(np.prod(shape))
+        return np.frombuffer(buffer, dtype, count, header.tell()).reshape(shape)
+
+    def get(self, name, key):
+        entry = self.entries.get((name, key))
+        if entry is None:
+            return None
+        if entry["kind"] == "frame":
+            source = pa.py_buffer(self._buffer(entry["member"]))
+            frame = pa.ipc.open_file(source).read_all().to_pandas()
+            # Arrow gives each categorical its own categories
+            return dims.normalize(frame) if entry["categorical"] else frame
+        values = self._array(entry["member"])
+        offsets = entry["offsets"]
+        return {
+            key: values[start:stop]
+            for key, start, stop in zip(entry["keys"], offsets, offsets[1:])
+        }
+
+
+def attach(path=SNAPSHOT_PATH):
+    """
+    Restores cache misses from the snapshot at path, if there is one. Safe to
+    call on every rerun; the file is only opened once.
+    """
+    global _attached
+    if not _attached and os.path.exists(path):
+        memory.restore_from(Snapshot(path))
+        _attached = True
+
+
+_attached = False
+
+
+# ---- Writing ----
+def _frame_member(frame):
+    table = pa.Table.from_pandas(frame)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _encode(value):
+    """
+    Returns (kind, member bytes, extra manifest fields) for a cache value, or
+    None for values a snapshot cannot hold.
+    """
+    if isinstance(value, pd.DataFrame):
+        try:
+            data = _frame_member(value)
+        except (pa.ArrowException, ValueError):
+            return None  # e.g. object columns mixing types
+        categorical = any(isinstance(x, pd.CategoricalDtype) for x in value.dtypes)
+        return "frame", data, {"categorical": categorical}
+    if isinstance(value, dict) and all(
+        isinstance(x, np.ndarray) and x.ndim == 1 for x in value.values()
+    ):
+        keys = list(value)
+        sizes = [len(value[x]) for x in keys]
+        buffer = io.BytesIO()
+        np.lib.format.write_array(
+            buffer, np.concatenate([value[x] for x in keys]) if keys else np.empty(0)
+        )
+        extra = {
+            "keys": [str(x) for x in keys],
+            "offsets": np.concatenate([[0], np.cumsum(sizes)]).tolist(),
+        }
+        return "arrays", buffer.getvalue(), extra
+    return None
+
+
+def write(entries, path):
+    """
+    Writes (name, key, value) entries to a snapshot file at path, replacing it.
+    Entries that cannot be encoded are skipped.
+
+    Returns:
+        The number of entries written.
+    """
+    manifest = []
+    tmp = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with tarfile.open(tmp, "w", format=tarfile.PAX_FORMAT) as tar:
+        for name, key, value in entries:
+            encoded = _encode(value)
+            if encoded is None:
+                print(f"skipped {name}{key}", file=sys.stderr)
+                continue
+            kind, data, extra = encoded
+            member = f"{len(manifest):05d}.{'arrow' if kind == 'frame' else 'npy'}"
+            _add(tar, member, data)
+            manifest.append(
+                {"name": name, "key": repr(key), "kind": kind, "member": member, **extra}
+            )
+        _add(tar, "manifest.json", json.dumps({"entries": manifest}).encode())
+    os.replace(tmp, path)
+    return len(manifest)
+
+
+def _add(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def warm(seasons):
+    """
+    Calls the loaders and aggregates the pages start from for seasons. Each
+    season must be in the store.
+    """
+    for season in seasons:
+        years = [season]
+        version = store.ensure_season(season)
+        for table in store.TABLES:
+            funcs._season_table(season, table, version)
+        funcs.get_passer_index(season)
+        for game_type_pick in GAME_TYPES:
+            funcs.get_league_baselines(years, game_type_pick)
+            funcs.get_team_ratings(years, game_type_pick)
+            games = funcs.game_type_filter(funcs.get_games(years), game_type_pick)
+            teams = set(games.home_team.dropna()) | set(games.away_team.dropna())
+            for team in sorted(teams):
+                funcs.get_team_kpis(years, game_type_pick, team)
+        for position in players.POSITIONS:
+            funcs.get_player_totals(years, position)
+        try:
+            funcs.get_standings(years)
+        except Exception as error:
+            print(f"{season}: get_standings failed: {error}", file=sys.stderr)
+        # reference data is downloaded; a snapshot without it is still useful
+        for load in (funcs.get_rosters, funcs.get_dc):
+            try:
+                load(years)
+            except Exception as error:
+                print(f"{season}: {load.__name__} failed: {error}", file=sys.stderr)
+    try:
+        funcs.get_team_info()
+    except Exception as error:
+        print(f"get_team_info failed: {error}", file=sys.stderr)
+    # the similarity indexes span every stored season since 1999, not just seasons
+    for entity in ("team", "qb"):
+        funcs.get_similarity_index(entity, build=True)
+
+
+def take(seasons, path=SNAPSHOT_PATH):
+    """
+    Computes the warm cache entries for seasons and writes them to path.
+
+    Returns:
+        The number of entries written.
+    """
+    entries = {}
+    # the same entry can be computed more than once outside Streamlit
+    memory.capture_into(
+        lambda name, key, value: entries.setdefault(
+            (name, repr(key)), (name, key, value)
+        )
+    )
+    try:
+        warm(seasons)
+    finally:
+        memory.capture_into(None)
+    return write(entries.values(), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the warmed app caches.")
+    parser.add_argument(
+        "seasons", nargs="*", type=int, help="default: every stored season"
+    )
+    parser.add_argument("--out", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    seasons = args.seasons or store.stored_seasons()
+    start = time.perf_counter()
+    written = take(seasons, args.out)
+    print(
+        f"{written} entries for {len(seasons)} seasons written to {args.out} "
+        f"in {time.perf_counter() - start:.0f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
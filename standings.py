@@ -0,0 +1,195 @@
+"""
+Season standings for every team at once, from the games table.
+
+Each game is stacked as two team rows, one per side, so records are group sums
+over one table. Ranks sort teams on the NFL tiebreakers in order:
+
+    win percentage
+    head-to-head win percentage against the teams tied on it
+    division win percentage (division ranks only)
+    conference win percentage
+    strength of victory, the combined win percentage of the teams beaten
+    strength of schedule, the combined win percentage of all opponents
+    point differential
+
+Conference ranks seed the division leaders first, like the playoff seeds. The
+official procedure also compares common games and breaks ties of three or more
+teams one team at a time; here every tie is broken in one sort.
+"""
+import numpy as np
+import pandas as pd
+
+
+RECORDS = ["wins", "losses", "ties"]
+COLUMNS = [
+    "team",
+    "conference",
+    "division",
+    *RECORDS,
+    "win_pct",
+    *[f"division_{x}" for x in RECORDS],
+    *[f"conference_{x}" for x in RECORDS],
+    "points_for",
+    "points_against",
+    "point_diff",
+    "strength_of_victory",
+    "strength_of_schedule",
+    "division_rank",
+    "conference_rank",
+]
+
+
+def team_games(games):
+    """
+    Returns one row per team per game, with the team's points, the opponent's
+    points and 0/1 win, loss and tie columns. Games without a final score are
+    left out.
+
+    params:
+        games (DataFrame): rows of the games table.
+    """
+    sides = []
+    for team, opponent in (("home", "away"), ("away", "home")):
+        sides.append(
+            pd.DataFrame(
+                {
+                    "game_id": games.game_id,
+                    "week": games.week,
+                    "team": games[f"{team}_team"],
+                    "opponent": games[f"{opponent}_team"],
+                    "points_for": games[f"{team}_score"],
+                    "points_against": games[f"{opponent}_score"],
+                }
+            )
+        )
+    rows = pd.concat(sides, ignore_index=True).dropna(
+        subset=["points_for", "points_against"]
+    )
+    margin = (rows.points_for - rows.points_against).to_numpy()
+    rows["wins"] = (margin > 0).astype(int)
+    rows["losses"] = (margin < 0).astype(int)
+    rows["ties"] = (margin == 0).astype(int)
+    return rows.reset_index(drop=True)
+
+
+def _pct(wins, losses, ties):
+    # ties count as half a win; no games is NaN
+    games = wins + losses + ties
+    return (wins + 0.5 * ties) / games.where(games > 0)
+
+
+def _combined_pct(rows, records, weight):
+    # win percentage of the opponents of rows, summed over rows with weight 1
+    opponent = records.reindex(rows.opponent.to_numpy())
+    totals = pd.DataFrame(
+        {x: opponent[x].to_numpy() * weight for x in RECORDS}, index=rows.team
+    )
+    totals = totals.groupby(level=0).sum()
+    return _pct(*(totals[x] for x in RECORDS))
+
+
+def _head_to_head(rows, table, group):
+    # win percentage in games between teams of one group tied on win_pct
+    keys = table.set_index("team")[[group, "win_pct"]]
+    team = keys.reindex(rows.team.to_numpy())
+    opponent = keys.reindex(rows.opponent.to_numpy())
+    tied = (team[group].to_numpy() == opponent[group].to_numpy()) & (
+        team.win_pct.to_numpy() == opponent.win_pct.to_numpy()
+    )
+    games = rows[tied].groupby("team")[RECORDS].sum()
+    pct = _pct(*(games[x] for x in RECORDS))
+    # teams that have not played each other are level
+    return pct.reindex(table.team.to_numpy()).fillna(0.5).to_numpy()
+
+
+def _rank(table, group, keys, first=None):
+    # 1 based rank within group, best first; rows where first is True go first
+    order = table.assign(_first=False if first is None else first)
+    order = order.sort_values(
+        [group, "_first", *keys], ascending=[True] + [False] * (len(keys) + 1)
+    )
+    ranks = order.groupby(group, sort=False).cumcount() + 1
+    return ranks.reindex(table.index).to_numpy()
+
+
+def standings(games, team_info):
+    """
+    Returns the standings of the games played, one row per team.
+
+    params:
+        games (DataFrame): rows of the games table, usually one regular season.
+        team_info (DataFrame): funcs.get_team_info, for team_conf and
+            team_division.
+
+    Returns:
+        Dataframe of COLUMNS sorted by conference, division and division rank.
+    """
+    rows = team_games(games)
+    rows["team"] = rows.team.astype(str)
+    rows["opponent"] = rows.opponent.astype(str)
+    info = team_info.drop_duplicates("team_abbr").set_index("team_abbr")
+    for column, key in (("team_conf", "conference"), ("team_division", "division")):
+        team = info[column].reindex(rows.team).to_numpy()
+        opponent = info[column].reindex(rows.opponent).to_numpy()
+        rows[key] = team
+        rows[f"in_{key}"] = team == opponent
+    for key in ("division", "conference"):
+        for x in RECORDS:
+            rows[f"{key}_{x}"] = rows[x] * rows[f"in_{key}"]
+
+    table = rows.groupby("team").agg(
+        conference=("conference", "first"),
+        division=("division", "first"),
+        **{
+            x: (x, "sum")
+            for x in [*RECORDS, "points_for", "points_against"]
+            + [f"{k}_{x}" for k in ("division", "conference") for x in RECORDS]
+        },
+    )
+    table["win_pct"] = _pct(*(table[x] for x in RECORDS))
+    table["point_diff"] = table.points_for - table.points_against
+    records = table[RECORDS]
+    table["strength_of_victory"] = _combined_pct(rows, records, rows.wins.to_numpy())
+    table["strength_of_schedule"] = _combined_pct(rows, records, 1)
+    table = table.reset_index()
+
+    keys = table.assign(
+        _h2h=_head_to_head(rows, table, "division"),
+        _sov=table.strength_of_victory.fillna(0),
+        _sos=table.strength_of_schedule.fillna(0),
+        # no division or conference games yet counts as .500
+        **{
+            f"_{key}": _pct(*(table[f"{key}_{x}"] for x in RECORDS)).fillna(0.5)
+            for key in ("division", "conference")
+        },
+    )
+    table["division_rank"] = _rank(
+        keys,
+        "division",
+        ["win_pct", "_h2h", "_division", "_conference", "_sov", "_sos", "point_diff"],
+    )
+    keys["_h2h"] = _head_to_head(rows, table, "conference")
+    table["conference_rank"] = _rank(
+        keys,
+        "conference",
+        ["win_pct", "_h2h", "_conference", "_sov", "_sos", "point_diff"],
+        first=table.division_rank == 1,
+    )
+    table = table.sort_values(["conference", "division", "division_rank"])
+    return table[COLUMNS].reset_index(drop=True)
+
+
+def weekly_standings(games, team_info):
+    """
+    Returns the regular season standings through every week of games, with a
+    week column, so the standings as of any week are one filter away.
+    """
+    season = games[games.season_type == "REG"]
+    weeks = np.sort(season.week.dropna().unique())
+    frames = {
+        int(week): standings(season[season.week <= week], team_info)
+        for week in weeks
+    }
+    if not frames:
+        return pd.DataFrame(columns=["week"] + COLUMNS)
+    return pd.concat(frames, names=["week"]).reset_index(level=0).reset_index(drop=True)
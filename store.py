@@ -0,0 +1,522 @@
+"""
+Local on-disk store for season play by play data and the tables derived from it.
+
+Layout under DATA_DIR:
+    <season>/pbp/part-0000.parquet   plays, appended one part per refresh; a part
+                                     replaces the plays of its games in
+                                     earlier parts
+    <season>/pbp.arrow               all plays as one uncompressed Arrow IPC file
+    <season>/games.parquet           one row per game
+    <season>/team_cube.parquet       one row per team per game
+    <season>/drives.parquet          one row per drive
+    <season>/passer_weeks.parquet    one row per passer per week
+    <season>/passer_index.parquet    dropback row positions by passer
+    <season>/search/                 play search index (see search.py)
+    <season>.lock                    held while a season is loaded or refreshed
+    reference/team_desc.parquet      team info, downloaded once
+    reference/rosters_<season>.parquet, reference/depth_charts_<season>.parquet
+                                     rosters and depth charts, downloaded once
+    snapshot.tar                     warmed app caches (see snapshot.py)
+
+Run as a script to load or refresh seasons:
+    python store.py load 2020 2021
+    python store.py refresh 2022
+"""
+import argparse
+import contextlib
+import fcntl
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import nfl_data_py as nfl
+
+import aggregates
+import analytics
+import dims
+import memory
+import players
+import schema
+import search
+from singleflight import SingleFlight
+
+
+DATA_DIR = os.environ.get(
+    "NFL_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+OFFLINE = os.environ.get("NFL_OFFLINE", "0") == "1"
+
+# derived tables rebuilt whenever plays are added to a season
+TABLES = {
+    "games": aggregates.build_games,
+    "team_cube": aggregates.build_team_cube,
+    "drives": aggregates.build_drives,
+    "passer_weeks": aggregates.build_passer_weeks,
+    "team_epa": analytics.build_team_epa,
+    "passer_epa": analytics.build_passer_epa,
+    **{
+        f"{x}_weeks": functools.partial(players.build_player_weeks, position=x)
+        for x in players.POSITIONS
+    },
+}
+# tables whose rows each belong to a single game, so new games only add rows;
+# values are the columns the table is kept sorted by
+NEW_GAME_TABLES = {
+    "games": ["game_id"],
+    "drives": ["game_id"],
+    "passer_weeks": ["week", "passer_id"],
+    "team_epa": ["game_id", "posteam"],
+    "passer_epa": ["week", "passer_id"],
+    **{f"{x}_weeks": ["week", "player_id"] for x in players.POSITIONS},
+}
+
+
+def season_dir(season):
+    return os.path.join(DATA_DIR, str(season))
+
+
+def table_path(season, table):
+    return os.path.join(season_dir(season), f"{table}.parquet")
+
+
+def pbp_parts(season):
+    """
+    Returns the sorted paths of the stored pbp parts for a season.
+    """
+    path = os.path.join(season_dir(season), "pbp")
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        os.path.join(path, x) for x in os.listdir(path) if x.endswith(".parquet")
+    )
+
+
+def season_version(season):
+    """
+    Returns a fingerprint of the stored plays for a season, or None if the season
+    is not stored. It hashes the name and parquet footer (row count, column chunk
+    sizes and statistics) of every pbp part, so it changes whenever plays are
+    appended or replaced and is the same on any host holding the same plays. Used
+    as part of cache keys to invalidate only that season.
+    """
+    path = os.path.join(season_dir(season), "pbp")
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha1()
+    for part in pbp_parts(season):
+        try:
+            footer = _footer_digest(part)
+        except FileNotFoundError:
+            continue  # removed by a reload; the version moves again once it is done
+        digest.update(os.path.basename(part).encode() + footer)
+    return f"{season}-{digest.hexdigest()[:16]}"
+
+
+def _footer_digest(path):
+    # footers are read once per part file, after that a version costs one stat
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    footer = _footers.get(key)
+    if footer is None:
+        with open(path, "rb") as f:
+            f.seek(-8, os.SEEK_END)
+            length = int.from_bytes(f.read(4), "little")
+            f.seek(-8 - length, os.SEEK_END)
+            footer = hashlib.sha1(f.read(length)).digest()
+        _footers[key] = footer
+    return footer
+
+
+_footers = {}
+
+
+def _schema_fits(season):
+    # each part's Parquet schema is checked once per file, like its footer digest
+    for part in pbp_parts(season):
+        try:
+            stat = os.stat(part)
+            key = (part, stat.st_size, stat.st_mtime_ns)
+            if key not in _checked:
+                _checked[key] = not schema.mismatches(pq.read_schema(part))
+        except FileNotFoundError:
+            continue  # removed by a reload
+        if not _checked[key]:
+            return False
+    return True
+
+
+_checked = {}
+
+
+def stored_seasons():
+    """
+    Returns the seasons in the store, oldest first.
+    """
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(
+        int(x) for x in os.listdir(DATA_DIR) if x.isdigit() and season_version(int(x))
+    )
+
+
+def read_pbp(season, columns=None):
+    """
+    Returns the stored play by play data for a season in stored row order. The
+    plays of a game come from the last part holding it, so a refresh that
+    replaces a game only appends.
+    """
+    parts = pbp_parts(season)
+    if columns is not None and len(parts) > 1 and "game_id" not in columns:
+        plays = read_pbp(season, list(columns) + ["game_id"])
+        return plays.drop(columns="game_id")
+    frames = [pd.read_parquet(x, columns=columns) for x in parts]
+    if len(frames) == 1:
+        return dims.normalize(frames[0])
+    later = set()
+    for i in reversed(range(len(frames))):
+        frame = frames[i]
+        if later:
+            frames[i] = frame[~frame.game_id.isin(later)]
+        later.update(frame.game_id.unique())
+    return dims.normalize(pd.concat(frames, ignore_index=True))
+
+
+def search_path(season):
+    return os.path.join(season_dir(season), "search")
+
+
+def arrow_path(season):
+    return os.path.join(season_dir(season), "pbp.arrow")
+
+
+def map_pbp(season):
+    """
+    Returns the play by play data for a season backed by a memory-mapped Arrow
+    file. Numeric columns point straight at the mapped pages, so every process
+    on the host shares one copy of them through the OS page cache. The frame is
+    read-only; copy it before assigning to it.
+
+    One mapping is kept per season and replaced when the season version moves.
+    Concurrent calls for the same season share one mapping.
+    """
+    return _flight.do(("map", season), _map_pbp, season)
+
+
+def _map_pbp(season):
+    version = season_version(season)
+    with _mapped_lock:
+        cached = _mapped.get(season)
+        if cached is not None and cached[0] == version:
+            memory.hit("store._mapped", season)
+            return cached[1]
+    if not os.path.exists(arrow_path(season)):
+        _write_arrow(read_pbp(season), arrow_path(season))
+    with pa.memory_map(arrow_path(season)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    data = dims.normalize(table.to_pandas(split_blocks=True, self_destruct=True))
+    with _mapped_lock:
+        _mapped[season] = (version, data)
+    memory.record("store._mapped", season)
+    return data
+
+
+_mapped = {}
+memory.watch("store._mapped", _mapped)
+_mapped_lock = threading.Lock()
+# one in-flight load/map per season across all sessions in this process
+_flight = SingleFlight()
+
+
+def read_table(season, table):
+    return dims.normalize(pd.read_parquet(table_path(season, table)))
+
+
+def _tmp_path(path):
+    # unique per writer, so concurrent writers never share a partial file
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path),
+        prefix=f"{os.path.basename(path)}.{os.getpid()}.",
+        suffix=".tmp",
+    )
+    os.close(fd)
+    return tmp
+
+
+def _write(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _tmp_path(path)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _write_arrow(df, path):
+    # Numeric columns go in as plain arrays so NaN stays a value rather than a
+    # null; columns without a validity bitmap convert to pandas without a copy.
+    arrays = [
+        pa.array(df[x].to_numpy()) if df[x].dtype.kind in "biuf" else pa.array(df[x])
+        for x in df.columns
+    ]
+    table = pa.Table.from_arrays(arrays, names=list(df.columns))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _tmp_path(path)
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _append_pbp(season, plays):
+    # The part is written last so the season version only moves once the
+    # derived tables for it are already on disk.
+    part = os.path.join(
+        season_dir(season), "pbp", f"part-{len(pbp_parts(season)):04d}.parquet"
+    )
+    _write(plays, part)
+
+
+@contextlib.contextmanager
+def _season_lock(season):
+    """
+    Holds an exclusive lock on a season across processes while it is written,
+    so two loads or refreshes of one season never interleave their writes.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(os.path.join(DATA_DIR, f"{season}.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def fetch_season(season):
+    """
+    Downloads a full season of play by play data from nflverse, with the
+    shared categorical dimensions applied.
+    """
+    if OFFLINE:
+        raise FileNotFoundError(
+            f"Season {season} is not in the local store and NFL_OFFLINE is set."
+        )
+    data = nfl.import_pbp_data(years=[season], downcast=False)
+    return dims.normalize(data.reset_index(drop=True))
+
+
+# reference tables kept as downloaded; seasonal ones are stored per season
+REFERENCE = {
+    "team_desc": nfl.import_team_desc,
+    "rosters": nfl.import_rosters,
+    "depth_charts": nfl.import_depth_charts,
+}
+
+
+def reference_path(name, season=None):
+    file_name = name if season is None else f"{name}_{season}"
+    return os.path.join(DATA_DIR, "reference", f"{file_name}.parquet")
+
+
+def read_reference(name, season=None):
+    """
+    Returns a reference table from the store, downloading it into the store
+    the first time. With NFL_OFFLINE set only stored tables are read.
+
+    params:
+        name (str): key of REFERENCE.
+        season (int): season of a seasonal table, None for team_desc.
+    """
+    path = reference_path(name, season)
+    if not os.path.exists(path):
+        if OFFLINE:
+            raise FileNotFoundError(
+                f"{os.path.basename(path)} is not in the local store and "
+                "NFL_OFFLINE is set."
+            )
+        load = REFERENCE[name]
+        data = load() if season is None else load([season])
+        _write(data.reset_index(drop=True), path)
+    return pd.read_parquet(path)
+
+
+def load_season(season):
+    """
+    Downloads a season and writes it and its derived tables to the store,
+    replacing anything already stored for it.
+
+    Returns:
+        The new season version.
+    """
+    with _season_lock(season):
+        return _load_season(season)
+
+
+def _load_season(season, plays=None):
+    # plays already at hand (a stored season being rewritten) skip the download
+    if plays is None:
+        plays = fetch_season(season)
+    plays = schema.coerce(plays)
+    for table, build in TABLES.items():
+        _write(build(plays), table_path(season, table))
+    _write(aggregates.build_passer_index(plays), table_path(season, "passer_index"))
+    _write_arrow(plays, arrow_path(season))
+    search.build_index(plays, search_path(season))
+    for part in pbp_parts(season):
+        os.remove(part)
+    _append_pbp(season, plays)
+    return season_version(season)
+
+
+def ensure_season(season):
+    """
+    Returns the version of a stored season, loading it first if needed.
+    Concurrent calls for a season that is not stored yet share one download.
+    A season whose stored plays no longer fit schema.PBP is coerced and
+    written again, or downloaded again if it cannot be coerced.
+    """
+    version = season_version(season)
+    if (
+        version is not None
+        and all(os.path.exists(table_path(season, x)) for x in TABLES)
+        and os.path.exists(search_path(season))
+        and _schema_fits(season)
+    ):
+        return version
+    return _flight.do(("ensure", season), _ensure_season, season)
+
+
+def _ensure_season(season):
+    with _season_lock(season):
+        return _ensure_locked(season)
+
+
+def _ensure_locked(season):
+    # checked again under the lock: another process may have stored it since
+    version = season_version(season)
+    if version is None or not pbp_parts(season):
+        return _load_season(season)
+    if not _schema_fits(season):
+        # stored before the schema or a change to it
+        try:
+            plays = schema.coerce(read_pbp(season))
+        except schema.SchemaError:
+            plays = None
+        return _load_season(season, plays)
+    missing = [x for x in TABLES if not os.path.exists(table_path(season, x))]
+    if missing or not os.path.exists(search_path(season)):
+        # tables added to the store after this season was loaded
+        plays = read_pbp(season)
+        for table in missing:
+            _write(TABLES[table](plays), table_path(season, table))
+        if not os.path.exists(search_path(season)):
+            search.build_index(plays, search_path(season))
+    return version
+
+
+def refresh_season(season):
+    """
+    Stores plays from games that are new in the source or whose play count
+    changed since they were stored (games stored while in progress), and
+    updates the derived tables for those games and the teams involved.
+
+    Returns:
+        List of the game_ids that were added or replaced.
+    """
+    with _season_lock(season):
+        return _refresh_season(season)
+
+
+def _refresh_season(season):
+    if not pbp_parts(season):
+        _load_season(season)
+        return []
+    stored = read_pbp(season)
+    source = schema.coerce(fetch_season(season))
+    stored_counts = stored.game_id.value_counts()
+    source_counts = source.game_id.value_counts()
+    changed = source_counts.index[
+        source_counts.ne(stored_counts.reindex(source_counts.index, fill_value=0))
+    ]
+    if len(changed) == 0:
+        return []
+
+    changed_plays = source[source.game_id.isin(changed)].reset_index(drop=True)
+    replaced = stored.game_id.isin(changed)
+    old_plays = stored[replaced]
+    kept = stored[~replaced]
+    teams = pd.unique(changed_plays[["home_team", "away_team"]].values.ravel())
+
+    # The part is written last, so a refresh that stopped before it left these
+    # tables with rows of changed games that the stored plays lack. Every step
+    # below drops those rows before adding them, so running it again is safe.
+
+    # ---- Per game and per week tables: rows of the changed games only ----
+    for table, order in NEW_GAME_TABLES.items():
+        rows = read_table(season, table)
+        new_rows = TABLES[table](changed_plays)
+        # rows already added, and rows of the stored plays of replaced games
+        stale_keys = new_rows[order]
+        if len(old_plays):
+            stale_keys = pd.concat(
+                [stale_keys, TABLES[table](old_plays)[order]], ignore_index=True
+            )
+        stale_keys = stale_keys.drop_duplicates()
+        stale = rows[order].merge(stale_keys, how="left", indicator=True)
+        rows = rows[(stale["_merge"] == "left_only").to_numpy()]
+        rows = pd.concat([rows, new_rows], ignore_index=True)
+        rows = rows.sort_values(order, kind="stable").reset_index(drop=True)
+        _write(rows, table_path(season, table))
+
+    # ---- Team cube: rebuild rows for affected teams only ----
+    # same row order as read_pbp gives once the part is written
+    plays = pd.concat([kept, changed_plays], ignore_index=True)
+    affected = plays[plays.home_team.isin(teams) | plays.away_team.isin(teams)]
+    rebuilt = aggregates.build_team_cube(affected)
+    cube = read_table(season, "team_cube")
+    cube = pd.concat(
+        [cube[~cube.team.isin(teams)], rebuilt[rebuilt.team.isin(teams)]],
+        ignore_index=True,
+    ).sort_values(["game_id", "season_type", "week", "team"])
+    _write(cube.reset_index(drop=True), table_path(season, "team_cube"))
+
+    # ---- Passer index: new rows are appended after the stored ones ----
+    if len(old_plays):
+        # removing the replaced plays moves the rows after them
+        index = aggregates.build_passer_index(plays)
+    else:
+        index = read_table(season, "passer_index")
+        index = pd.concat(
+            [
+                index[index.row < len(stored)],
+                aggregates.build_passer_index(changed_plays, offset=len(stored)),
+            ],
+            ignore_index=True,
+        )
+    _write(index, table_path(season, "passer_index"))
+
+    _write_arrow(plays, arrow_path(season))
+    search.build_index(plays, search_path(season))
+    _append_pbp(season, changed_plays)
+    return list(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local NFL data store.")
+    parser.add_argument("command", choices=["load", "refresh"])
+    parser.add_argument("seasons", nargs="+", type=int)
+    args = parser.parse_args()
+
+    for season in args.seasons:
+        if args.command == "load":
+            load_season(season)
+            print(f"{season}: loaded")
+        else:
+            changed = refresh_season(season)
+            print(f"{season}: {len(changed)} new or updated games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dims  # noqa: E402
+import store  # noqa: E402
+
+
+def make_plays(games, plays_per_game=24, seed=0):
+    """
+    Returns synthetic play by play data with the columns the store's table
+    builders read, for games given as (week, home_team, away_team) tuples.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for week, home, away in games:
+        n = plays_per_game
+        home_ball = (np.arange(n) // 6) % 2 == 0
+        posteam = np.where(home_ball, home, away).astype(object)
+        defteam = np.where(home_ball, away, home).astype(object)
+        play_type = rng.choice(["pass", "run", "punt"], n, p=[0.5, 0.4, 0.1])
+        passing = play_type == "pass"
+        sack = (passing & (rng.random(n) < 0.1)).astype(float)
+        complete = (passing & (sack == 0) & (rng.random(n) < 0.6)).astype(float)
+        touchdown = (rng.random(n) < 0.05).astype(float)
+        drive = (np.arange(n) // 6 + 1).astype(float)
+        yardline = rng.integers(1, 99, n).astype(float)
+        home_score, away_score = rng.integers(0, 35, 2).astype(float)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "play_id": np.arange(n) + 1.0,
+                    "game_id": f"2021_{week:02d}_{away}_{home}",
+                    "season": 2021,
+                    "week": week,
+                    "season_type": "REG",
+                    "home_team": home,
+                    "away_team": away,
+                    "posteam": posteam,
+                    "defteam": defteam,
+                    "play_type": play_type,
+                    "yards_gained": rng.integers(-5, 25, n).astype(float),
+                    "sack": sack,
+                    "complete_pass": complete,
+                    "pass_attempt": passing.astype(float),
+                    "rush_attempt": (play_type == "run").astype(float),
+                    "qb_dropback": passing.astype(float),
+                    "touchdown": touchdown,
+                    "pass_touchdown": touchdown * passing,
+                    "td_team": np.where(touchdown == 1, posteam, None),
+                    "interception": (passing & (rng.random(n) < 0.03)).astype(float),
+                    "fumble_lost": (rng.random(n) < 0.01).astype(float),
+                    "solo_tackle": (rng.random(n) < 0.6).astype(float),
+                    "assist_tackle": (rng.random(n) < 0.2).astype(float),
+                    "air_yards": np.where(passing, rng.integers(0, 20, n), np.nan),
+                    "yards_after_catch": np.where(complete == 1, 3.0, np.nan),
+                    "passer_id": np.where(passing, posteam + "_QB", None),
+                    "passer_player_name": np.where(passing, posteam + ".QB", None),
+                    "receiver_player_id": np.where(passing, posteam + "_WR", None),
+                    "receiver_player_name": np.where(passing, posteam + ".WR", None),
+                    "rusher_player_id": np.where(play_type == "run", posteam + "_RB", None),
+                    "rusher_player_name": np.where(play_type == "run", posteam + ".RB", None),
+                    "down": rng.integers(1, 5, n).astype(float),
+                    "qtr": np.minimum(np.arange(n) * 4 // n + 1, 4).astype(float),
+                    "third_down_failed": rng.integers(0, 2, n).astype(float),
+                    "third_down_converted": rng.integers(0, 2, n).astype(float),
+                    "goal_to_go": (yardline < 10).astype(float),
+                    "yardline_100": yardline,
+                    "drive": drive,
+                    "fixed_drive": drive,
+                    "fixed_drive_result": np.where(drive % 3 == 0, "Touchdown", "Punt"),
+                    "home_score": home_score,
+                    "away_score": away_score,
+                    "total_home_score": np.linspace(0, home_score, n).round(),
+                    "total_away_score": np.linspace(0, away_score, n).round(),
+                    "game_seconds_remaining": np.linspace(3600, 0, n),
+                    "score_differential": rng.integers(-14, 14, n).astype(float),
+                    "shotgun": rng.integers(0, 2, n).astype(float),
+                    "no_huddle": rng.integers(0, 2, n).astype(float),
+                    "epa": rng.normal(0, 1, n),
+                    "wpa": rng.normal(0, 0.03, n),
+                    "success": rng.integers(0, 2, n).astype(float),
+                    "cpoe": np.where(passing, rng.normal(0, 10, n), np.nan),
+                    "home_wp": rng.random(n),
+                    "desc": np.where(passing, "pass short right", "run up the middle"),
+                }
+            )
+        )
+    return dims.normalize(pd.concat(frames, ignore_index=True))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Points the store at an empty directory, offline.
+    """
+    monkeypatch.setattr(store, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(store, "OFFLINE", True)
+    return tmp_path
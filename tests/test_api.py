@@ -0,0 +1,106 @@
+import asyncio
+import collections
+import gzip
+import json
+
+import pytest
+
+import api
+import store
+from conftest import make_plays
+
+
+GAMES = [(1, "KC", "BUF"), (1, "DAL", "PHI"), (2, "BUF", "DAL"), (2, "PHI", "KC")]
+
+
+@pytest.fixture
+def season(data_dir, monkeypatch):
+    monkeypatch.setattr(api, "_responses", collections.OrderedDict())
+    plays = make_plays(GAMES)
+    monkeypatch.setattr(store, "fetch_season", lambda season: plays)
+    store.load_season(2021)
+    return 2021
+
+
+def _get(path, query="", headers=(), method="GET"):
+    """
+    Returns (status, headers, body) of one request to the ASGI app.
+    """
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+    }
+    asyncio.run(api.app(scope, receive, send))
+    start, body = sent
+    return start["status"], dict(start["headers"]), body["body"]
+
+
+def test_conditional_requests_get_304(season):
+    status, headers, body = _get("/qbs", "season=2021")
+    etag = headers[b"etag"].decode()
+    assert status == 200 and body
+    assert {x["passer_id"] for x in json.loads(body)["qbs"]} == {
+        "KC_QB", "BUF_QB", "DAL_QB", "PHI_QB"
+    }
+
+    status, headers, body = _get("/qbs", "season=2021", [("If-None-Match", etag)])
+    assert status == 304 and body == b""
+    assert headers[b"etag"].decode() == etag
+    status, _, body = _get(
+        "/qbs", "season=2021", [("If-None-Match", f'W/"other", {etag}')]
+    )
+    assert status == 304
+    status, _, body = _get("/qbs", "season=2021", [("If-None-Match", 'W/"other"')])
+    assert status == 200 and body
+
+
+def test_large_bodies_are_gzipped_when_accepted(season):
+    _, plain_headers, plain = _get("/qbs", "season=2021")
+    status, headers, body = _get(
+        "/qbs", "season=2021", [("Accept-Encoding", "gzip, deflate")]
+    )
+
+    assert len(plain) >= api.GZIP_MIN_BYTES
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body) == plain
+    assert int(headers[b"content-length"]) == len(body) < len(plain)
+    assert b"content-encoding" not in plain_headers
+    assert headers[b"etag"] == plain_headers[b"etag"]
+    # small bodies go out as they are
+    _, headers, body = _get("/seasons", headers=[("Accept-Encoding", "gzip")])
+    assert b"content-encoding" not in headers
+    assert json.loads(body) == {"seasons": [2021]}
+
+
+def test_responses_are_kept_per_store_version(season, monkeypatch):
+    first = asyncio.run(api.respond("/qbs", {"season": "2021"}))
+    assert asyncio.run(api.respond("/qbs", {"season": "2021"})) is first
+
+    more = make_plays(GAMES + [(3, "KC", "DAL")])
+    monkeypatch.setattr(store, "fetch_season", lambda season: more)
+    store.refresh_season(season)
+    second = asyncio.run(api.respond("/qbs", {"season": "2021"}))
+    assert second is not first
+    assert second.etag != first.etag
+
+
+def test_errors(season):
+    assert _get("/nowhere")[0] == 404
+    assert _get("/qbs", "season=abc")[0] == 400
+    assert _get("/qbs", "season=1990")[0] == 404
+    assert _get("/teams/XYZ/kpis", "season=2021")[0] == 404
+    assert _get("/seasons", method="POST")[0] == 405
+    status, headers, body = _get("/seasons", method="HEAD")
+    assert status == 200 and body == b"" and int(headers[b"content-length"]) > 0
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+import diskcache
+import store
+from conftest import make_plays
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(diskcache, "CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def counted():
+    calls = []
+
+    @diskcache.disk_cache
+    def total(season, version):
+        calls.append((season, version))
+        return pd.DataFrame({"season": [season], "version": [str(version)]})
+
+    return total, calls
+
+
+def _entries(cache_dir):
+    return sorted(x for x in os.listdir(cache_dir) if x.endswith(".parquet"))
+
+
+def test_entries_are_read_back_by_arguments(cache_dir, counted):
+    total, calls = counted
+    first = total(2021, "v1")
+    pd.testing.assert_frame_equal(total(2021, "v1"), first)
+    total(2020, "v1")
+
+    assert calls == [(2021, "v1"), (2020, "v1")]
+    assert len(_entries(cache_dir)) == 2
+    assert not any(x.endswith(".tmp") for x in os.listdir(cache_dir))
+
+
+def test_a_new_store_version_misses(data_dir, cache_dir, counted, monkeypatch):
+    total, calls = counted
+    plays = make_plays([(1, "KC", "BUF"), (2, "BUF", "KC")])
+    first = plays[plays.week == 1].reset_index(drop=True)
+    monkeypatch.setattr(store, "fetch_season", lambda season: first)
+    store.load_season(2021)
+    total(2021, store.season_version(2021))
+    total(2021, store.season_version(2021))
+
+    monkeypatch.setattr(store, "fetch_season", lambda season: plays)
+    store.refresh_season(2021)
+    total(2021, store.season_version(2021))
+
+    assert len(calls) == 2
+    assert calls[0][1] != calls[1][1]
+
+
+def test_a_code_change_misses(cache_dir, counted, monkeypatch):
+    total, calls = counted
+    total(2021, "v1")
+    monkeypatch.setattr(diskcache, "CODE_VERSION", "changed")
+    total(2021, "v1")
+
+    assert len(calls) == 2
+    assert diskcache._code_version() == diskcache._code_version()
+
+
+def test_least_recently_used_entries_are_evicted(cache_dir, counted, monkeypatch):
+    total, calls = counted
+    for season in (2019, 2020, 2021):
+        total(season, "v1")
+    entries = _entries(cache_dir)
+    size = max(os.path.getsize(cache_dir / x) for x in entries)
+    # entries age in name order, then the oldest is read and becomes the newest
+    for age, name in enumerate(entries):
+        os.utime(cache_dir / name, (1000 + age, 1000 + age))
+    read_again = entries[0]
+    survivor = int(pd.read_parquet(cache_dir / read_again).season[0])
+    monkeypatch.setattr(diskcache, "MAX_BYTES", 2 * size)
+    total(survivor, "v1")
+    total(2022, "v1")
+
+    remaining = _entries(cache_dir)
+    assert len(remaining) == 2
+    assert read_again in remaining
+    assert len(calls) == 4  # the read entry was not recomputed
@@ -0,0 +1,62 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import export
+
+
+def _read(chunks):
+    return pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_iter_parquet_writes_every_season_in_row_groups():
+    parts = [
+        (2020, pd.DataFrame({"team": ["KC", "BUF", "DAL"], "yards": [1.0, 2.0, 3.0]})),
+        (2021, pd.DataFrame({"team": ["PHI", "SF"], "yards": [4.0, 5.0]})),
+    ]
+    result = _read(export.iter_parquet(parts, chunk_rows=2))
+
+    assert result.metadata.num_row_groups == 3
+    table = result.read().to_pandas()
+    assert table.season.tolist() == [2020, 2020, 2020, 2021, 2021]
+    assert table.yards.tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_iter_parquet_types_columns_from_every_season():
+    # an empty first season and a column that is all None in the next one
+    # would type the column null if the first chunk decided the schema
+    parts = [
+        (2019, pd.DataFrame({"team": pd.Series([], dtype=object), "yards": []})),
+        (2020, pd.DataFrame({"team": [None, None], "yards": [1.0, 2.0]})),
+        (2021, pd.DataFrame({"team": ["KC", None], "yards": [3.0, 4.0]})),
+    ]
+    result = _read(export.iter_parquet(parts, chunk_rows=2))
+
+    assert str(result.schema_arrow.field("team").type) == "string"
+    assert result.metadata.num_row_groups == 2
+    table = result.read().to_pandas()
+    assert table.team.tolist() == [None, None, "KC", None]
+    assert table.season.tolist() == [2020, 2020, 2021, 2021]
+
+
+def test_iter_parquet_keeps_a_season_column_of_the_data():
+    parts = [(2021, pd.DataFrame({"season": [2021], "week": [1]}))]
+    table = _read(export.iter_parquet(parts)).read().to_pandas()
+    assert list(table.columns) == ["season", "week"]
+
+
+def test_iter_parquet_without_rows_is_a_valid_file():
+    empty = _read(export.iter_parquet([(2021, pd.DataFrame({"yards": []}))]))
+    assert empty.metadata.num_rows == 0
+    assert "season" in empty.schema_arrow.names
+    assert _read(export.iter_parquet([])).metadata.num_rows == 0
+
+
+def test_iter_csv_has_one_header():
+    parts = [
+        (2020, pd.DataFrame({"yards": []})),
+        (2021, pd.DataFrame({"yards": [1.0, 2.0, 3.0]})),
+    ]
+    text = b"".join(export.iter_csv(parts, chunk_rows=2)).decode()
+    assert text.splitlines() == ["yards,season", "1.0,2021", "2.0,2021", "3.0,2021"]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import filters
+
+
+@pytest.fixture
+def plays():
+    rng = np.random.default_rng(0)
+    n = 500
+    down = rng.integers(1, 5, n).astype(float)
+    down[::17] = np.nan  # kickoffs and penalties have no down
+    return pd.DataFrame(
+        {
+            "down": down,
+            "qtr": rng.integers(1, 6, n).astype(float),
+            "score_differential": rng.integers(-30, 30, n).astype(float),
+            "yardline_100": rng.integers(1, 100, n).astype(float),
+            "shotgun": rng.integers(0, 2, n).astype(float),
+            "no_huddle": rng.integers(0, 2, n).astype(float),
+        }
+    )
+
+
+SPLITS = [
+    dict(down=[3, 4]),
+    dict(qtr=[5]),
+    dict(score_differential=(-8, 8)),
+    dict(yardline_100=(0, 20), shotgun=1),
+    dict(down=[1], qtr=[4], score_differential=(-3, 0), no_huddle=0),
+]
+
+
+def _expected(plays, predicates):
+    mask = pd.Series(True, index=plays.index)
+    for column, value in predicates.items():
+        if filters.PREDICATES[column] == "in":
+            mask &= plays[column].isin(value)
+        elif filters.PREDICATES[column] == "range":
+            mask &= plays[column].between(*value)
+        else:
+            mask &= plays[column] == value
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize("predicates", SPLITS)
+@pytest.mark.parametrize("engine", ["numexpr", "numpy"])
+def test_split_mask_matches_pandas(plays, predicates, engine, monkeypatch):
+    if engine == "numpy":
+        monkeypatch.setattr(filters, "numexpr", None)
+    elif filters.numexpr is None:
+        pytest.skip("numexpr is not installed")
+    split = filters.make_split(**predicates)
+    np.testing.assert_array_equal(
+        filters.split_mask(plays, split), _expected(plays, predicates)
+    )
+
+
+def test_split_mask_is_cached_per_frame(plays):
+    split = filters.make_split(down=[3])
+    assert filters.split_mask(plays, split) is filters.split_mask(plays, split)
+    assert filters.split_mask(plays.copy(), split) is not filters.split_mask(
+        plays, split
+    )
+
+
+def test_make_split_is_canonical():
+    assert filters.make_split(down=[4, 3], qtr=[1]) == filters.make_split(
+        qtr=[1], down=[3, 4]
+    )
+    assert filters.make_split(down=[], shotgun=None) == ()
+    with pytest.raises(ValueError):
+        filters.make_split(week=[1])
+
+
+def test_empty_split_returns_the_frame(plays):
+    assert filters.apply_split(plays, ()) is plays
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import kernels
+from conftest import make_plays
+
+
+@pytest.fixture(params=["numba", "numpy"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setattr(kernels, "numba", None)
+    elif kernels.numba is None:
+        pytest.skip("numba is not installed")
+    return request.param
+
+
+def test_weekly_sums_match_a_pandas_groupby(engine):
+    rng = np.random.default_rng(0)
+    n, n_groups, n_weeks = 2000, 7, 19
+    group = rng.integers(-1, n_groups, n)  # -1 rows are skipped
+    week = rng.integers(0, n_weeks + 2, n)  # weeks past the end are skipped
+    values = rng.normal(size=(n, 3))
+    values[::11, 1] = np.nan
+
+    sums, counts = kernels.weekly_sums(group, week, values, n_groups, n_weeks)
+
+    frame = pd.DataFrame(values, columns=["a", "b", "c"]).assign(
+        group=group, week=week
+    )
+    frame = frame[(frame.group >= 0) & (frame.week < n_weeks)]
+    grouped = frame.groupby(["group", "week"])
+    expected = grouped[["a", "b", "c"]].sum()
+    codes, weeks = (expected.index.get_level_values(x) for x in ("group", "week"))
+    np.testing.assert_allclose(sums[codes, weeks], expected.to_numpy())
+    np.testing.assert_array_equal(counts[codes, weeks], grouped.size().to_numpy())
+    # every other cell is empty
+    assert counts.sum() == len(frame)
+    assert sums.shape == (n_groups, n_weeks, 3)
+
+
+def test_weekly_sums_without_rows(engine):
+    sums, counts = kernels.weekly_sums(
+        np.array([], dtype=np.int64), np.array([]), np.empty((0, 2)), 3, 4
+    )
+    assert sums.shape == (3, 4, 2) and not sums.any()
+    assert counts.shape == (3, 4) and not counts.any()
+
+
+def test_team_cube_matches_a_pandas_groupby(engine):
+    plays = make_plays([(1, "KC", "BUF"), (1, "DAL", "PHI"), (2, "BUF", "DAL")])
+    cube = aggregates.build_team_cube(plays).set_index(["game_id", "team"])
+
+    offense = plays.groupby(["game_id", "posteam"], observed=True)
+    defense = plays.groupby(["game_id", "defteam"], observed=True)
+    for column, expected in [
+        ("yards", offense.yards_gained.sum()),
+        ("sacks_taken", offense.sack.sum()),
+        ("yds_allowed", defense.yards_gained.sum()),
+        ("def_sacks", defense.sack.sum()),
+    ]:
+        expected.index.names = ["game_id", "team"]
+        pd.testing.assert_series_equal(
+            cube[column].reindex(expected.index),
+            expected.astype(float),
+            check_names=False,
+            check_index_type=False,
+        )
+
+
+def test_lttb_keeps_the_ends_and_the_peak():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50)
+    y[437] = 10.0
+    keep = kernels.lttb(x, y, 50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 437 in keep
+    assert (np.diff(keep) > 0).all()
+    np.testing.assert_array_equal(kernels.lttb(x[:40], y[:40], 50), np.arange(40))
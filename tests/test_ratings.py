@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ratings import RatingSystem
+
+
+TEAMS = ["KC", "BUF", "DAL", "PHI", "SF", "GB"]
+
+
+def _margins(games):
+    # games as (game_id, home, away, margin); EPA margins are a tenth of it
+    frame = pd.DataFrame(games, columns=["game_id", "home_team", "away_team", "margin"])
+    return frame.assign(epa_margin=frame.margin / 10)
+
+
+@pytest.fixture
+def round_robin():
+    # exact margins from known ratings and a home field advantage of 2
+    strength = dict(zip(TEAMS, [6.0, 4.0, 1.0, -2.0, -3.0, -6.0]))
+    games = [
+        (f"g{i}", home, away, strength[home] - strength[away] + 2.0)
+        for i, (home, away) in enumerate(itertools.permutations(TEAMS, 2))
+    ]
+    return strength, _margins(games)
+
+
+def test_ratings_recover_the_strengths(round_robin):
+    strength, margins = round_robin
+    system = RatingSystem()
+    system.add(margins)
+    ratings = system.ratings().set_index("team")
+
+    assert ratings.determined.all()
+    assert ratings.srs.sum() == pytest.approx(0, abs=1e-9)
+    for team, value in strength.items():
+        assert ratings.srs[team] == pytest.approx(value, abs=1e-9)
+        assert ratings.epa_srs[team] == pytest.approx(value / 10, abs=1e-9)
+    np.testing.assert_allclose(ratings.srs, ratings.margin + ratings.sos)
+    assert (ratings.games == 10).all()
+
+
+def test_disconnected_games_are_not_determined():
+    system = RatingSystem()
+    system.add(_margins([("g1", "KC", "BUF", 7), ("g2", "DAL", "PHI", -3)]))
+    ratings = system.ratings()
+
+    assert len(ratings) == 4
+    assert not ratings.determined.any()
+    assert np.isfinite(ratings.srs).all()
+
+
+def test_a_playoff_bracket_is_not_determined():
+    # a tree of games never has more equations than unknowns
+    system = RatingSystem()
+    system.add(
+        _margins(
+            [("w", "KC", "BUF", 3), ("x", "SF", "GB", 10), ("y", "KC", "SF", -4)]
+        )
+    )
+    assert not system.ratings().determined.any()
+
+
+def test_adding_games_again_or_with_new_margins(round_robin):
+    _, margins = round_robin
+    system = RatingSystem()
+    system.add(margins)
+    system.add(margins)
+    changed = margins.assign(margin=margins.margin.where(margins.game_id != "g0", 30))
+    changed = changed.assign(epa_margin=changed.margin / 10)
+    system.add(changed.iloc[:1])
+
+    fresh = RatingSystem()
+    fresh.add(changed)
+    pd.testing.assert_frame_equal(system.ratings(), fresh.ratings())
+
+
+def test_games_without_a_score_are_left_out(round_robin):
+    _, margins = round_robin
+    system = RatingSystem()
+    system.add(margins.assign(margin=margins.margin.where(margins.index > 0)))
+    assert "g0" not in system.games
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import schema
+import search
+import store
+from conftest import make_plays
+
+
+DESCRIPTIONS = [
+    "P.Mahomes pass deep left to T.Kelce for 31 yards",
+    "P.Mahomes pass short right to T.Kelce",
+    "J.Allen pass deep right to S.Diggs, lateral left, TOUCHDOWN",
+    "D.Henry left end to the 40",
+    "pass incomplete short left",
+    "Punt 45 yards, deep left",
+]
+
+
+@pytest.fixture
+def plays():
+    plays = schema.coerce(make_plays([(1, "KC", "BUF"), (2, "BUF", "KC")]))
+    rng = np.random.default_rng(1)
+    return plays.assign(desc=rng.choice(DESCRIPTIONS, len(plays)))
+
+
+@pytest.fixture
+def index(plays, tmp_path):
+    arrow = str(tmp_path / "pbp.arrow")
+    store._write_arrow(plays, arrow)
+    search.build_index(plays, str(tmp_path / "search"))
+    return search.SeasonIndex(str(tmp_path / "search"), arrow)
+
+
+def _words(plays):
+    return plays.desc.str.lower().str.findall(search.WORD).apply(set)
+
+
+def test_words_match_every_play_holding_them(plays, index):
+    words = _words(plays)
+    for query in ["deep", "deep left", "kelce pass", "touchdown", "punt yards"]:
+        tokens = search.tokenize(query)
+        expected = np.flatnonzero(words.apply(set(tokens).issubset))
+        np.testing.assert_array_equal(index.query(tokens), expected)
+
+
+def test_words_and_fields_are_anded(plays, index):
+    tokens, _ = search.parse("deep", {"posteam": "KC"}, ["complete_pass"])
+    expected = np.flatnonzero(
+        _words(plays).apply(lambda x: "deep" in x)
+        & (plays.posteam == "KC")
+        & (plays.complete_pass == 1)
+    )
+    np.testing.assert_array_equal(index.query(tokens), expected)
+    assert len(index.query(["deep", "nosuchword"])) == 0
+
+
+def test_phrases_keep_the_word_order(plays, index):
+    tokens, phrase = search.parse("deep  left", phrase=True)
+    assert phrase == "deep left"
+    expected = np.flatnonzero(plays.desc.str.lower().str.contains("deep left"))
+    np.testing.assert_array_equal(index.query(tokens, phrase=phrase), expected)
+    # the words alone also match "deep right ... left"
+    assert len(index.query(tokens)) > len(expected)
+    assert search.parse("deep left")[1] is None
+
+
+def test_ranges_alone_and_with_words(plays, index):
+    big = (plays.yards_gained >= 10) & (plays.yards_gained <= 20)
+    np.testing.assert_array_equal(
+        index.query(ranges={"yards_gained": (10, 20)}), np.flatnonzero(big)
+    )
+    np.testing.assert_array_equal(
+        index.query(["pass"], {"yards_gained": (10, None), "week": (2, 2)}),
+        np.flatnonzero(
+            _words(plays).apply(lambda x: "pass" in x)
+            & (plays.yards_gained >= 10)
+            & (plays.week == 2)
+        ),
+    )
+    with pytest.raises(ValueError):
+        index.query()
+
+
+def test_search_limits_plays_newest_season_first(index):
+    results, total = search.search({2020: index, 2021: index}, ["pass"], limit=5)
+
+    assert total == 2 * len(index.query(["pass"]))
+    assert len(results) == 5
+    assert (results.season == 2021).all()
+    assert results.desc.str.lower().str.contains("pass").all()
+    empty, total = search.search({2021: index}, ["nosuchword"])
+    assert total == 0 and list(empty.columns) == ["season"] + search.RESULT_COLUMNS
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import standings
+
+
+DIVISIONS = {
+    "AFC West": ["KC", "LV", "LAC", "DEN"],
+    "AFC East": ["BUF", "MIA", "NE", "NYJ"],
+}
+
+
+@pytest.fixture
+def team_info():
+    return pd.DataFrame(
+        [
+            {"team_abbr": team, "team_conf": "AFC", "team_division": division}
+            for division, teams in DIVISIONS.items()
+            for team in teams
+        ]
+    )
+
+
+def _games(results):
+    # results as (week, home, home_score, away, away_score)
+    frame = pd.DataFrame(
+        results, columns=["week", "home_team", "home_score", "away_team", "away_score"]
+    )
+    return frame.assign(
+        game_id=[f"g{i}" for i in range(len(frame))], season_type="REG"
+    )
+
+
+def _ranks(table, column):
+    return table.set_index("team")[column].to_dict()
+
+
+def test_head_to_head_breaks_a_tie_before_point_differential(team_info):
+    games = _games(
+        [
+            (1, "KC", 21, "LV", 17),  # KC beats LV by 4
+            (1, "BUF", 10, "MIA", 7),
+            (2, "MIA", 30, "KC", 0),  # KC loses by 30
+            (2, "LV", 30, "BUF", 0),  # LV wins by 30
+        ]
+    )
+    ranks = _ranks(standings.standings(games, team_info), "division_rank")
+    assert ranks["KC"] < ranks["LV"]
+
+
+def test_point_differential_breaks_an_otherwise_level_tie(team_info):
+    games = _games([(1, "KC", 30, "BUF", 0), (1, "LV", 10, "MIA", 0)])
+    table = standings.standings(games, team_info)
+    ranks = _ranks(table, "division_rank")
+
+    assert ranks["KC"] == 1 and ranks["LV"] == 2
+    # the losers: MIA lost by less
+    assert ranks["MIA"] < ranks["BUF"]
+
+
+def test_division_leaders_are_seeded_first(team_info):
+    games = _games(
+        [
+            (1, "KC", 20, "LV", 10),
+            (1, "BUF", 20, "NE", 10),
+            (2, "LV", 20, "LAC", 10),
+            (2, "MIA", 20, "BUF", 10),
+            (3, "LV", 20, "DEN", 10),
+            (3, "NE", 20, "MIA", 10),
+            (4, "KC", 20, "MIA", 10),
+        ]
+    )
+    table = standings.standings(games, team_info)
+    seeds = _ranks(table, "conference_rank")
+
+    # LV is 2-1 but second in its division, so the 1-1 AFC East leader
+    # is seeded ahead of it
+    east_leader = table[(table.division == "AFC East") & (table.division_rank == 1)]
+    assert seeds["KC"] == 1
+    assert seeds[east_leader.team.iloc[0]] == 2
+    assert seeds["LV"] == 3
+
+
+def test_ties_count_as_half_a_win(team_info):
+    games = _games([(1, "KC", 17, "LV", 17), (2, "KC", 20, "DEN", 10)])
+    table = standings.standings(games, team_info).set_index("team")
+
+    assert table.loc["KC", ["wins", "losses", "ties"]].tolist() == [1, 0, 1]
+    assert table.win_pct["KC"] == pytest.approx(0.75)
+    assert table.win_pct["LV"] == pytest.approx(0.5)
+    # teams without games have no row rather than a .000 record
+    assert "NYJ" not in table.index
+
+
+def test_weekly_standings_hold_every_week(team_info):
+    games = _games([(1, "KC", 20, "LV", 10), (2, "LV", 20, "KC", 10)])
+    weekly = standings.weekly_standings(games, team_info)
+
+    assert sorted(weekly.week.unique()) == [1, 2]
+    by_week = weekly[weekly.team == "KC"].set_index("week")
+    assert by_week.wins.tolist() == [1, 1]
+    assert by_week.losses.tolist() == [0, 1]
+    assert standings.weekly_standings(games.iloc[:0], team_info).empty
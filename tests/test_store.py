@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+import store
+from conftest import make_plays
+
+
+SEASON = 2021
+GAMES = [
+    (1, "KC", "BUF"),
+    (1, "DAL", "PHI"),
+    (2, "BUF", "DAL"),
+    (2, "PHI", "KC"),
+    (3, "KC", "DAL"),
+    (3, "BUF", "PHI"),
+]
+
+
+def _load(monkeypatch, plays):
+    monkeypatch.setattr(store, "fetch_season", lambda season: plays)
+    store.load_season(SEASON)
+
+
+def _refresh(monkeypatch, plays):
+    monkeypatch.setattr(store, "fetch_season", lambda season: plays)
+    return store.refresh_season(SEASON)
+
+
+def _tables():
+    return {x: store.read_table(SEASON, x) for x in [*store.TABLES, "passer_index"]}
+
+
+def _assert_same_tables(refreshed, loaded):
+    keys = {**store.NEW_GAME_TABLES, "team_cube": ["game_id", "team"]}
+    for table, order in keys.items():
+        pd.testing.assert_frame_equal(
+            refreshed[table].sort_values(order).reset_index(drop=True),
+            loaded[table].sort_values(order).reset_index(drop=True),
+            check_dtype=False,
+            check_categorical=False,
+        )
+
+
+@pytest.fixture
+def source():
+    return make_plays(GAMES)
+
+
+def test_refresh_appends_new_games(data_dir, monkeypatch, source):
+    last = source.game_id.iloc[-1]
+    _load(monkeypatch, source[source.game_id != last].reset_index(drop=True))
+    before = store.season_version(SEASON)
+
+    assert _refresh(monkeypatch, source) == [last]
+    assert store.season_version(SEASON) != before
+    assert len(store.pbp_parts(SEASON)) == 2
+    assert len(store.read_pbp(SEASON)) == len(source)
+    assert last in set(store.read_table(SEASON, "games").game_id)
+
+
+def test_refresh_without_changes_is_a_no_op(data_dir, monkeypatch, source):
+    _load(monkeypatch, source)
+    before = store.season_version(SEASON)
+
+    assert _refresh(monkeypatch, source) == []
+    assert store.season_version(SEASON) == before
+    assert len(store.pbp_parts(SEASON)) == 1
+
+
+def test_refresh_replaces_games_stored_in_progress(data_dir, monkeypatch, source):
+    # one game stored after its first half only, one not stored at all
+    partial, missing = source.game_id.unique()[[2, 5]]
+    in_progress = source[
+        (source.game_id != missing)
+        & ~((source.game_id == partial) & (source.play_id > 12))
+    ].reset_index(drop=True)
+    _load(monkeypatch, in_progress)
+
+    assert sorted(_refresh(monkeypatch, source)) == sorted([partial, missing])
+    refreshed, plays = _tables(), store.read_pbp(SEASON)
+
+    # the same as loading the finished games from scratch
+    assert len(plays) == len(source)
+    assert (plays.groupby("game_id").size() == source.groupby("game_id").size()).all()
+    index = refreshed["passer_index"]
+    assert (plays.passer_id.to_numpy()[index.row] == index.passer_id.to_numpy()).all()
+    _load(monkeypatch, source)
+    _assert_same_tables(refreshed, _tables())
+
+
+def test_read_pbp_takes_each_game_from_its_last_part(data_dir, monkeypatch, source):
+    first = source.game_id.iloc[0]
+    _load(monkeypatch, source[source.play_id <= 12].reset_index(drop=True))
+    _refresh(monkeypatch, source)
+
+    plays = store.read_pbp(SEASON, columns=["play_id"])
+    assert list(plays.columns) == ["play_id"]
+    assert len(plays) == len(source)
+    assert store.read_pbp(SEASON).query("game_id == @first").play_id.max() == 24
+
+
+def test_refresh_again_after_stopping_before_the_part(data_dir, monkeypatch, source):
+    partial, missing = source.game_id.unique()[[1, 4]]
+    in_progress = source[
+        (source.game_id != missing)
+        & ~((source.game_id == partial) & (source.play_id > 12))
+    ].reset_index(drop=True)
+    _load(monkeypatch, in_progress)
+
+    def crash(season, plays):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store, "_append_pbp", crash)
+        with pytest.raises(KeyboardInterrupt):
+            _refresh(monkeypatch, source)
+    assert len(store.pbp_parts(SEASON)) == 1
+
+    assert sorted(_refresh(monkeypatch, source)) == sorted([partial, missing])
+    refreshed = _tables()
+    _load(monkeypatch, source)
+    _assert_same_tables(refreshed, _tables())
+    assert len(refreshed["passer_index"]) == len(_tables()["passer_index"])
+
+
+def test_seasons_stored_before_the_schema_are_rewritten(data_dir, monkeypatch, source):
+    _load(monkeypatch, source)
+    part = store.pbp_parts(SEASON)[0]
+    # an older store: flags as ints with gaps, a column missing
+    old = store.read_pbp(SEASON).drop(columns="wpa")
+    old["sack"] = old.sack.astype("Int64").astype(object).where(old.index % 5 > 0)
+    old.to_parquet(part, index=False)
+    monkeypatch.setattr(store, "fetch_season", None)  # no download needed
+
+    version = store.ensure_season(SEASON)
+    plays = store.read_pbp(SEASON)
+    assert version == store.season_version(SEASON)
+    assert plays.sack.dtype == "float64" and plays.sack.notna().all()
+    assert "wpa" in plays.columns
+    assert store.ensure_season(SEASON) == version
+
+
+def test_seasons_that_cannot_be_coerced_are_downloaded(data_dir, monkeypatch, source):
+    _load(monkeypatch, source)
+    store.read_pbp(SEASON).drop(columns="home_score").to_parquet(
+        store.pbp_parts(SEASON)[0], index=False
+    )
+    store.ensure_season(SEASON)
+    assert len(store.read_pbp(SEASON).home_score.dropna()) == len(source)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import analytics
+import trends
+from conftest import make_plays
+
+
+METRICS = {"rate": ("made", "tries", 100), "per_game": ("made", "games", 1)}
+
+
+@pytest.fixture
+def weeks():
+    # teams skip different weeks, and A has a week without tries
+    rows = [("A", 1, 2, 4), ("A", 2, 0, 0), ("A", 4, 3, 5), ("A", 5, 1, 1)]
+    rows += [("B", 2, 1, 2), ("B", 3, 4, 8), ("B", 6, 0, 3)]
+    frame = pd.DataFrame(rows, columns=["team", "week", "made", "tries"])
+    return frame.sample(frac=1, random_state=0)  # windowed sorts
+
+
+def _expected(weeks, window):
+    # each rate from the sums of the team's last window games, by brute force
+    rows = []
+    for team, games in weeks.sort_values("week").groupby("team"):
+        for i in range(len(games)):
+            last = games.iloc[max(0, i + 1 - (window or i + 1)) : i + 1]
+            tries = last.tries.sum()
+            rows.append(
+                {
+                    "team": team,
+                    "week": games.week.iloc[i],
+                    "rate": 100 * last.made.sum() / tries if tries else np.nan,
+                    "per_game": last.made.sum() / len(last),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("window", list(trends.WINDOWS.values()))
+def test_windows_sum_the_last_games_before_dividing(weeks, window):
+    result = trends.windowed(weeks, "team", METRICS, window)
+    pd.testing.assert_frame_equal(
+        result, _expected(weeks, window), check_dtype=False
+    )
+
+
+def test_a_weekly_window_is_the_weekly_value(weeks):
+    result = trends.windowed(weeks, "team", METRICS, 1)
+    assert np.isnan(result.rate[(result.team == "A") & (result.week == 2)]).all()
+    season = trends.windowed(weeks, "team", METRICS, None)
+    last = season.groupby("team").tail(1).set_index("team")
+    assert last.rate["A"] == pytest.approx(100 * 6 / 10)
+    assert last.per_game["B"] == pytest.approx(5 / 3)
+
+
+def test_team_trends_from_the_store_tables():
+    plays = make_plays([(1, "KC", "BUF"), (2, "KC", "DAL"), (3, "BUF", "KC")])
+    weeks = trends.team_weeks(
+        aggregates.build_team_cube(plays), analytics.build_team_epa(plays)
+    )
+    result = trends.windowed(weeks, "team", trends.TEAM_METRICS, 3)
+    kc = result[result.team == "KC"].set_index("week")
+
+    assert list(kc.index) == [1, 2, 3]
+    offense = plays[plays.posteam == "KC"]
+    assert kc.yards_per_game[3] == pytest.approx(offense.yards_gained.sum() / 3)
+    assert set(result.columns) == {"team", "week", *trends.TEAM_METRICS}
@@ -0,0 +1,110 @@
+"""
+Rolling and cumulative weekly metrics for every team or passer at once.
+
+Metrics are ratios of two summed columns of the per-week tables, e.g. EPA/play
+is epa over plays. A window sums both columns over an entity's last N games
+before dividing, so every game weighs by its plays rather than each weekly rate
+counting the same. Window sums are differences of per-entity cumulative sums,
+which needs no loop over entities or weeks:
+
+    window=1      the raw weekly value
+    window=N      the last N games the entity played, fewer early in the season
+    window=None   the season to date
+"""
+import numpy as np
+import pandas as pd
+
+
+# metric -> (numerator, denominator, scale); "games" counts the rows
+TEAM_METRICS = {
+    "yards_per_game": ("yards", "games", 1),
+    "pass_yards_per_game": ("pass_yards", "games", 1),
+    "rush_yards_per_game": ("rush_yards", "games", 1),
+    "epa_per_play": ("epa", "plays", 1),
+    "success_rate": ("success", "plays", 100),
+    "cpoe": ("cpoe", "cpoe_plays", 1),
+    "sacks_per_game": ("sacks_taken", "games", 1),
+}
+QB_METRICS = {
+    "pass_yards_per_game": ("yards_gained", "games", 1),
+    "epa_per_dropback": ("epa", "dropbacks", 1),
+    # attempts are dropbacks less sacks, so they include any scrambles
+    "comp_perc": ("complete_pass", "attempts", 100),
+    "cpoe": ("cpoe", "cpoe_plays", 1),
+    "sacks_per_game": ("sack", "games", 1),
+}
+# page labels of the metrics
+LABELS = {
+    "yards_per_game": "Yards/Game",
+    "pass_yards_per_game": "Pass Yards/Game",
+    "rush_yards_per_game": "Rush Yards/Game",
+    "epa_per_play": "EPA/Play",
+    "epa_per_dropback": "EPA/Dropback",
+    "success_rate": "Success Rate",
+    "comp_perc": "Completion %",
+    "cpoe": "CPOE",
+    "sacks_per_game": "Sacks/Game",
+}
+WINDOWS = {"Weekly": 1, "Last 3 Games": 3, "Last 5 Games": 5, "Season to Date": None}
+
+
+def windowed(weeks, key, metrics, window):
+    """
+    Returns metrics over a window of games ending at each row.
+
+    params:
+        weeks (DataFrame): one row per entity per game with key, week and the
+            columns metrics sum.
+        key (str): column naming the entity, e.g. "team" or "passer_id".
+        metrics (dict): TEAM_METRICS or QB_METRICS.
+        window (int): games in the window, or None for the season to date.
+
+    Returns:
+        Dataframe with key, week and one column per metric, sorted by key
+        and week.
+    """
+    weeks = weeks.sort_values([key, "week"], kind="stable").reset_index(drop=True)
+    columns = sorted({x for n, d, _ in metrics.values() for x in (n, d)})
+    totals = weeks.assign(games=1)[columns].to_numpy(np.float64)
+    # NaN weeks (e.g. no CPOE plays) add nothing to the window
+    sums = pd.DataFrame(np.nan_to_num(totals), columns=columns).groupby(
+        weeks[key].to_numpy()
+    ).cumsum()
+    if window is not None:
+        before = sums.groupby(weeks[key].to_numpy()).shift(window)
+        sums = sums - before.fillna(0)
+    result = weeks[[key, "week"]].copy()
+    for name, (numerator, denominator, scale) in metrics.items():
+        result[name] = scale * sums[numerator] / sums[denominator].where(
+            sums[denominator] > 0
+        )
+    return result
+
+
+def team_weeks(team_cube, team_epa):
+    """
+    Returns one row per team per game with the columns of TEAM_METRICS.
+    """
+    epa = team_epa.rename(columns={"posteam": "team"})[
+        ["game_id", "team", "plays", "epa", "success", "cpoe", "cpoe_plays"]
+    ]
+    weeks = team_cube[
+        ["game_id", "team", "week", "season_type"]
+        + ["yards", "pass_yards", "rush_yards", "sacks_taken"]
+    ]
+    return weeks.assign(team=weeks.team.astype(str)).merge(
+        epa.assign(team=epa.team.astype(str)), on=["game_id", "team"], how="left"
+    )
+
+
+def qb_weeks(passer_weeks, passer_epa):
+    """
+    Returns one row per passer per week with the columns of QB_METRICS.
+    """
+    weeks = passer_weeks.merge(
+        passer_epa[["passer_id", "week", "epa", "cpoe", "cpoe_plays"]],
+        on=["passer_id", "week"],
+        how="left",
+    )
+    weeks["attempts"] = weeks.dropbacks - weeks.sack
+    return weeks